@@ -7,11 +7,27 @@ import sys
 import logging
 import multiprocessing
 from config import SQLALCHEMY_DATABASE_URI
+from model.sqlite import enable_sqlite_performance_profile
 from datetime import datetime
-from model.raw_comment import RawComment
-from model.pull_request import PullRequest
 from analyzer.analyzer import Analyzer
+from analyzer.diff_cache import DiffCache
+from github_parser.git_mirror import GitMirror
 from analyzer.git.git_producer import GitRecordsProducer
+from analyzer.xml.xml_producer import XmlRecordsProducer
+from analyzer.swift.swift_producer import SwiftRecordsProducer
+from analyzer.csv_worker import SHUFFLE_MEMORY_BUDGET
+from analyzer.record_type import RecordType
+from analyzer.incremental import AnalyzedItems
+from analyzer.items_loader import iter_raw_comments, iter_closed_pull_requests, count_raw_comments,\
+    count_closed_pull_requests, prefetch
+
+
+def parse_negative_rate(value: str) -> (RecordType, float):
+    type_name, _, rate = value.partition("=")
+    try:
+        return RecordType[type_name], float(rate)
+    except (KeyError, ValueError):
+        raise argparse.ArgumentTypeError("'%s' is not in TYPE=RATE format, e.g. GIT=0.01" % value)
 
 
 if __name__ == '__main__':
@@ -20,13 +36,30 @@ if __name__ == '__main__':
     parser.add_argument('rcs', type=int, nargs='?', default=-1, help='Raw Comments count.')
     parser.add_argument('prs', type=int, nargs='?', default=-1, help='Pull Requests count.')
     parser.add_argument('--chunks', action='store_true',
-                        help='Flag to flush records by chunks. It allows to reduce RAM load but slows down analyzing'
-                             ' speed more than 2 times.')
+                        help='Flag to flush records by chunks. It allows to reduce RAM load.')
     parser.add_argument("--train-ratio", type=float, default=0.8, help="Train-test separation ratio.")
+    parser.add_argument("--memory-budget", type=int, default=SHUFFLE_MEMORY_BUDGET // (1024 * 1024),
+                        help="Megabytes of RAM for records during shuffling into train and test parts.")
+    parser.add_argument('--processes', action='store_true',
+                        help='Flag to analyze in processes instead of threads. Parsing holds GIL so processes scale'
+                             ' better on many cores.')
+    parser.add_argument('--no-diff-cache', action='store_true',
+                        help='Flag to parse all PR diffs without using and filling parsed diffs cache.')
+    parser.add_argument('--git-mirror', metavar='PATH',
+                        help='Path to bare clone of repository to take PR diffs from (by commits of PRs) instead of'
+                             ' database.')
+    parser.add_argument('--negative-rates', type=parse_negative_rate, nargs='+', default=[],
+                        help='Rates of negative records to keep per records type in TYPE=RATE format, e.g. GIT=0.01.'
+                             ' Other negative records are not produced at all. By default all records are kept.')
+    parser.add_argument('--sampling-seed', type=int, default=0, help='Seed of negative records sampling.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Flag to analyze only RCs and PRs which are new or changed since previous analyzing and'
+                             ' append their records to previous ones.')
     args = parser.parse_args()
 
     # Connect db.
     Session = sessionmaker(autoflush=False)
+    enable_sqlite_performance_profile()
     engine = create_engine(SQLALCHEMY_DATABASE_URI)
     Session.configure(bind=engine)
     session = Session()
@@ -35,33 +68,52 @@ if __name__ == '__main__':
     logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
     logger = logging.getLogger("analyzer")
 
-    # Get required number of RC-s and PR-s.
+    # Get required number of RC-s and PR-s. Items are loaded by windows during analyzing.
     time1 = datetime.today()
     # Use all RCs.
-    raw_comments = session.query(RawComment).limit(args.rcs).all()
+    rcs_number = count_raw_comments(session, args.rcs)
     # Use only closed PRs.
-    prs = session.query(PullRequest).filter(PullRequest.state == "closed").limit(args.prs).all()
+    prs_number = count_closed_pull_requests(session, args.prs)
+    # Select new and changed items. Without '--incremental' all items are new.
+    analyzed_items = AnalyzedItems(args.incremental)
+    # Items are loaded in separate thread, so it needs own session (i.e. connection).
+    raw_comments = prefetch(analyzed_items.select_changed(iter_raw_comments(Session(), args.rcs), False,
+                                                          args.rcs < 0))
     # Build analyzer.
-    analyzer = Analyzer(logger, args.chunks, GitRecordsProducer())
-    # TODO analyzer = Analyzer(logger, args.chunks, GitRecordsProducer(), XmlRecordsProducer(), SwiftRecordsProducer())
+    diff_cache = None if args.no_diff_cache else DiffCache()
+    analyzer = Analyzer(logger, args.chunks, GitRecordsProducer(), XmlRecordsProducer(), SwiftRecordsProducer(),
+                        diff_cache=diff_cache, git_mirror=GitMirror(args.git_mirror) if args.git_mirror else None,
+                        negative_rates=dict(args.negative_rates),
+                        sampling_seed=args.sampling_seed, generation=analyzed_items.generation)
+    if analyzed_items.generation > 0:
+        logger.info("Analyze generation %d incrementally.", analyzed_items.generation)
+        analyzer.load_vocabularies()
+        # Only new and changed items are analyzed, so chunks and time estimation are based on their numbers.
+        rcs_changed_number = analyzed_items.count_changed(iter_raw_comments(session, args.rcs), False)
+        prs_changed_number = analyzed_items.count_changed(iter_closed_pull_requests(session, args.prs), True)
+    else:
+        rcs_changed_number, prs_changed_number = rcs_number, prs_number
     # Start analyze.
     time2 = datetime.today()
-    logger.info("Load %d raw comments and %d pull requests in %s.", len(raw_comments), len(prs),
-                time2 - time1)
+    logger.info("Found %d raw comments and %d pull requests (%d and %d of them to analyze) in %s.", rcs_number,
+                prs_number, rcs_changed_number, prs_changed_number, time2 - time1)
     # Analyze and write to CSV files.
-    rc_records_count = analyzer.analyze_items(raw_comments, multiprocessing.cpu_count())
+    rc_records_count = analyzer.analyze_items(raw_comments, multiprocessing.cpu_count(), args.processes,
+                                              rcs_changed_number)
+    rcs_number = len(analyzed_items.changed)
     time3 = datetime.today()
-    logger.info("Got %d records due %d raw comments analyzing in %s.", rc_records_count, len(raw_comments),
-                time3 - time2)
-    pr_records_count = analyzer.analyze_items(prs, multiprocessing.cpu_count())
+    logger.info("Got %d records due %d raw comments analyzing in %s.", rc_records_count, rcs_number, time3 - time2)
+    prs = prefetch(analyzed_items.select_changed(iter_closed_pull_requests(Session(), args.prs), True,
+                                                args.prs < 0))
+    pr_records_count = analyzer.analyze_items(prs, multiprocessing.cpu_count(), args.processes, prs_changed_number)
+    prs_number = len(analyzed_items.changed) - rcs_number
     time4 = datetime.today()
-    logger.info("Got %d records due %d pull requests analyzing in %s.", pr_records_count, len(prs),
-                time4 - time3)
-    analyzer.finalize(args.train_ratio)
+    logger.info("Got %d records due %d pull requests analyzing in %s.", pr_records_count, prs_number, time4 - time3)
+    analyzed_items.save()
+    analyzer.finalize(args.train_ratio, args.memory_budget * 1024 * 1024, analyzed_items.get_item_generations())
     records_count = rc_records_count + pr_records_count
     time5 = datetime.today()
     logger.info("Dumped %d records in %s.", records_count, time5 - time4)
-    logger.info("Total %s for analyzing %d raw comments and %d pull requests.", time5 - time1, len(raw_comments),
-                len(prs))
+    logger.info("Total %s for analyzing %d raw comments and %d pull requests.", time5 - time1, rcs_number, prs_number)
     logger.info("Percent of negative records (without RC ID) in all records is %f (%d vs %d).",
-                pr_records_count/records_count, rc_records_count, pr_records_count)
+                pr_records_count/max(records_count, 1), rc_records_count, pr_records_count)
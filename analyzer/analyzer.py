@@ -1,49 +1,76 @@
+import itertools
+import logging
 import multiprocessing.pool
+import threading
+from collections import namedtuple
 from datetime import datetime, timedelta
 from logging import Logger
 from functools import partial
 
-from analyzer.git_diff_parser import parse_git_diff
+from analyzer.git_diff_parser import parse_git_diff, iter_git_diff, count_git_diff_files
 from analyzer.records_handler import RecordsHandler
 from analyzer.records_producer import RecordsProducer
-from analyzer.record_type import RecordType
+from analyzer.record_type import RecordType, get_record_type
 from model.pull_request import PullRequest
 from model.raw_comment import RawComment
-from analyzer.csv_worker import FileDumper, ChunksFileDumper, save_analyzer_info, AnalyzerInfo
+from analyzer.csv_worker import FileDumper, ChunksFileDumper, save_analyzer_info, AnalyzerInfo,\
+    SHUFFLE_MEMORY_BUDGET
 from analyzer.git_dao import GitFile
+from analyzer.diff_cache import DiffCache
+from github_parser.git_mirror import GitMirror
+
+
+# Lightweight copies of RawComment and PullRequest with only fields required for analyzing. Used to send items into
+# worker processes.
+RawCommentItem = namedtuple("RawCommentItem", ['id', 'diff_hunk', 'path'])
+PullRequestItem = namedtuple("PullRequestItem", ['id', 'diff', 'base_sha', 'head_sha'], defaults=(None, None))
 
 
 class Analyzer(object):
     """
     Top level class to analyze features from RawComment-s and PullRequest-s.
     Should be used in next way:
-    1. Call 'analyze' method as many time as need. It will fill up 'records_XXX.csv' files by chunks.
+    1. Call 'analyze' method as many time as need. It will fill up 'records_XXX' folders with binary shards by chunks.
     2. When analyzing is over call 'finalize' method. It:
-        - flushes remained records into file,
-        - dumps all "vocabulary features" into 'YYY_vocabulary.csv' files,
-        - reads records into RAM as lines,
-        - shuffles records-lines,
+        - flushes remained records into shards,
+        - dumps all not hashed "vocabulary features" into sorted 'XXX_YYY_vocabulary.csv' files,
+        - shuffles records by buckets which fit into memory budget,
         - separates records to "train" and "test" parts,
-        - writes records to 'XXX_train.csv' and 'XXX_test.csv' files with header rows.
+        - writes records to 'XXX_train.npy' and 'XXX_test.npy' files with columns narrowed to the smallest types.
     3. To analyze something else without affecting to/from previously analyzed records call 'clean_handlers' first,
         next see steps above.
+    Negative records of each type may be downsampled during analyzing with 'negative_rates' (see 'RecordsHandler').
+    Rates are saved in 'AnalyzerInfo' to reweight records on training.
+    For incremental analyzing (see 'AnalyzedItems') use 'generation' greater than 0 and call 'load_vocabularies' before
+    step 1, records of new items are appended to records of previous generations.
+    With 'git_mirror' diffs of pull requests with known commits are taken from local clone (see 'GitMirror').
     """
-    __slots__ = ('logger', 'type_to_handler_dict', 'is_dump_by_chunks', 'flushed_records_number', 'positive_number',)
+    __slots__ = ('logger', 'type_to_handler_dict', 'is_dump_by_chunks', 'flushed_records_number', 'positive_number',
+                 'diff_cache', 'git_mirror', 'negative_rates', 'sampling_seed', 'generation',)
 
-    def __init__(self, logger: Logger, is_dump_by_chunks: bool, *args):
+    def __init__(self, logger: Logger, is_dump_by_chunks: bool, *args, diff_cache: DiffCache = None,
+                 git_mirror: GitMirror = None, negative_rates: dict = None, sampling_seed: int = 0,
+                 generation: int = 0):
         self.logger = logger
+        self.diff_cache = diff_cache
+        self.git_mirror = git_mirror
         self.type_to_handler_dict = dict()
         self.is_dump_by_chunks = is_dump_by_chunks
         self.flushed_records_number = 0
         self.positive_number = 0
+        self.negative_rates = dict() if negative_rates is None else negative_rates  # 'RecordType' -> rate.
+        self.sampling_seed = sampling_seed
+        self.generation = generation
         for producer in args:
             producer: RecordsProducer
             record_type = producer.record_type
             if is_dump_by_chunks:
-                file_dumper = ChunksFileDumper(record_type)
+                file_dumper = ChunksFileDumper(record_type, generation)
             else:
-                file_dumper = FileDumper(record_type)
-            self.type_to_handler_dict[record_type] = RecordsHandler(producer, file_dumper)
+                file_dumper = FileDumper(record_type, generation)
+            self.type_to_handler_dict[record_type] = RecordsHandler(producer, file_dumper,
+                                                                    self.negative_rates.get(record_type, 1.0),
+                                                                    sampling_seed)
 
     def get_supported_types(self) -> set:
         return self.type_to_handler_dict.keys()
@@ -51,40 +78,130 @@ class Analyzer(object):
     def get_handler(self, type: RecordType):
         return self.type_to_handler_dict.get(type)
 
+    def is_pr_in_git_mirror(self, pr: PullRequest) -> bool:
+        """
+        Checks that diff of PullRequest may be taken from 'git_mirror', i.e. commits of PullRequest are known and
+        mirror has them. Otherwise diff from database should be used.
+        """
+        if self.git_mirror is None or pr.base_sha is None or pr.head_sha is None:
+            return False
+        if self.git_mirror.has_commits(pr.base_sha, pr.head_sha):
+            return True
+        self.logger.warning("Git mirror doesn't have commits of %d pull request, use diff from database", pr.id)
+        return False
+
+    def count_pr_files(self, pr: PullRequest, is_in_git_mirror: bool = None) -> int:
+        """
+        :param pr: PullRequest to count changed files of.
+        :param is_in_git_mirror: Result of 'is_pr_in_git_mirror' if it is already known.
+        :return: Number of changed files.
+        """
+        if is_in_git_mirror is None:
+            is_in_git_mirror = self.is_pr_in_git_mirror(pr)
+        if is_in_git_mirror:
+            return self.git_mirror.count_files(pr.base_sha, pr.head_sha)
+        return count_git_diff_files(pr.diff)
+
+    def iter_pr_git_files(self, pr: PullRequest, is_in_git_mirror: bool = None):
+        """
+        Parses diff of specified PullRequest. Uses 'diff_cache' if it is set. Diff is taken from 'git_mirror' if it
+        is set and has commits of PullRequest.
+        :param pr: PullRequest to parse diff from.
+        :param is_in_git_mirror: Result of 'is_pr_in_git_mirror' if it is already known.
+        :return: Generator of 'GitFile'-s.
+        """
+        if is_in_git_mirror is None:
+            is_in_git_mirror = self.is_pr_in_git_mirror(pr)
+        if is_in_git_mirror:
+            return self.git_mirror.iter_git_files(pr.base_sha, pr.head_sha, self.diff_cache)
+        if self.diff_cache is None:
+            return iter_git_diff(pr.diff, None)
+        return self.diff_cache.iter_git_files(pr.id, pr.diff)
+
     def flush_handlers(self):
         for handler in self.type_to_handler_dict.values():
             handler: RecordsHandler
             self.flushed_records_number += handler.flush_records(self.logger)
 
-    def finalize(self, train_ratio: float):
+    def load_vocabularies(self):
+        for handler in self.type_to_handler_dict.values():
+            handler.load_vocabulary_features(self.logger)
+
+    def finalize(self, train_ratio: float, memory_budget: int = SHUFFLE_MEMORY_BUDGET, item_generations: dict = None):
         self.flush_handlers()
+        records_number = 0
         for handler in self.type_to_handler_dict.values():
-            handler.finalize_records_file(self.logger, train_ratio)
+            records_number += handler.finalize_records_file(self.logger, train_ratio, memory_budget,
+                                                            item_generations=item_generations)
+        positive_number = self.positive_number
+        common_handler = self.get_handler(RecordType.GIT)
+        if self.generation > 0 and common_handler is not None:
+            # Count RCs of all generations without outdated (analyzed again or removed) ones.
+            positive_number = common_handler.get_positive_records_number(item_generations)
         # For now count of classes = positive_number.
-        info = AnalyzerInfo(self.positive_number, self.flushed_records_number, self.positive_number, train_ratio,
-                            self.type_to_handler_dict.keys())
+        info = AnalyzerInfo(positive_number, records_number, positive_number, train_ratio,
+                            self.type_to_handler_dict.keys(),
+                            [x.negative_rate for x in self.type_to_handler_dict.values()])
         save_analyzer_info(info)
 
     @staticmethod
-    def chunks_generator(items: [], chunk_size: int):
-        for i in range(0, len(items), chunk_size):
-            yield items[i:i + chunk_size]
+    def chunks_generator(items, chunk_size: int, semaphore: threading.Semaphore = None):
+        """
+        Splits items into lists of specified size.
+        :param items: Iterable with items.
+        :param chunk_size: Size of chunk.
+        :param semaphore: Optional semaphore to acquire before each chunk.
+        :return: Generator of lists with items.
+        """
+        items = iter(items)
+        while True:
+            if semaphore is not None:
+                semaphore.acquire()
+            chunk = list(itertools.islice(items, chunk_size))
+            if len(chunk) == 0:
+                return
+            yield chunk
 
-    def analyze_items(self, items: [], threads_number: int):
+    def merge_worker_records(self, worker_result: (int, dict)) -> int:
         """
-        Analyzes list of RawComment-s or PullRequest-s.
+        Merges result of 'analyze_chunk_in_worker' into own handlers. Vocabulary features of records are remapped to
+        own vocabularies.
+        :param worker_result: Result of 'analyze_chunk_in_worker'.
+        :return: Count of analyzed items in chunk.
+        """
+        count, type_to_records_dict = worker_result
+        for record_type, (records, vocabularies, items) in type_to_records_dict.items():
+            handler: RecordsHandler = self.get_handler(record_type)
+            handler.producer.merge_vocabularies(vocabularies, records)
+            handler.add_records(records, items)
+        if self.is_dump_by_chunks:
+            self.flush_handlers()
+        return count
+
+    def analyze_items(self, items, threads_number: int, is_processes: bool = False, items_count: int = None):
+        """
+        Analyzes list (or other iterable, see 'items_loader') of RawComment-s or PullRequest-s. Items are taken from
+        iterable by chunks only when workers are ready for them, so iterable may load items lazily.
         :param items: Items to analyze.
-        :param threads_number: Number of threads to parallel analyzing on.
+        :param threads_number: Number of threads (or processes) to parallel analyzing on.
+        :param is_processes: Flag to analyze in worker processes instead of threads. Each process has own producers
+        and returns records with own vocabularies which are merged in order of chunks, so result doesn't depend from
+        processes number.
+        :param items_count: Number of items if 'items' is not list. Used to calculate chunk size and estimate time.
         :return: Count of analyzed records (of all types).
         """
-        items_count = len(items)
+        if items_count is None:
+            items_count = len(items)
+        items = iter(items)
+        first_item = next(items, None)
+        if first_item is None:  # For example, there are no new items for incremental analyzing.
+            return 0
+        items = itertools.chain((first_item,), items)
         # Determine type of item.
         is_prs = False
-        if isinstance(items[0], RawComment):
-            target_func = analyze_raw_comments
+        if isinstance(first_item, (RawComment, RawCommentItem)):
             item_name = "raw comment"
         else:
-            target_func = analyze_pull_requests
             item_name = "pull request"
             is_prs = True
         # Better to analyse items by chunks to dump them by chunks into CSV files.
@@ -99,20 +216,37 @@ class Analyzer(object):
             chunk_size_divider = chunk_size / 20
         if not is_prs and chunk_size > 2000:
             chunk_size_divider = chunk_size / 20
-        chunk_size = int(chunk_size / chunk_size_divider)
-        self.logger.info("Start %d threads to analyze %d %ss using chunks, each %d pts.", threads_number, items_count,
-                         item_name, chunk_size)
-        # Split items to chunks.
-        chunks = self.chunks_generator(items, chunk_size)
-        # Create threads poll and start analyzing.
-        pool = multiprocessing.pool.ThreadPool(processes=threads_number)
+        chunk_size = max(int(chunk_size / chunk_size_divider), 1)
+        self.logger.info("Start %d %s to analyze %d %ss using chunks, each %d pts.", threads_number,
+                         "processes" if is_processes else "threads", items_count, item_name, chunk_size)
+        # Split items to chunks. Pool takes chunks from generator as fast as it can, so limit number of chunks in
+        # progress to don't load all items into RAM.
+        chunks_semaphore = threading.Semaphore(threads_number * 2)
+        chunks = self.chunks_generator(items, chunk_size, chunks_semaphore)
+        # Each chunk is analyzed by own producers, so threads and processes don't share vocabularies. Results are
+        # merged in order of chunks, so vocabularies don't depend from threads number and timings.
+        producer_types = [type(x.producer) for x in self.type_to_handler_dict.values()]
+        if is_processes:
+            # Create processes pool. Send only required data to processes.
+            pool = multiprocessing.Pool(processes=threads_number, initializer=init_worker,
+                                        initargs=(producer_types, self.diff_cache is not None, self.git_mirror,
+                                                  self.negative_rates, self.sampling_seed))
+            chunks = ((is_prs, [to_worker_item(x, is_prs) for x in chunk]) for chunk in chunks)
+            results = pool.imap(analyze_chunk_in_worker, chunks)
+        else:
+            # Create threads poll and start analyzing.
+            pool = multiprocessing.pool.ThreadPool(processes=threads_number)
+            chunks = ((is_prs, chunk) for chunk in chunks)
+            results = pool.imap(partial(analyze_chunk_in_thread, producer_types, self.diff_cache, self.git_mirror,
+                                        self.logger, self.negative_rates, self.sampling_seed), chunks)
+        results = (self.merge_worker_records(x) for x in results)
         total_count = 0
         # Collect results.
-        func = partial(target_func, self)
         time1 = datetime.today()
         last_log_time = time1
         completed = 0
-        for i, result_item in enumerate(pool.imap_unordered(func, chunks)):
+        for i, result_item in enumerate(results):
+            chunks_semaphore.release()
             total_count += result_item
             completed += chunk_size
             completed = min(completed, items_count)  # Last chunk may has size less than other.
@@ -124,6 +258,8 @@ class Analyzer(object):
                 last_log_time = time2
                 self.logger.info("%d/%d analyzed in %s. Remains about %s.", completed, items_count, time2 - time1,
                                  estimate)
+        pool.close()
+        pool.join()
         if not is_prs:
             self.positive_number += total_count
         return total_count
@@ -159,12 +295,12 @@ def analyze_raw_comments(analyzer: Analyzer, rcs: []) -> int:
                                     records_len, rc_id)
             continue
         # Parse features relative to attached parsers with standard RecordParser interface.
-        handler = analyzer.get_handler(git_file.file_type)
+        handler = analyzer.get_handler(get_record_type(git_file.file_type))
         if handler:
             handler: RecordsHandler
             handler_records_len = handler.analyze(git_file, True, rc_id)
             if handler_records_len != 1:
-                analyzer.logger.warning("%s analyzer returns %d records for %d raw comment.", git_file.file_type.name,
+                analyzer.logger.warning("%s analyzer returns %d records for %d raw comment.", handler.record_type.name,
                                         handler_records_len, rc_id)
                 continue
         records_number += 1
@@ -173,15 +309,17 @@ def analyze_raw_comments(analyzer: Analyzer, rcs: []) -> int:
     return records_number
 
 
-def analyze_git_file(common_handler: RecordsHandler, handlers_dict: dict, git_file: GitFile) -> (int, RecordType):
+def analyze_git_file(common_handler: RecordsHandler, handlers_dict: dict, git_file: GitFile,
+                     item_id: int = -1) -> (int, RecordType):
     # Parse common features.
-    records_len = common_handler.analyze(git_file, False)
+    records_len = common_handler.analyze(git_file, False, item_id=item_id)
     # Parse features relative to attached parsers with standard RecordParser interface.
-    handler: RecordsHandler = handlers_dict.get(git_file.file_type)
+    record_type = get_record_type(git_file.file_type)
+    handler: RecordsHandler = handlers_dict.get(record_type)
     handler_records_len = 0
     if handler:
-        handler_records_len = handler.analyze(git_file, False)
-    return records_len + handler_records_len, git_file.file_type
+        handler_records_len = handler.analyze(git_file, False, item_id=item_id)
+    return records_len + handler_records_len, record_type
 
 
 def analyze_pull_requests(analyzer: Analyzer, prs: []) -> int:
@@ -193,14 +331,80 @@ def analyze_pull_requests(analyzer: Analyzer, prs: []) -> int:
     """
     records_number = 0
     for pr in prs:
-        git_files = parse_git_diff(str(pr.diff), None)
-        if len(git_files) > 20:  # Don't check really big PR-s.
+        is_in_git_mirror = analyzer.is_pr_in_git_mirror(pr)
+        if analyzer.count_pr_files(pr, is_in_git_mirror) > 20:  # Don't check really big PR-s.
             continue
         type_to_handler_dict = analyzer.type_to_handler_dict
         common_handler = type_to_handler_dict.get(RecordType.GIT)
-        for git_file in git_files:
-            file_records_number, _ = analyze_git_file(common_handler, type_to_handler_dict, git_file)
+        # Handle files one by one to don't keep whole PR parsed in RAM.
+        for git_file in analyzer.iter_pr_git_files(pr, is_in_git_mirror):
+            file_records_number, _ = analyze_git_file(common_handler, type_to_handler_dict, git_file, pr.id)
             records_number += file_records_number
     if analyzer.is_dump_by_chunks:
         analyzer.flush_handlers()
     return records_number
+
+
+def to_worker_item(item, is_pr: bool):
+    if is_pr:
+        return PullRequestItem(item.id, item.diff, item.base_sha, item.head_sha)
+    return RawCommentItem(item.id, item.diff_hunk, item.path)
+
+
+# Analyzer of worker process. Created by 'init_worker'.
+worker_analyzer: Analyzer = None
+
+
+def init_worker(producer_types: list, is_diff_cache: bool, git_mirror: GitMirror, negative_rates: dict,
+                sampling_seed: int):
+    """
+    Initializes worker process: creates own 'Analyzer' with new producers.
+    :param producer_types: Types of 'RecordsProducer'-s to create.
+    :param is_diff_cache: Flag to use 'DiffCache'.
+    :param git_mirror: Optional 'GitMirror' to take diffs from.
+    :param negative_rates: Rates of negative records sampling per 'RecordType'.
+    :param sampling_seed: Seed of negative records sampling.
+    """
+    global worker_analyzer
+    producers = [x() for x in producer_types]
+    worker_analyzer = Analyzer(logging.getLogger("analyzer"), False, *producers,
+                               diff_cache=DiffCache() if is_diff_cache else None, git_mirror=git_mirror,
+                               negative_rates=negative_rates, sampling_seed=sampling_seed)
+
+
+def analyze_chunk(analyzer: Analyzer, chunk: (bool, [])) -> (int, dict):
+    """
+    Analyzes chunk of items with specified analyzer and takes all records and vocabularies from it.
+    :param analyzer: Analyzer to use. Should be used only for this chunk.
+    :param chunk: Tuple of flag that items are PRs and list of PullRequest-s or RawComment-s (or 'PullRequestItem'-s
+    or 'RawCommentItem'-s).
+    :return: Tuple of analyzed items count and dictionary of 'RecordType' to tuple of structured numpy array of records,
+    list of vocabularies (see 'RecordsProducer.pop_vocabularies') and list of items (see 'RecordsHandler.pop_items').
+    """
+    is_prs, items = chunk
+    if is_prs:
+        count = analyze_pull_requests(analyzer, items)
+    else:
+        count = analyze_raw_comments(analyzer, items)
+    result = dict()
+    for record_type, handler in analyzer.type_to_handler_dict.items():
+        handler: RecordsHandler
+        result[record_type] = (handler.pop_records(), handler.producer.pop_vocabularies(), handler.pop_items())
+    return count, result
+
+
+def analyze_chunk_in_worker(chunk: (bool, [])) -> (int, dict):
+    """
+    Analyzes chunk of items in worker process. See 'analyze_chunk'.
+    """
+    return analyze_chunk(worker_analyzer, chunk)
+
+
+def analyze_chunk_in_thread(producer_types: list, diff_cache: DiffCache, git_mirror: GitMirror, logger: Logger,
+                            negative_rates: dict, sampling_seed: int, chunk: (bool, [])) -> (int, dict):
+    """
+    Analyzes chunk of items in thread with new producers. See 'analyze_chunk'.
+    """
+    producers = [x() for x in producer_types]
+    return analyze_chunk(Analyzer(logger, False, *producers, diff_cache=diff_cache, git_mirror=git_mirror,
+                                  negative_rates=negative_rates, sampling_seed=sampling_seed), chunk)
@@ -11,8 +11,18 @@ my_path = os.path.realpath(__file__)
 CSV_FOLDER = os.path.normpath(os.path.join(my_path, "..", "..", "instance", "csv"))
 TRAIN_CSV_NAME = "train.csv"
 TEST_CSV_NAME = "test.csv"
+TRAIN_NPY_NAME = "train.npy"
+TEST_NPY_NAME = "test.npy"
+NARROW_DTYPES = (np.int8, np.int16, np.int32, np.int64)  # Types to narrow records columns to, from the smallest.
 VOCABULARY_CSV_NAME = "vocabulary.csv"
+RECORDS_MANIFEST_NAME = "manifest.csv"
+RECORDS_SHARD_EXTENSION = ".npy"
+RECORDS_ITEMS_NAME = "items.csv"
+ANALYZED_ITEMS_NAME = "analyzed_items.csv"
 ANALYZER_INFO_NAME = "analyzer_info.csv"
+SHUFFLE_BUCKET_EXTENSION = ".bucket"
+SHUFFLE_MEMORY_BUDGET = 512 * 1024 * 1024  # Bytes of RAM for records during shuffle of records (see 'FileDumper').
+STOP_DUMP = None  # Item of records queue which stops 'DumpRecordsThread' (see 'ChunksFileDumper.close').
 
 
 def _prepare_folder():
@@ -28,14 +38,27 @@ def get_test_csv_path(net_name: str):
     return os.path.join(CSV_FOLDER, "%s_%s" % (net_name, TEST_CSV_NAME))
 
 
-def get_vocabulary_csv_path(feature_name: str):
-    return os.path.join(CSV_FOLDER, "%s_%s" % (feature_name, VOCABULARY_CSV_NAME))
+def get_train_npy_path(net_name: str):
+    return os.path.join(CSV_FOLDER, "%s_%s" % (net_name, TRAIN_NPY_NAME))
+
+
+def get_test_npy_path(net_name: str):
+    return os.path.join(CSV_FOLDER, "%s_%s" % (net_name, TEST_NPY_NAME))
+
+
+def get_vocabulary_csv_path(net_name: str, feature_name: str, folder: str = None):
+    return os.path.join(CSV_FOLDER if folder is None else folder, "%s_%s_%s" % (net_name, feature_name,
+                                                                                VOCABULARY_CSV_NAME))
 
 
 def get_analyzer_info_path():
     return os.path.join(CSV_FOLDER, ANALYZER_INFO_NAME)
 
 
+def get_analyzed_items_path():
+    return os.path.join(CSV_FOLDER, ANALYZED_ITEMS_NAME)
+
+
 def dump_rcclasses(rcclasses: list):  # TODO remove if is really outdated.
     _prepare_folder()
     file_path = os.path.join(CSV_FOLDER, "rclasses.csv")
@@ -47,106 +70,493 @@ def dump_rcclasses(rcclasses: list):  # TODO remove if is really outdated.
     return file_path
 
 
-def get_record_info_from_train(net_name: str) -> (int, int, list):
-    file_path = get_test_csv_path(net_name)
-    with open(file_path, 'r', encoding='utf-8', newline='') as csv_file:
-        reader = csv.reader(csv_file)
-        header = next(reader)
-        return int(header[0]), int(header[1]), header[2:]
+def get_record_info_from_train(net_name: str) -> (int, int, np.dtype):
+    """
+    Reads info about records in train file without reading records.
+    :param net_name: Name of network, i.e. records type.
+    :return: Tuple with number of records, number of columns and structured dtype of records with names of columns.
+    """
+    records = np.load(get_train_npy_path(net_name), mmap_mode='r')
+    return len(records), len(records.dtype.names), records.dtype
+
+
+def read_train_records(net_name: str) -> np.ndarray:
+    return np.load(get_train_npy_path(net_name))
+
+
+def read_test_records(net_name: str) -> np.ndarray:
+    return np.load(get_test_npy_path(net_name))
+
+
+def get_narrowest_dtype(min_value: int, max_value: int) -> np.dtype:
+    for dtype in NARROW_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= min_value and max_value <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(NARROW_DTYPES[-1])
+
+
+def get_narrowed_dtype(names: list, min_values: np.ndarray, max_values: np.ndarray) -> np.dtype:
+    """
+    Builds structured dtype where each column has the smallest integer type which fits values in specified range.
+    :param names: Names of columns.
+    :param min_values: Minimal values of columns.
+    :param max_values: Maximal values of columns.
+    :return: Structured numpy dtype.
+    """
+    return np.dtype([(name, get_narrowest_dtype(min_values[i], max_values[i])) for i, name in enumerate(names)])
+
+
+def get_narrowed_records_dtype(records: np.ndarray, names: list) -> np.dtype:
+    """
+    Builds structured dtype where each column has the smallest integer type which fits all its values.
+    :param records: 2D numpy array of records.
+    :param names: Names of columns.
+    :return: Structured numpy dtype.
+    """
+    if len(records) > 0:
+        return get_narrowed_dtype(names, records.min(axis=0), records.max(axis=0))
+    zeros = np.zeros(len(names), dtype=np.int64)
+    return get_narrowed_dtype(names, zeros, zeros)
+
+
+def to_structured_records(records: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """
+    Converts 2D numpy array of records or structured array with other types of fields into structured array, i.e.
+    column by column.
+    :param records: 2D numpy array or structured numpy array of records.
+    :param dtype: Structured dtype with field per column (see 'get_narrowed_records_dtype').
+    :return: 1D structured numpy array.
+    """
+    result = np.empty(len(records), dtype=dtype)
+    for i, name in enumerate(dtype.names):
+        result[name] = records[:, i] if records.dtype.names is None else records[records.dtype.names[i]]
+    return result
 
 
 def get_record_file_path(record_type: RecordType):
     return os.path.join(CSV_FOLDER, "records_%s.csv" % (record_type.name))
 
 
-class FileDumper:  # Don't use csv_writer because it appends to file by line (slow) and cannot preappend header row.
-    def __init__(self, record_type: RecordType):
+def get_records_folder(record_type: RecordType):
+    return os.path.join(CSV_FOLDER, "records_%s" % (record_type.name))
+
+
+def read_records_manifest(folder: str) -> list:
+    """
+    Reads manifest of records shards (see 'FileDumper').
+    :param folder: Folder with shards.
+    :return: List of tuples with shard file name, number of records in it and generation of analyzing.
+    """
+    manifest_path = os.path.join(folder, RECORDS_MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path, 'r', encoding='utf-8', newline='') as file:
+        return [(row[0], int(row[1]), int(row[2]) if len(row) > 2 else 0) for row in csv.reader(file)]
+
+
+def read_records_items(folder: str) -> dict:
+    """
+    Reads items of records shards (see 'FileDumper').
+    :param folder: Folder with shards.
+    :return: Dictionary of shard file name to list of tuples with item key and number of its records in shard.
+    """
+    items_path = os.path.join(folder, RECORDS_ITEMS_NAME)
+    result = dict()
+    if os.path.exists(items_path):
+        with open(items_path, 'r', encoding='utf-8', newline='') as file:
+            for row in csv.reader(file):
+                result.setdefault(row[0], []).append((row[1], int(row[2])))
+    return result
+
+
+class FileDumper:
+    """
+    Appends records of one type into 'records_XXX' folder as binary '.npy' shards (one shard per flush) without
+    formatting them as text. Records are structured numpy arrays with own type per column (see 'Features.DTYPES').
+    Folder also contains manifest with file name, records number and generation of each shard.
+    Shard is added into manifest only when it is completely written. Use 'export_csv.py' to get records as CSV.
+    Generation is number of analyzing run (see 'AnalyzedItems'). On first flush of 0 generation records of previous
+    analyzing are removed, next generations append shards to existing ones. To exclude outdated records of re-analyzed
+    items folder also contains ranges of items records in shards.
+    Records are shuffled into train and test files in external memory, i.e. RAM is used only for part of records:
+    1. 'scatter_records_to_buckets' - copy records of shards into temporary bucket files, each record into random one.
+    2. 'write_buckets_as_train_test' - read buckets one by one, shuffle each in RAM and append to train and test files.
+    Because each record lands into random bucket, concatenation of shuffled buckets is random permutation of records.
+    Vocabulary features of records in shards are indexes in vocabularies kept in the same folder, records in train
+    and test files are remapped to indexes in sorted vocabularies (see 'RecordsHandler.finalize_records_file').
+    """
+    def __init__(self, record_type: RecordType, generation: int = 0):
         self.record_type = record_type
-        self.file_path = get_record_file_path(record_type)
-
-    def flush_records(self, records: list):
-        np_array = np.asarray(records)
-        np.savetxt(self.file_path, np_array, fmt="%d", delimiter=",")
-
-    def write_head(self, flushed_records_number: int, feature_names: list):  # TODO remove as not used.
-        names = [str(flushed_records_number), str(len(feature_names))] + feature_names
-        head_row = ",".join(names) + "\n"
-        # https://stackoverflow.com/questions/5914627/prepend-line-to-beginning-of-a-file
-        # https://stackoverflow.com/questions/11645876/how-to-efficiently-append-a-new-line-to-the-starting-of-a-large-file
-        self.close()
-        with open(self.file_path, 'r+') as file:
-            data = file.read()  # Assume we can afford keep whole file content in memory.
-            file.seek(0)
-            file.write(head_row)
-            file.write(data)
-
-    def write_all_records_as_lines_with_head(self, train_lines: list, test_lines: list, feature_names: list):
-        test_file_path = get_test_csv_path(self.record_type.name)
-        with open(test_file_path, 'w', encoding='utf-8', newline='') as file:
-            file.write("%d,%d,%s\n" % (len(train_lines), len(feature_names), ",".join(feature_names)))
-            file.writelines(train_lines)
-        train_file_path = get_train_csv_path(self.record_type.name)
-        with open(train_file_path, 'w', encoding='utf-8', newline='') as file:
-            file.write("%d,%d,%s\n" % (len(test_lines), len(feature_names), ",".join(feature_names)))
-            file.writelines(test_lines)
+        self.generation = generation
+        self.folder = get_records_folder(record_type)
+        self.shards = None  # List of manifest tuples (see 'read_records_manifest'). Initialized on first flush.
+
+    def flush_records(self, records: np.ndarray, items: list = None):
+        self.append_shard(records, items)
+
+    def clean(self):
+        """
+        Removes all shards and manifest.
+        """
+        if os.path.exists(self.folder):
+            for entry in os.scandir(self.folder):
+                os.remove(entry.path)
+        else:
+            os.makedirs(self.folder)
+        self.shards = []
+
+    def append_shard(self, records: np.ndarray, items: list = None):
+        """
+        Writes records into new shard.
+        :param records: Structured numpy array of records.
+        :param items: List of tuples with item key and number of its records, in order of records.
+        """
+        if self.shards is None:
+            if self.generation == 0:
+                self.clean()
+            else:
+                os.makedirs(self.folder, exist_ok=True)
+                self.shards = read_records_manifest(self.folder)
+                self.check_shards_dtype(records.dtype)
+        shard_name = "%06d%s" % (len(self.shards), RECORDS_SHARD_EXTENSION)
+        np.save(os.path.join(self.folder, shard_name), records)
+        if items:
+            with open(os.path.join(self.folder, RECORDS_ITEMS_NAME), 'a', encoding='utf-8', newline='') as file:
+                file.write("".join("%s,%s,%d\n" % (shard_name, key, rows) for key, rows in items))
+        with open(os.path.join(self.folder, RECORDS_MANIFEST_NAME), 'a', encoding='utf-8', newline='') as file:
+            file.write("%s,%d,%d\n" % (shard_name, len(records), self.generation))
+        self.shards.append((shard_name, len(records), self.generation))
+
+    def check_shards_dtype(self, dtype: np.dtype):
+        """
+        Checks that records of previous generations have the same type as new ones, so they may be shuffled together.
+        :param dtype: Structured dtype of new records.
+        """
+        if len(self.shards) == 0:
+            return
+        shard_dtype = np.load(os.path.join(self.folder, self.shards[0][0]), mmap_mode='r').dtype
+        if shard_dtype != dtype:
+            raise ValueError("Records in '%s' have other features or format (%s instead of %s), analyze all items "
+                             "again without incremental mode" % (self.folder, shard_dtype, dtype))
+
+    def iter_shards(self):
+        """
+        Reads shards listed in manifest one by one. Shards are memory-mapped, so they are not loaded into RAM at once.
+        :return: Generator of tuples with shard file name and structured numpy array.
+        """
+        for shard_name, _, _ in read_records_manifest(self.folder):
+            yield shard_name, np.load(os.path.join(self.folder, shard_name), mmap_mode='r')
+
+    def get_valid_records_masks(self, item_generations: dict) -> (dict, bool):
+        """
+        Finds outdated records, i.e. records of items which were analyzed again in next generations.
+        :param item_generations: Dictionary of item key to generation of its last analyzing.
+        :return: Tuple with dictionary of shard file name to boolean mask of valid records (only for shards with
+        outdated records) and flag that records were changed in current generation, i.e. train and test files should be
+        written again.
+        """
+        masks = dict()
+        is_changed = False
+        shards_items = read_records_items(self.folder)
+        for shard_name, rows, generation in read_records_manifest(self.folder):
+            if generation == self.generation:
+                is_changed = True
+            mask = []
+            for key, item_rows in shards_items.get(shard_name, []):
+                item_generation = item_generations.get(key, generation)
+                mask.append(np.full(item_rows, item_generation <= generation))
+                if item_generation == self.generation and generation < self.generation:
+                    is_changed = True
+            if len(mask) > 0:
+                mask = np.concatenate(mask)
+                if len(mask) == rows and not mask.all():
+                    masks[shard_name] = mask
+        return masks, is_changed
+
+    def read_records(self, dtype: np.dtype) -> np.ndarray:
+        """
+        Reads all dumped records.
+        :param dtype: Structured type of records.
+        :return: Structured numpy array of records.
+        """
+        shards = [shard for _, shard in self.iter_shards()]
+        if len(shards) == 0:
+            return np.empty(0, dtype=dtype)  # There were no records of such type.
+        return np.concatenate(shards).astype(dtype, copy=False)
+
+    def get_records_number(self, valid_masks: dict = None) -> int:
+        """
+        :param valid_masks: Optional masks of valid records (see 'get_valid_records_masks').
+        :return: Number of dumped (valid) records.
+        """
+        valid_masks = valid_masks or dict()
+        return sum(rows if name not in valid_masks else int(valid_masks[name].sum())
+                   for name, rows, _ in read_records_manifest(self.folder))
+
+    def get_positive_records_number(self, column: int, valid_masks: dict = None) -> int:
+        """
+        Counts valid records with positive value in column, i.e. records of RawComment-s by 'RC_ID' column. Reads only
+        specified column of memory-mapped shards.
+        :param column: Index of column.
+        :param valid_masks: Optional masks of valid records (see 'get_valid_records_masks').
+        :return: Number of records.
+        """
+        valid_masks = valid_masks or dict()
+        result = 0
+        for shard_name, shard in self.iter_shards():
+            if len(shard) == 0:
+                continue
+            is_positive = np.asarray(shard[shard.dtype.names[column]]) > 0
+            mask = valid_masks.get(shard_name)
+            result += int((is_positive if mask is None else is_positive & mask).sum())
+        return result
+
+    def get_bucket_path(self, index: int) -> str:
+        return os.path.join(self.folder, "%06d%s" % (index, SHUFFLE_BUCKET_EXTENSION))
+
+    def scatter_records_to_buckets(self, dtype: np.dtype, buckets_number: int, slice_len: int,
+                                   random_state: np.random.RandomState, valid_masks: dict = None,
+                                   column_mappings: dict = None) -> (np.ndarray, np.ndarray):
+        """
+        Copies dumped records into bucket files with raw records, each record into random bucket. Shards are read by
+        slices, so only slice of records is in RAM at once.
+        :param dtype: Structured type of records.
+        :param buckets_number: Number of buckets.
+        :param slice_len: Maximal number of records to keep in RAM.
+        :param random_state: Source of random numbers.
+        :param valid_masks: Optional masks of valid records (see 'get_valid_records_masks'), other records are skipped.
+        :param column_mappings: Optional dictionary of column index to numpy array to remap values of column by (see
+        'RecordsProducer.get_sorting_mappings').
+        :return: Tuple with minimal and maximal values of columns (see 'get_narrowed_dtype').
+        """
+        valid_masks = valid_masks or dict()
+        column_mappings = column_mappings or dict()
+        names = dtype.names
+        min_values = np.zeros(len(names), dtype=np.int64)
+        max_values = np.zeros(len(names), dtype=np.int64)
+        is_first = True
+        os.makedirs(self.folder, exist_ok=True)
+        buckets = [open(self.get_bucket_path(i), 'wb') for i in range(buckets_number)]
+        try:
+            for shard_name, shard in self.iter_shards():
+                mask = valid_masks.get(shard_name)
+                for i in range(0, len(shard), slice_len):
+                    records = np.asarray(shard[i:i + slice_len], dtype=dtype)
+                    if mask is not None:
+                        records = records[mask[i:i + slice_len]]
+                        if len(records) == 0:
+                            continue
+                    if len(column_mappings) > 0 and not records.flags.writeable:  # Memory-mapped shard.
+                        records = records.copy()
+                    for column, mapping in column_mappings.items():
+                        records[names[column]] = mapping[records[names[column]]]
+                    records_min_values = [records[name].min() for name in names]
+                    records_max_values = [records[name].max() for name in names]
+                    if is_first:
+                        min_values[:] = records_min_values
+                        max_values[:] = records_max_values
+                        is_first = False
+                    else:
+                        np.minimum(min_values, records_min_values, out=min_values)
+                        np.maximum(max_values, records_max_values, out=max_values)
+                    # Group records by bucket to write each bucket part with one call.
+                    indexes = random_state.randint(0, buckets_number, len(records))
+                    order = np.argsort(indexes, kind='stable')
+                    bounds = np.searchsorted(indexes[order], np.arange(buckets_number + 1))
+                    records = records[order]
+                    for bucket_index, bucket in enumerate(buckets):
+                        records[bounds[bucket_index]:bounds[bucket_index + 1]].tofile(bucket)
+        finally:
+            for bucket in buckets:
+                bucket.close()
+        return min_values, max_values
+
+    def write_buckets_as_train_test(self, dtype: np.dtype, buckets_number: int, train_len: int,
+                                    records_dtype: np.dtype, random_state: np.random.RandomState) -> (int, int):
+        """
+        Shuffles buckets (see 'scatter_records_to_buckets') one by one in RAM and writes them into 'XXX_train.npy' and
+        'XXX_test.npy' files as structured numpy arrays with narrowed types of columns. First 'train_len' records go
+        into train file. Removes buckets.
+        :param dtype: Structured type of records in buckets.
+        :param buckets_number: Number of buckets.
+        :param train_len: Number of train records.
+        :param records_dtype: Structured dtype of records in train and test files.
+        :param random_state: Source of random numbers.
+        :return: Tuple with numbers of train and test records.
+        """
+        records_len = sum(os.path.getsize(self.get_bucket_path(i)) for i in range(buckets_number)) // dtype.itemsize
+        train_records = np.lib.format.open_memmap(get_train_npy_path(self.record_type.name), mode='w+',
+                                                  dtype=records_dtype, shape=(train_len,))
+        test_records = np.lib.format.open_memmap(get_test_npy_path(self.record_type.name), mode='w+',
+                                                 dtype=records_dtype, shape=(records_len - train_len,))
+        position = 0
+        for i in range(buckets_number):
+            bucket_path = self.get_bucket_path(i)
+            records = np.fromfile(bucket_path, dtype=dtype)
+            records = to_structured_records(records[random_state.permutation(len(records))], records_dtype)
+            end = position + len(records)
+            if position < train_len:
+                train_records[position:min(end, train_len)] = records[:train_len - position]
+            if end > train_len:
+                test_records[max(position, train_len) - train_len:end - train_len] = \
+                    records[max(train_len - position, 0):]
+            position = end
+            os.remove(bucket_path)
+        train_records.flush()
+        test_records.flush()
+        return len(train_records), len(test_records)
+
+    def write_train_test_records(self, train_records: np.ndarray, test_records: np.ndarray):
+        """
+        Writes train and test records into 'XXX_train.npy' and 'XXX_test.npy' files.
+        :param train_records: Structured numpy array with train records.
+        :param test_records: Structured numpy array with test records.
+        """
+        np.save(get_train_npy_path(self.record_type.name), train_records)
+        np.save(get_test_npy_path(self.record_type.name), test_records)
 
     def close(self):
         pass
 
 
 class ChunksFileDumper(FileDumper):
-    def __init__(self, record_type: RecordType):
-        super().__init__(record_type)
+    """
+    'FileDumper' which writes shards in separate thread. Thread is started on flush and stopped on close, so dumper may
+    be used again after close (see 'Analyzer.clean_handlers'). Error of writing (i.e. full disk) is raised on next
+    flush or on close.
+    """
+    def __init__(self, record_type: RecordType, generation: int = 0):
+        super().__init__(record_type, generation)
         self.queue = queue.Queue()
-        self.dump_thread = DumpRecordsThread(self.file_path, self.queue)
-        self.dump_thread.setDaemon(True)
-        self.dump_thread.start()
+        self.dump_thread = None
+
+    def raise_dump_error(self):
+        error = self.dump_thread.error if self.dump_thread is not None else None
+        if error is not None:
+            raise error
 
-    def flush_records(self, records: list):
-        self.queue.put(records)
+    def flush_records(self, records: np.ndarray, items: list = None):
+        self.raise_dump_error()  # Don't analyze further if records can't be saved.
+        if self.dump_thread is None or not self.dump_thread.is_alive():
+            self.dump_thread = DumpRecordsThread(self, self.queue)
+            self.dump_thread.daemon = True
+            self.dump_thread.start()
+        self.queue.put((records, items))
 
     def close(self):
-        self.dump_thread.close()
+        if self.dump_thread is not None and self.dump_thread.is_alive():
+            self.queue.put(STOP_DUMP)  # Thread stops after all flushed records are written.
+            self.dump_thread.join()
+        self.raise_dump_error()
 
 
 class DumpRecordsThread(threading.Thread):
-    def __init__(self, file_path: str, queue: queue.Queue):
+    def __init__(self, file_dumper: FileDumper, queue: queue.Queue):
         threading.Thread.__init__(self)
-        self.is_work = True
-        self.is_first = True
         self.queue = queue
-        self.file_path = file_path
-        self.file = open(self.file_path, 'w', encoding='utf-8', newline='')
-
-    def dump(self, records: list):
-        if not self.is_first:
-            self.file.write("\n")
-        self.is_first = False
-        self.file.write("\n".join((",".join((str(x) for x in np.nditer(record))) for record in records)))
-        self.file.flush()
+        self.file_dumper = file_dumper
+        self.error = None  # First error of writing.
 
     def run(self):
-        while self.is_work:
-            result = self.queue.get()
-            self.dump(result)
-            self.queue.task_done()
-
-    def close(self):
-        self.queue.join()
-        self.is_work = False
-        self.file.close()
-
-
-def dump_vocabulary(feature_name: str, vocabulary: dict):
-    _prepare_folder()
-    file_path = get_vocabulary_csv_path(feature_name)
-    data = "\n".join(k for k in sorted(vocabulary, key=vocabulary.get))
+        # Consume queue until stop even after error, otherwise next thread of 'ChunksFileDumper' gets stale records.
+        while True:
+            task = self.queue.get()
+            if task is STOP_DUMP:
+                break
+            records, items = task
+            try:
+                if self.error is None:  # Records are incomplete after error, so next ones are dropped.
+                    self.file_dumper.append_shard(records, items)
+            except Exception as e:
+                self.error = e
+
+
+def export_records_to_csv(record_type: RecordType) -> int:
+    """
+    Exports records shards (see 'FileDumper') into 'records_XXX.csv' file.
+    :param record_type: Type of records to export.
+    :return: Number of exported records.
+    """
+    records_number = 0
+    with open(get_record_file_path(record_type), 'wb') as file:
+        for _, shard in FileDumper(record_type).iter_shards():
+            np.savetxt(file, shard, fmt="%d", delimiter=",")
+            records_number += len(shard)
+    return records_number
+
+
+def export_train_test_to_csv(net_name: str) -> (int, int):
+    """
+    Exports 'XXX_train.npy' and 'XXX_test.npy' files into 'XXX_train.csv' and 'XXX_test.csv' files with header row.
+    :param net_name: Name of network, i.e. records type.
+    :return: Tuple with numbers of exported train and test records.
+    """
+    result = []
+    for npy_path, csv_path in ((get_train_npy_path(net_name), get_train_csv_path(net_name)),
+                               (get_test_npy_path(net_name), get_test_csv_path(net_name))):
+        records = np.load(npy_path, mmap_mode='r')
+        np.savetxt(csv_path, records, fmt="%d", delimiter=",", header=",".join(records.dtype.names), comments="")
+        result.append(len(records))
+    return result[0], result[1]
+
+
+def dump_vocabulary(net_name: str, feature_name: str, items: list, folder: str = None):
+    """
+    Dumps vocabulary as item per line.
+    :param net_name: Name of network, i.e. records type.
+    :param feature_name: Name of feature.
+    :param items: List of items in order of indexes.
+    :param folder: Folder to dump into, by default 'CSV_FOLDER'.
+    """
+    file_path = get_vocabulary_csv_path(net_name, feature_name, folder)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
     with open(file_path, 'w', encoding='utf-8', newline='') as file:
-        file.write(data)
+        file.write("\n".join(items))
+
+
+def read_vocabulary(net_name: str, feature_name: str, folder: str = None) -> list:
+    """
+    Reads vocabulary dumped with 'dump_vocabulary'.
+    :param net_name: Name of network, i.e. records type.
+    :param feature_name: Name of feature.
+    :param folder: Folder to read from, by default 'CSV_FOLDER'.
+    :return: List of items in order of indexes or None if there is no such vocabulary.
+    """
+    file_path = get_vocabulary_csv_path(net_name, feature_name, folder)
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        return file.read().split("\n")
+
+
+def read_analyzed_items() -> dict:
+    """
+    Reads manifest of analyzed items (see 'AnalyzedItems'). Item may be met few times, last line is actual.
+    :return: Dictionary of item key to tuple of diff hash and generation of last analyzing.
+    """
+    result = dict()
+    if os.path.exists(get_analyzed_items_path()):
+        with open(get_analyzed_items_path(), 'r', encoding='utf-8', newline='') as file:
+            for row in csv.reader(file):
+                result[row[0]] = (row[1], int(row[2]))
+    return result
+
+
+def save_analyzed_items(items: list, generation: int):
+    """
+    Saves analyzed items into manifest. Manifest is rewritten for 0 generation and appended for next ones.
+    :param items: List of tuples with item key and diff hash.
+    :param generation: Generation of analyzing.
+    """
+    _prepare_folder()
+    with open(get_analyzed_items_path(), 'w' if generation == 0 else 'a', encoding='utf-8', newline='') as file:
+        file.write("".join("%s,%s,%d\n" % (key, diff_hash, generation) for key, diff_hash in items))
 
 
+# 'negative_rates' - rates of negative records sampling in order of 'used_handlers_types', 1.0 means no sampling.
 AnalyzerInfo = namedtuple("AnalyzerInfo", ['classes_number', 'records_number', 'positive_records_number',
-                          'train_ratio', 'used_handlers_types'])
+                          'train_ratio', 'used_handlers_types', 'negative_rates'])
 
 
 def save_analyzer_info(info: AnalyzerInfo):
@@ -154,6 +564,8 @@ def save_analyzer_info(info: AnalyzerInfo):
         file.write("%d,%d,%d,%f\n" % (info.classes_number, info.records_number, info.positive_records_number,
                                     info.train_ratio))
         file.write(",".join((x.name for x in info.used_handlers_types)))
+        file.write("\n")
+        file.write(",".join(("%f" % x for x in info.negative_rates)))
 
 
 def read_analyzer_info() -> AnalyzerInfo:
@@ -161,4 +573,8 @@ def read_analyzer_info() -> AnalyzerInfo:
         reader = csv.reader(csv_file)
         numbers = next(reader)
         types = next(reader)
-    return AnalyzerInfo(int(numbers[0]), int(numbers[1]), int(numbers[2]), float(numbers[3]), types)
+        rates = next(reader, None)
+    if rates is None:  # Info of analyzing without negative sampling.
+        rates = [1.0] * len(types)
+    return AnalyzerInfo(int(numbers[0]), int(numbers[1]), int(numbers[2]), float(numbers[3]), types,
+                        [float(x) for x in rates])
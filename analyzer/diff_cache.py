@@ -0,0 +1,198 @@
+import hashlib
+import os
+import struct
+import threading
+from analyzer.git_dao import *
+from analyzer.git_diff_parser import iter_git_diff
+
+
+my_path = os.path.realpath(__file__)
+DIFF_CACHE_FOLDER = os.path.normpath(os.path.join(my_path, "..", "..", "instance", "diff_cache"))
+DIFF_CACHE_SIZE_LIMIT = 2 * 1024 * 1024 * 1024  # 2 GB
+DIFF_CACHE_FILE_EXTENSION = ".gdc"
+
+# Binary format of cache entry - magic, hash of diff and sequence of files, each file is:
+#   header: path length, index line length + 1 (0 means None), pieces number, lines number, text buffer length,
+#   path, index line,
+#   pieces: from_line, from_lines, to_line, to_lines, begin line, end line, parent line length and parent line,
+#   arrays of lines starts, lengths, types and text buffer with all lines of file.
+ENTRY_MAGIC = b"GDC1"
+DIFF_HASH_SIZE = 16
+FILE_HEADER = struct.Struct("<IIIII")
+PIECE_HEADER = struct.Struct("<IIIIIII")
+
+
+def get_diff_hash(diff) -> bytes:
+    if isinstance(diff, str):
+        diff = diff.encode('utf-8')
+    return hashlib.blake2b(diff, digest_size=DIFF_HASH_SIZE).digest()
+
+
+def dump_git_file(git_file: GitFile) -> bytes:
+    """
+    Serializes 'GitFile' into binary format of cache. Saves only part of buffer with lines of file.
+    :param git_file: 'GitFile' to serialize.
+    :return: Bytes with serialized file.
+    """
+    lines: GitLines = git_file.lines
+    lines_number = len(lines)
+    if lines_number > 0:
+        text_start = lines.starts[0]
+        text_end = lines.starts[-1] + lines.lengths[-1]
+    else:
+        text_start = text_end = 0
+    text = lines.buffer[text_start:text_end]
+    starts = array('i', (x - text_start for x in lines.starts))  # Make starts relative to saved part of buffer.
+    path = git_file.file_path.encode('utf-8')
+    index_line = b"" if git_file.index_line is None else git_file.index_line.encode('utf-8')
+    parts = [FILE_HEADER.pack(len(path), 0 if git_file.index_line is None else len(index_line) + 1,
+                              len(git_file.pieces), lines_number, len(text)), path, index_line]
+    for piece in git_file.pieces:
+        piece: GitPiece
+        parent_line = piece.parent_line.encode('utf-8')
+        parts.append(PIECE_HEADER.pack(piece.from_line, piece.from_lines, piece.to_line, piece.to_lines,
+                                       piece.lines.begin, piece.lines.end, len(parent_line)))
+        parts.append(parent_line)
+    parts.append(starts.tobytes())
+    parts.append(lines.lengths.tobytes())
+    parts.append(lines.types.tobytes())
+    parts.append(text)
+    return b"".join(parts)
+
+
+def load_git_files(data: bytes):
+    """
+    Deserializes 'GitFile'-s from binary format of cache.
+    :param data: Content of cache entry.
+    :return: Generator of 'GitFile'-s.
+    """
+    view = memoryview(data)
+    position = len(ENTRY_MAGIC) + DIFF_HASH_SIZE
+    data_len = len(data)
+    while position < data_len:
+        path_len, index_len, pieces_number, lines_number, text_len = FILE_HEADER.unpack_from(view, position)
+        position += FILE_HEADER.size
+        path = str(view[position:position + path_len], 'utf-8')
+        position += path_len
+        index_line = None
+        if index_len > 0:
+            index_line = str(view[position:position + index_len - 1], 'utf-8')
+            position += index_len - 1
+        pieces_data = []
+        for _ in range(pieces_number):
+            header = PIECE_HEADER.unpack_from(view, position)
+            position += PIECE_HEADER.size
+            parent_len = header[6]
+            pieces_data.append((header, str(view[position:position + parent_len], 'utf-8')))
+            position += parent_len
+        arrays_position = position
+        position += lines_number * (4 + 4 + 1)
+        lines = GitLines(view[position:position + text_len])
+        position += text_len
+        lines.starts.frombytes(view[arrays_position:arrays_position + lines_number * 4])
+        arrays_position += lines_number * 4
+        lines.lengths.frombytes(view[arrays_position:arrays_position + lines_number * 4])
+        arrays_position += lines_number * 4
+        lines.types.frombytes(view[arrays_position:arrays_position + lines_number])
+        pieces = []
+        for header, parent_line in pieces_data:
+            piece = GitPiece(header[0], header[1], header[2], header[3], parent_line)
+            piece.lines = GitPieceLines(lines, header[4], header[5])
+            pieces.append(piece)
+        yield GitFile(path, index_line, pieces, lines)
+
+
+class DiffCache(object):
+    """
+    On-disk cache of parsed diffs. Entry is identified by ID of diff owner (i.e. PullRequest ID) and keeps hash of diff
+    content, so changed diff is parsed again and replaces entry. Keeps total size of entries under limit by removing
+    least recently used entries (uses modification time of entry file as time of last usage).
+    Entries may be read and written by few threads and processes at once.
+    """
+    __slots__ = ('folder', 'size_limit', '_size', '_lock',)
+
+    def __init__(self, folder: str = DIFF_CACHE_FOLDER, size_limit: int = DIFF_CACHE_SIZE_LIMIT):
+        self.folder = folder
+        self.size_limit = size_limit
+        self._size = None  # Calculated on first store.
+        self._lock = threading.Lock()
+        if not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+
+    def get_entry_path(self, key_id) -> str:
+        return os.path.join(self.folder, "%s%s" % (key_id, DIFF_CACHE_FILE_EXTENSION))
+
+    def iter_git_files(self, key_id, diff, path_if_diff_hunk: str = None):
+        """
+        Yields 'GitFile'-s of diff from cache. If there is no cache entry for such diff then parses diff (streaming)
+        and writes entry during parsing.
+        :param key_id: ID of diff owner.
+        :param diff: Bytes or string with diff lines.
+        :param path_if_diff_hunk: If it is diff_hunk then path to file with it.
+        :return: Generator of 'GitFile'-s.
+        """
+        return self.iter_cached_git_files(key_id, get_diff_hash(diff), lambda: iter_git_diff(diff, path_if_diff_hunk))
+
+    def iter_cached_git_files(self, key_id, diff_hash: bytes, parse):
+        """
+        Yields 'GitFile'-s from cache entry if it has the same hash. Otherwise yields 'GitFile'-s from 'parse' and
+        writes entry during it.
+        :param key_id: ID of diff owner.
+        :param diff_hash: Hash which identifies content of diff (see 'get_diff_hash').
+        :param parse: Function which returns generator of 'GitFile'-s of diff.
+        :return: Generator of 'GitFile'-s.
+        """
+        entry_path = self.get_entry_path(key_id)
+        entry_header = ENTRY_MAGIC + diff_hash
+        try:
+            with open(entry_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            data = None
+        if data is not None and data.startswith(entry_header):
+            os.utime(entry_path)  # Mark as recently used.
+            yield from load_git_files(data)
+            return
+        # Write into temporary file and replace entry only when whole diff is parsed.
+        tmp_path = "%s.%d_%d.tmp" % (entry_path, os.getpid(), threading.get_ident())
+        is_completed = False
+        try:
+            with open(tmp_path, 'wb') as file:
+                file.write(entry_header)
+                for git_file in parse():
+                    file.write(dump_git_file(git_file))
+                    yield git_file
+            os.replace(tmp_path, entry_path)
+            is_completed = True
+            self._on_stored(os.path.getsize(entry_path))
+        finally:
+            if not is_completed and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _on_stored(self, entry_size: int):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(x.stat().st_size for x in os.scandir(self.folder)
+                                 if x.name.endswith(DIFF_CACHE_FILE_EXTENSION))
+            else:
+                self._size += entry_size
+            if self._size > self.size_limit:
+                self._evict()
+
+    def _evict(self):
+        """
+        Removes least recently used entries until total size is less than 90% of limit.
+        """
+        entries = [x for x in os.scandir(self.folder) if x.name.endswith(DIFF_CACHE_FILE_EXTENSION)]
+        entries = sorted(((x.stat().st_mtime, x.stat().st_size, x.path) for x in entries))
+        size = sum(x[1] for x in entries)
+        target_size = self.size_limit * 0.9
+        for _, entry_size, path in entries:
+            if size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # Removed by other process.
+                pass
+            size -= entry_size
+        self._size = size
@@ -6,11 +6,16 @@ from analyzer.records_producer import Features, RecordsProducer
 
 class GitFeatures(Features):
     __slots__ = Features.__slots__ + ('GIT_LINE_TYPE', 'GIT_PIECES_NUMBER', 'GIT_LINE_LENGTH', 'V_GIT_FILE',)
+    DTYPES = dict(Features.DTYPES, GIT_LINE_LENGTH=np.int32, V_GIT_FILE=np.int32)
 
 
 class GitRecordsProducer(RecordsProducer):
-    def __init__(self):
-        super().__init__(RecordType.GIT, GitFeatures())
+    """
+    Produces common features of all files. May be extended to produce file specific features together with common
+    ones - subclass should use 'GitFeatures' subclass and call 'super()' in 'fill_git_XXX' methods.
+    """
+    def __init__(self, record_type: RecordType = RecordType.GIT, features: GitFeatures = None):
+        super().__init__(record_type, GitFeatures() if features is None else features)
 
     def analyze_git_file(self, file: GitFile) -> np.ndarray:
         record = self.get_row_container()
@@ -21,17 +26,37 @@ class GitRecordsProducer(RecordsProducer):
         return record
 
     def analyze_git_piece(self, file_level_features, piece: GitPiece) -> np.ndarray:
-        record = np.copy(file_level_features)
+        record = file_level_features.copy()
         return record
 
     def analyze_git_line(self, piece_level_features, line: GitLine) -> np.ndarray:
-        record = np.copy(piece_level_features)
+        record = piece_level_features.copy()
         if line.type is GitLineType.ADD:
             record[self.features.GIT_LINE_TYPE] = 1
         elif line.type is GitLineType.UNCHANGED:
             record[self.features.GIT_LINE_TYPE] = 0
         else:
             record[self.features.GIT_LINE_TYPE] = -1
-        record[self.features.GIT_LINE_LENGTH] = len(line.line)
+        record[self.features.GIT_LINE_LENGTH] = line.length  # Doesn't decode line.
         # TODO add more features.
         return record
+
+    def fill_git_file(self, records: np.ndarray, file: GitFile):
+        names = self.names
+        records[names[self.features.GIT_PIECES_NUMBER]] = len(file.pieces)
+        records[names[self.features.V_GIT_FILE]] = self.get_vocabulary_feature_value(self.features.V_GIT_FILE,
+                                                                                     file.file_path)
+
+    def fill_git_piece(self, records: np.ndarray, piece: GitPiece):
+        pass  # No piece-level features yet.
+
+    def fill_git_lines(self, records: np.ndarray, lines: GitPieceLines):
+        names = self.names
+        records[names[self.features.GIT_LINE_TYPE]] = np.asarray(lines.get_types())  # Codes are the same.
+        records[names[self.features.GIT_LINE_LENGTH]] = np.asarray(lines.get_lengths())
+
+    def analyze_git_lines(self, piece_level_features, lines: GitPieceLines) -> np.ndarray:
+        # Same features as 'analyze_git_line' sets but for all lines at once.
+        records = np.full(len(lines), piece_level_features, dtype=self.dtype)
+        self.fill_git_lines(records, lines)
+        return records
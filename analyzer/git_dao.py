@@ -1,4 +1,5 @@
 import os
+from array import array
 
 
 class GitLineType(object):
@@ -11,30 +12,179 @@ class GitLineType(object):
 
 
 class GitLine(object):
-    __slots__ = ('type', 'line', 'features',)
+    """
+    Line of git diff. Line may be backed by buffer with whole diff. In this case it is decoded only on 'line' access.
+    """
+    __slots__ = ('type', '_line', '_buffer', '_start', '_end', '_length', 'features',)
 
     def __init__(self, line: str):
+        self._buffer = None
         first_char = line[0:1]
         if first_char == "+":
             self.type = GitLineType.ADD
-            self.line = line[1:]
+            self._line = line[1:]
         elif first_char == "-":
             self.type = GitLineType.REMOVE
-            self.line = line[1:]
+            self._line = line[1:]
         else:
             self.type = GitLineType.UNCHANGED
-            self.line = line
+            self._line = line
+
+    @staticmethod
+    def from_buffer(buffer: memoryview, start: int, end: int, line_type, length: int):
+        """
+        Builds 'GitLine' from line in buffer without copying and decoding of it.
+        :param buffer: Buffer with diff.
+        :param start: Position of line start (without +/- char) in buffer.
+        :param end: Position of line end in buffer.
+        :param line_type: 'GitLineType' of line.
+        :param length: Length of decoded line in characters (see 'GitLines.get_char_lengths').
+        :return: 'GitLine' object.
+        """
+        git_line = GitLine.__new__(GitLine)
+        git_line.type = line_type
+        git_line._line = None
+        git_line._buffer = buffer
+        git_line._start = start
+        git_line._end = end
+        git_line._length = length
+        return git_line
+
+    @property
+    def line(self) -> str:
+        if self._line is None:
+            self._line = str(self._buffer[self._start:self._end], 'utf-8', 'replace')
+        return self._line
+
+    @property
+    def length(self) -> int:
+        """
+        :return: Length of line in characters. Doesn't decode line backed by buffer.
+        """
+        if self._buffer is None:
+            return len(self._line)
+        return self._length
+
+
+# 'GitLineType' values by code from 'GitLines.types' array. Codes are the same as 'GitLineType' instance has.
+GIT_LINE_TYPES_BY_CODE = {1: GitLineType.ADD, 0: GitLineType.UNCHANGED, -1: GitLineType.REMOVE}
+
+
+class GitLines(object):
+    """
+    Compact storage of all lines of one 'GitFile': buffer with diff text and arrays of line start offsets,
+    lengths in bytes (without +/- char) and 'GitLineType' codes. No Python object is kept per line.
+    Lengths in characters (i.e. lengths of decoded lines) are calculated on demand, see 'get_char_lengths'.
+    'GitPiece'-s refer to ranges in it through 'GitPieceLines'.
+    """
+    __slots__ = ('buffer', 'starts', 'lengths', 'types', 'char_lengths',)
+
+    def __init__(self, buffer: memoryview):
+        self.buffer = buffer
+        self.starts = array('i')
+        self.lengths = array('i')
+        self.types = array('b')
+        self.char_lengths = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, start: int, end: int):
+        """
+        Appends line from buffer.
+        :param start: Position of line start (with +/- char) in buffer.
+        :param end: Position of line end in buffer.
+        """
+        first_char = self.buffer[start] if start < end else 0
+        if first_char == 43:  # "+"
+            self.types.append(1)
+            start += 1
+        elif first_char == 45:  # "-"
+            self.types.append(-1)
+            start += 1
+        else:
+            self.types.append(0)
+        self.starts.append(start)
+        self.lengths.append(end - start)
+        self.char_lengths = None
+
+    def get_char_lengths(self) -> array:
+        """
+        Calculates lengths of lines in characters once. If all lines are ASCII ones (usual case) then they are the same
+        as lengths in bytes, otherwise lines are decoded like 'GitLine.line' does.
+        :return: 'int' array with lengths of lines in characters.
+        """
+        if self.char_lengths is None:
+            starts = self.starts
+            lengths = self.lengths
+            if len(starts) == 0 or bytes(self.buffer[starts[0]:starts[-1] + lengths[-1]]).isascii():
+                self.char_lengths = lengths
+            else:
+                buffer = self.buffer
+                self.char_lengths = array('i', (len(str(buffer[start:start + length], 'utf-8', 'replace'))
+                                                for start, length in zip(starts, lengths)))
+        return self.char_lengths
+
+    def get_line(self, index: int) -> GitLine:
+        start = self.starts[index]
+        return GitLine.from_buffer(self.buffer, start, start + self.lengths[index],
+                                   GIT_LINE_TYPES_BY_CODE[self.types[index]], self.get_char_lengths()[index])
+
+
+class GitPieceLines(object):
+    """
+    Sequence facade over range of lines in 'GitLines'. Builds 'GitLine' objects on access, so code which iterates
+    'GitPiece.lines' works as with list. Use 'get_lengths' and 'get_types' to handle all lines at once.
+    """
+    __slots__ = ('storage', 'begin', 'end',)
+
+    def __init__(self, storage: GitLines, begin: int, end: int):
+        self.storage = storage
+        self.begin = begin
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.begin
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            begin, end, step = index.indices(len(self))
+            assert step == 1, "GitPieceLines supports only continuous slices"
+            return GitPieceLines(self.storage, self.begin + begin, self.begin + max(begin, end))
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("GitPieceLines index out of range")
+        return self.storage.get_line(self.begin + index)
+
+    def __iter__(self):
+        storage = self.storage
+        for i in range(self.begin, self.end):
+            yield storage.get_line(i)
+
+    def get_lengths(self) -> memoryview:
+        """
+        :return: Lengths of lines in characters as 'int' memoryview (without copying), can be wrapped by 'np.asarray'.
+        """
+        return memoryview(self.storage.get_char_lengths())[self.begin:self.end]
+
+    def get_types(self) -> memoryview:
+        """
+        :return: 'GitLineType' codes of lines as memoryview (without copying), can be wrapped by 'np.asarray'.
+        """
+        return memoryview(self.storage.types)[self.begin:self.end]
 
 
 def parse_file_type(file_path: str):
     _, file_extension = os.path.splitext(file_path)
-    return next((x for x in FileType.__slots__ if getattr(FileType, x) == file_extension), FileType.UNSUPPORTED)
+    return FILE_TYPES_BY_EXTENSION.get(file_extension, FileType.UNSUPPORTED)
 
 
 class GitPiece(object):
     __slots__ = ('from_line', 'from_lines', 'to_line', 'to_lines', 'parent_line', 'lines',)
 
-    def __init__(self, from_line: int, from_lines: int, to_line: int, to_lines: int, parent_line: str, lines = []):
+    def __init__(self, from_line: int, from_lines: int, to_line: int, to_lines: int, parent_line: str,
+                 lines: GitPieceLines = None):
         self.from_line = from_line
         self.from_lines = from_lines
         self.to_line = to_line
@@ -56,12 +206,17 @@ class FileType(object):
         self.CONFIG = ".cfg"
 
 
+# File extension to 'FileType' member (the same objects are used as 'RecordType' values).
+FILE_TYPES_BY_EXTENSION = {getattr(FileType(), x): getattr(FileType, x) for x in FileType.__slots__}
+
+
 class GitFile(object):
-    __slots__ = ('file_path', 'file_name', 'file_type', 'index_line', 'pieces',)
+    __slots__ = ('file_path', 'file_name', 'file_type', 'index_line', 'pieces', 'lines',)
 
-    def __init__(self, file_path: str, index_line: str, pieces: [GitPiece]):
+    def __init__(self, file_path: str, index_line: str, pieces: [GitPiece], lines: GitLines):
         self.file_path = file_path
         self.file_name = os.path.basename(file_path)
         self.file_type = parse_file_type(self.file_name)
         self.index_line = index_line
         self.pieces = pieces
+        self.lines = lines
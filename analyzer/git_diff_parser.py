@@ -1,3 +1,4 @@
+import ast
 import re
 from analyzer.git_dao import *
 
@@ -25,78 +26,120 @@ def parse_git_diff_position_line(line: str):
     match = DIFF_POSITION_RE.match(line)
     if match and len(match.groups()) == 5:
         return GitPiece(int(match.group(1)), int(match.group(2)), int(match.group(3)), int(match.group(4)), \
-                        match.group(5), [])
+                        match.group(5))
     return None
 
 
-def parse_git_diff(diff: str, path_if_diff_hunk: str):
+def iter_diff_line_offsets(diff: bytes):
     """
-    Parses "git diff" output into list of 'GitFile' objects.
-    :param diff: String with diff lines. Can be diff_hunk or git diff.
+    Iterates lines of diff as offsets of them in diff. Doesn't copy and doesn't decode lines.
+    :param diff: Bytes with diff lines.
+    :return: Generator of (start, end) tuples, 'end' is position of line's "\\n" separator.
+    """
+    start = 0
+    diff_len = len(diff)
+    while start < diff_len:
+        line_end = diff.find(b'\n', start)
+        if line_end < 0:
+            yield start, diff_len
+            return
+        yield start, line_end
+        start = line_end + 1
+
+
+def decode_line(buffer: memoryview, start: int, end: int) -> str:
+    return str(buffer[start:end], 'utf-8', 'replace')
+
+
+def count_git_diff_files(diff) -> int:
+    """
+    Counts files in "git diff" output without parsing it.
+    :param diff: Bytes or string with git diff.
+    :return: Number of "diff" lines in diff.
+    """
+    return diff.count("diff --git a/" if isinstance(diff, str) else b"diff --git a/")
+
+
+def iter_git_diff(diff, path_if_diff_hunk: str):
+    """
+    Parses "git diff" output into 'GitFile' objects lazily. Each 'GitFile' is yielded as soon as its last piece is
+    parsed so caller may handle and drop files one by one instead of keeping whole parsed diff in memory.
+    Diff is walked through 'memoryview' by lines offsets, only header lines are decoded here. Regular lines are saved
+    as offsets into 'GitLines' of file and are decoded by 'GitLine' when (and if) somebody reads them.
+    :param diff: Bytes or string with diff lines. Can be diff_hunk or git diff.
     :param path_if_diff_hunk: If it is diff_hunk then path to file with it.
-    :return: List of GitFile objects.
+    :return: Generator of GitFile objects.
     """
+    if isinstance(diff, str):
+        if diff.startswith("b'"):
+            diff = ast.literal_eval(diff)  # Not migrated "bytestring" format like [b'foo'] -> [foo].
+        else:
+            diff = diff.encode('utf-8')
+    buffer = memoryview(diff)
     # git_lines_counter format:
     # 5: diff, 4: index, 3: ---, 2: +++, 1: @@ (position), 0: regular line of patch.
-    lines = []
-    if diff.startswith("b'"):
-        diff = diff[2:-1]  # Trim "bytestring" format like [b'foo'] -> [foo]
-        lines = diff.split('\\n')
-        git_lines_counter = 5
-    else:
-        lines = diff.split('\n')
-        git_lines_counter = 1
+    git_lines_counter = 5 if diff.startswith(b"diff --git ") else 1
     piece: GitPiece = None
     index_line = None
     diff_data = None
     pieces = []
-    files = []
-
-    def handle_previous_piece():
-        if piece and len(piece.lines) > 0:  # Use only not empty pieces.
-            pieces.append(piece)
+    file_lines = GitLines(buffer)
 
-    def handle_previous_file():
-        if len(pieces) > 0:
-            # Create new GitFile if there is at least one piece from it.
-            path = path_if_diff_hunk or diff_data['b_path']
-            files.append(GitFile(path, index_line, pieces))
-
-    for i, line in enumerate(lines):
+    for start, end in iter_diff_line_offsets(diff):
         tmp_piece = None
         tmp_diff_data = None
 
         # Parse lines. Collect data into 'tmp_piece' and 'tmp_diff_data'.
         if git_lines_counter > 0:
             if git_lines_counter == 1:
-                tmp_piece = parse_git_diff_position_line(line)
+                tmp_piece = parse_git_diff_position_line(decode_line(buffer, start, end))
             elif git_lines_counter == 4:
-                index_line = line
+                index_line = decode_line(buffer, start, end)
             elif git_lines_counter == 5:
-                tmp_diff_data = parse_git_diff_diff_line(line)
+                tmp_diff_data = parse_git_diff_diff_line(decode_line(buffer, start, end))
             git_lines_counter -= 1
         else:
             # Try to parse from line "@@" string.
-            tmp_piece = parse_git_diff_position_line(line)
-            if tmp_piece is None:
-                # Try to parse from line "diff" string.
-                tmp_diff_data = parse_git_diff_diff_line(line)
-                # If it is not "@@" and not "diff" then it is regular line.
-                if tmp_diff_data is None and piece:
-                    piece.lines.append(GitLine(line))  # Add line to piece.
-
-        # Combine received data into 'pieces' and 'files'. Set 'tmp_piece'->'piece' and 'tmp_diff_data'->'diff_data'.
+            if diff.startswith(b"@@ -", start, end):
+                tmp_piece = parse_git_diff_position_line(decode_line(buffer, start, end))
+            # Try to parse from line "diff" string.
+            elif diff.startswith(b"diff --git a/", start, end):
+                tmp_diff_data = parse_git_diff_diff_line(decode_line(buffer, start, end))
+            # If it is not "@@" and not "diff" then it is regular line.
+            if tmp_piece is None and tmp_diff_data is None and piece:
+                file_lines.append(start, end)  # Add line to piece.
+                piece.lines.end += 1
+        # Combine received data into 'pieces' and files. Set 'tmp_piece'->'piece' and 'tmp_diff_data'->'diff_data'.
         if tmp_piece:
-            handle_previous_piece()
+            if piece and len(piece.lines) > 0:  # Use only not empty pieces.
+                pieces.append(piece)
             piece = tmp_piece
+            piece.lines = GitPieceLines(file_lines, len(file_lines), len(file_lines))
         if tmp_diff_data:  # Check started new file.
-            handle_previous_piece()
-            handle_previous_file()
+            if piece and len(piece.lines) > 0:
+                pieces.append(piece)
+            if len(pieces) > 0:  # Yield previous file if there is at least one piece from it.
+                yield GitFile(path_if_diff_hunk or diff_data['b_path'], index_line, pieces, file_lines)
+            piece = None
+            pieces = []
+            file_lines = GitLines(buffer)
             diff_data = tmp_diff_data
             git_lines_counter = 4  # We are here due to new file started. So "diff" is just received.
             index_line = None
 
     # Handle last piece and file (there is no one more "diff" line to trigger handling of it in the cycle).
-    handle_previous_piece()
-    handle_previous_file()
-    return files
+    if piece and len(piece.lines) > 0:
+        pieces.append(piece)
+    if len(pieces) > 0:
+        yield GitFile(path_if_diff_hunk or diff_data['b_path'], index_line, pieces, file_lines)
+
+
+def parse_git_diff(diff, path_if_diff_hunk: str):
+    """
+    Parses "git diff" output into list of 'GitFile' objects.
+    Use 'iter_git_diff' if there is no need to keep all files in memory at once.
+    :param diff: Bytes or string with diff lines. Can be diff_hunk or git diff.
+    :param path_if_diff_hunk: If it is diff_hunk then path to file with it.
+    :return: List of GitFile objects.
+    """
+    return list(iter_git_diff(diff, path_if_diff_hunk))
@@ -0,0 +1,98 @@
+from analyzer.csv_worker import read_analyzed_items, save_analyzed_items
+from analyzer.diff_cache import get_diff_hash
+
+
+REMOVED_ITEM_HASH = ""  # Hash of items which were removed since previous analyzing.
+
+
+def get_item_key_prefix(is_pr: bool) -> str:
+    return "pr:" if is_pr else "rc:"
+
+
+def get_item_key(item_id: int, is_pr: bool) -> str:
+    return "%s%d" % (get_item_key_prefix(is_pr), item_id)
+
+
+def get_item_hash(item, is_pr: bool) -> str:
+    """
+    :param item: PullRequest or RawComment (or 'PullRequestItem' or 'RawCommentItem').
+    :param is_pr: Flag that item is PullRequest.
+    :return: Hex string with hash of item diff.
+    """
+    if is_pr:
+        return get_diff_hash(item.diff).hex()
+    return get_diff_hash("%s\n%s" % (item.path, item.diff_hunk)).hex()
+
+
+class AnalyzedItems(object):
+    """
+    Manifest of analyzed RawComment-s and PullRequest-s with hashes of their diffs. Each analyzing run has own
+    generation: full analyzing is 0 generation, each incremental analyzing takes next one. Incremental analyzing
+    selects only new and changed items, appends their records to records of previous generations (see 'FileDumper')
+    and keeps generation of last analyzing of each item to exclude outdated records of changed items.
+    Items which weren't met by not limited incremental analyzing (i.e. removed from database, like RawComment-s of
+    re-fetched PullRequest-s which get new IDs) are saved as removed ones with empty hash, so their records are
+    outdated too.
+    """
+    __slots__ = ('items', 'generation', 'changed', 'met_keys', 'complete_prefixes',)
+
+    def __init__(self, is_incremental: bool):
+        self.items = read_analyzed_items() if is_incremental else dict()
+        self.generation = max(x[1] for x in self.items.values()) + 1 if len(self.items) > 0 else 0
+        self.changed = []  # List of tuples with key and hash of selected items to 'save'.
+        self.met_keys = set()  # Keys of all items passed into 'select_changed'.
+        self.complete_prefixes = []  # Prefixes of keys of items which were passed into 'select_changed' completely.
+
+    def select_changed(self, items, is_prs: bool, is_complete: bool = True):
+        """
+        Selects items which weren't analyzed yet or whose diff was changed since last analyzing.
+        :param items: Iterable with PullRequest-s or RawComment-s (or 'PullRequestItem'-s or 'RawCommentItem'-s).
+        :param is_prs: Flag that items are PullRequest-s.
+        :param is_complete: Flag that items are all existing items of such type (i.e. not limited), so not met ones
+        were removed.
+        :return: Generator of selected items.
+        """
+        if is_complete:
+            self.complete_prefixes.append(get_item_key_prefix(is_prs))
+        for item in items:
+            key = get_item_key(item.id, is_prs)
+            self.met_keys.add(key)
+            item_hash = self.get_changed_hash(key, item, is_prs)
+            if item_hash is not None:
+                self.changed.append((key, item_hash))
+                yield item
+
+    def get_changed_hash(self, key: str, item, is_prs: bool):
+        """
+        :return: Hash of item if it wasn't analyzed yet or its diff was changed since last analyzing, otherwise None.
+        """
+        item_hash = get_item_hash(item, is_prs)
+        analyzed = self.items.get(key)
+        return item_hash if analyzed is None or analyzed[0] != item_hash else None
+
+    def count_changed(self, items, is_prs: bool) -> int:
+        """
+        Counts items which 'select_changed' would select. Doesn't mark them as selected.
+        :param items: Iterable with PullRequest-s or RawComment-s (or 'PullRequestItem'-s or 'RawCommentItem'-s).
+        :param is_prs: Flag that items are PullRequest-s.
+        :return: Number of new and changed items.
+        """
+        return sum(1 for x in items if self.get_changed_hash(get_item_key(x.id, is_prs), x, is_prs) is not None)
+
+    def save(self):
+        """
+        Marks selected items (see 'select_changed') as analyzed in current generation and not met items as removed in
+        it.
+        """
+        prefixes = tuple(self.complete_prefixes)
+        removed = [(key, REMOVED_ITEM_HASH) for key, (item_hash, _) in self.items.items()
+                   if item_hash != REMOVED_ITEM_HASH and key.startswith(prefixes) and key not in self.met_keys]
+        save_analyzed_items(self.changed + removed, self.generation)
+        for key, item_hash in self.changed + removed:
+            self.items[key] = (item_hash, self.generation)
+        self.changed = []
+        self.met_keys = set()
+        self.complete_prefixes = []
+
+    def get_item_generations(self) -> dict:
+        return {key: generation for key, (_, generation) in self.items.items()}
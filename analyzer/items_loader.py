@@ -0,0 +1,109 @@
+import queue
+import threading
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from analyzer.analyzer import RawCommentItem, PullRequestItem
+from model.pull_request import PullRequest
+from model.raw_comment import RawComment
+
+
+LOAD_WINDOW = 500  # Number of items to load from database per query.
+PREFETCH_SIZE = 2000  # Maximal number of loaded but not analyzed yet items.
+
+
+def iter_windows(query, id_column, limit: int = -1, window: int = LOAD_WINDOW):
+    """
+    Iterates rows of query by windows with keyset pagination over ID column, so neither database nor ORM keep all
+    rows at once and each window query starts from index instead of skipping of previous rows.
+    :param query: Query of rows with ID in first column.
+    :param id_column: ID column to order rows by.
+    :param limit: Maximal number of rows, '-1' means "all".
+    :param window: Number of rows to load per query.
+    :return: Generator of rows.
+    """
+    last_id = None
+    count = 0
+    while limit < 0 or count < limit:
+        window_query = query if last_id is None else query.filter(id_column > last_id)
+        rows = window_query.order_by(id_column).limit(window if limit < 0 else min(window, limit - count)).all()
+        if len(rows) == 0:
+            return
+        yield from rows
+        count += len(rows)
+        last_id = rows[-1][0]
+
+
+def get_closed_pull_requests_query(session: Session, *columns):
+    return session.query(*columns).filter(PullRequest.state == "closed")
+
+
+def count_items(query, limit: int = -1) -> int:
+    count = query.scalar()
+    return count if limit < 0 else min(count, limit)
+
+
+def count_raw_comments(session: Session, limit: int = -1) -> int:
+    return count_items(session.query(func.count(RawComment.id)), limit)
+
+
+def count_closed_pull_requests(session: Session, limit: int = -1) -> int:
+    return count_items(get_closed_pull_requests_query(session, func.count(PullRequest.id)), limit)
+
+
+def iter_raw_comments(session: Session, limit: int = -1, window: int = LOAD_WINDOW):
+    """
+    Loads RawComment-s by windows. Loads only columns required for analyzing, other columns (like messages) are not
+    loaded at all.
+    :param session: Session to use.
+    :param limit: Maximal number of items, '-1' means "all".
+    :param window: Number of items to load per query.
+    :return: Generator of 'RawCommentItem'-s.
+    """
+    query = session.query(RawComment.id, RawComment.diff_hunk, RawComment.path)
+    return (RawCommentItem(*x) for x in iter_windows(query, RawComment.id, limit, window))
+
+
+def iter_closed_pull_requests(session: Session, limit: int = -1, window: int = LOAD_WINDOW):
+    """
+    Loads closed PullRequest-s by windows. Loads only columns required for analyzing.
+    :param session: Session to use.
+    :param limit: Maximal number of items, '-1' means "all".
+    :param window: Number of items to load per query.
+    :return: Generator of 'PullRequestItem'-s.
+    """
+    query = get_closed_pull_requests_query(session, PullRequest.id, PullRequest.diff, PullRequest.base_sha,
+                                           PullRequest.head_sha)
+    return (PullRequestItem(*x) for x in iter_windows(query, PullRequest.id, limit, window))
+
+
+def prefetch(items, size: int = PREFETCH_SIZE):
+    """
+    Iterates items in separate thread and passes them through bounded queue, so loading of next items (i.e. database
+    I/O) overlaps with handling of previous ones and doesn't go further than 'size' items.
+    :param items: Iterable with items.
+    :param size: Maximal number of items in queue.
+    :return: Generator of items.
+    """
+    items_queue = queue.Queue(maxsize=size)
+    end_marker = object()
+    errors = []
+
+    def load():
+        try:
+            for item in items:
+                items_queue.put(item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            items_queue.put(end_marker)
+
+    thread = threading.Thread(name="prefetch", target=load)
+    thread.daemon = True
+    thread.start()
+    while True:
+        item = items_queue.get()
+        if item is end_marker:
+            break
+        yield item
+    if len(errors) > 0:
+        raise errors[0]
@@ -0,0 +1,9 @@
+def prepare_line(line: str) -> str:
+    """
+    Prepares line for lexing in the same way as pygments 'Lexer.get_tokens' does with default options.
+    :param line: Line to prepare.
+    :return: Line which ends with line break.
+    """
+    if line.startswith('\ufeff'):
+        line = line[1:]
+    return line.replace('\r\n', '\n').replace('\r', '\n').strip('\n') + '\n'
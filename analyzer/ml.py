@@ -5,10 +5,9 @@ from analyzer.net import NetKeeper
 from datetime import datetime
 import tensorflow as tf
 from model.pull_request import PullRequest
-from analyzer.git_diff_parser import parse_git_diff
 from analyzer.analyzer import Analyzer, analyze_git_file
 from analyzer.records_handler import RecordsHandler
-from analyzer.records_producer import is_vocabulary_feature
+from analyzer.records_producer import is_vocabulary_feature, Features
 from analyzer.csv_worker import get_vocabulary_csv_path, get_record_info_from_train, read_analyzer_info, AnalyzerInfo
 from analyzer.git_dao import *
 import os
@@ -41,19 +40,26 @@ class Prediction:  # Should be placed in list to have indexes same as lines in P
         return result
 
 
-def get_tf_feature_columns(net_type: RecordType):
-    records_number, values_number, features = get_record_info_from_train(net_type.name)
+def get_tf_feature_columns(net_type: RecordType, producer_features: Features):
+    records_number, values_number, records_dtype = get_record_info_from_train(net_type.name)
+    features = records_dtype.names
     tf_features = []
     for i in range(1, len(features)):  # First column is RC_ID and it is not a feature.
         feature = features[i]
-        if is_vocabulary_feature(feature):
-            vocabulary_csv_path = get_vocabulary_csv_path(feature)
+        buckets_number = producer_features.HASH_BUCKETS.get(feature)
+        if buckets_number:
+            # Hashed feature value is already index of bucket, so use it as is.
+            categorical_column = tf.feature_column.categorical_column_with_identity(key=feature,
+                                                                                    num_buckets=buckets_number)
+            tf_features.append(tf.feature_column.embedding_column(categorical_column, dimension=1))
+        elif is_vocabulary_feature(feature):
+            vocabulary_csv_path = get_vocabulary_csv_path(net_type.name, feature)
             num_lines = sum(1 for _ in open(vocabulary_csv_path))
             categorical_column = tf.feature_column.categorical_column_with_vocabulary_file(
                 key=feature, vocabulary_file=vocabulary_csv_path, vocabulary_size=num_lines)
             tf_features.append(tf.feature_column.embedding_column(categorical_column, dimension=1))
         else:
-            tf_features.append(tf.feature_column.numeric_column(feature, dtype=tf.int16))
+            tf_features.append(tf.feature_column.numeric_column(feature, dtype=tf.as_dtype(records_dtype[feature])))
     return tf_features
 
 
@@ -81,7 +87,8 @@ class MachineLearning:
             if self.log_handler and self.log_handler not in logger.handlers:
                 logger.addHandler(self.log_handler)
             # Build DNNClassifier, i.e. network.
-            feature_columns = get_tf_feature_columns(net_type)
+            producer_features = self.analyzer.get_handler(net_type).producer.features
+            feature_columns = get_tf_feature_columns(net_type, producer_features)
             classifier = tf.estimator.DNNClassifier(feature_columns=feature_columns,
                                                     hidden_units=[100],  # TODO magic number(s)
                                                     n_classes=self.analyzer_info.classes_number,
@@ -92,15 +99,14 @@ class MachineLearning:
 
     def analyze_records_from_pr(self, pr: PullRequest) -> list:
         self.analyzer.clean_handlers()
-        git_files = parse_git_diff(str(pr.diff), None)
         type_to_handler_dict = self.analyzer.type_to_handler_dict
         pre_predictions = type_to_handler_dict.get(RecordType.GIT)
         records_with_type = []
         common_handler = type_to_handler_dict.get(RecordType.GIT)
-        for git_file in git_files:
+        for git_file in self.analyzer.iter_pr_git_files(pr):
             git_file: GitFile
-            file_records_number, file_type = analyze_git_file(pre_predictions, type_to_handler_dict, git_file)
-            handler: RecordsHandler = type_to_handler_dict.get(file_type, common_handler)
+            file_records_number, record_type = analyze_git_file(pre_predictions, type_to_handler_dict, git_file)
+            handler: RecordsHandler = type_to_handler_dict.get(record_type, common_handler)
             record_type = handler.record_type
             lines = []
             for piece in git_file.pieces:
@@ -113,8 +119,9 @@ class MachineLearning:
                         lines.append("-" + line.line)
                     else:
                         lines.append(line.line)
-            lines_counter = 0
-            for record in handler.get_records():
+            records = handler.pop_records()
+            common_handler.pop_records()  # Specific records include common features, so drop common ones.
+            for lines_counter, record in enumerate(records):  # Records of file in order of lines.
                 records_with_type.append(Prediction(lines[lines_counter], record_type, record))
         return records_with_type
 
@@ -10,6 +10,7 @@ import tensorflow as tf
 from analyzer.csv_worker import dump_train, dump_test, get_test_csv_path, get_train_csv_path
 from analyzer.csv_worker import get_two_lines_of_test_file
 from analyzer.git_diff_parser import parse_git_diff
+from analyzer.diff_cache import DiffCache
 from analyzer.raw_comments_classifier import classify_and_dump_raw_comments
 from analyzer.swift.swift_features import SwiftFeatures
 from analyzer.swift.swift_parser import SwiftParser
@@ -68,6 +69,14 @@ class NetKeeper:
 
 
 net_keepers = dict()
+diff_cache: DiffCache = None  # Created on first use, so importing the module doesn't create cache folder.
+
+
+def get_diff_cache() -> DiffCache:
+    global diff_cache
+    if diff_cache is None:
+        diff_cache = DiffCache()
+    return diff_cache
 
 
 def check_binary_line(line: str):
@@ -179,13 +188,15 @@ def _shrink_list_randomly(items, ratio: float):
     return random.sample(items, required_number)
 
 
-def get_features_from_prs(prs: [], files: []):
+def get_features_from_prs(prs: [], files: [], cache: DiffCache = None):
     # Analyze only files from list to decrease count of trash files.
+    if cache is None:
+        cache = get_diff_cache()
     pr_files = []
     # Pre-get files because all of them without positive output - raw comments. It decreases RAM usage.
     for pr in prs:
         pr: PullRequest
-        git_files = parse_git_diff(str(pr.diff), None)
+        git_files = list(cache.iter_git_files(pr.id, pr.diff))
         if len(git_files) > 20:
             continue  # Skip really big pull requests.
         if files is not None:
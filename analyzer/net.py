@@ -1,6 +1,6 @@
 from analyzer.record_type import RecordType
 import tensorflow as tf
-from analyzer.csv_worker import get_train_csv_path, get_test_csv_path, AnalyzerInfo
+from analyzer.csv_worker import read_train_records, read_test_records, AnalyzerInfo
 import numpy as np
 from datetime import datetime
 
@@ -15,27 +15,20 @@ class NetKeeper:
 
     def train_net(self, analyzer_info: AnalyzerInfo, steps_number: int):
         time1 = datetime.today()
-        # Define pipelines to parse features from CSVs.
-        training_set = tf.contrib.learn.datasets.base.load_csv_with_header(
-                filename=get_train_csv_path(self.net_type.name),
-                target_dtype=np.int16,
-                features_dtype=np.int16,
-                target_column=0)
-        test_set = tf.contrib.learn.datasets.base.load_csv_with_header(
-                filename=get_test_csv_path(self.net_type.name),
-                target_dtype=np.int16,
-                features_dtype=np.int16,
-                target_column=0)
+        # Read records with columns narrowed to own types (see 'RecordsHandler.finalize_records_file').
+        training_set = read_train_records(self.net_type.name)
+        test_set = read_test_records(self.net_type.name)
+        feature_names = training_set.dtype.names[1:]  # First column is RC_ID, i.e. target.
         # Define the training inputs.
-        train_len = len(training_set.data)
-        features_number = len(training_set.data.shape[0])
+        train_len = len(training_set)
+        features_number = len(feature_names)
         train_input_fn = tf.estimator.inputs.numpy_input_fn(
-                x={"x": np.array(training_set.data)},
-                y=np.array(training_set.target),
+                x={x: training_set[x] for x in feature_names},
+                y=training_set[training_set.dtype.names[0]],
                 num_epochs=None,
                 shuffle=False)
         time2 = datetime.today()
-        self.log_info("read train and test CSV files as datasets in %s" % (time2 - time1))
+        self.log_info("read train and test records files in %s" % (time2 - time1))
         # Train model.
         self.log_info("start training for %d records each %d features %d steps" % (train_len, features_number,
                       steps_number))
@@ -43,10 +36,10 @@ class NetKeeper:
         time3 = datetime.today()
         self.log_info("training takes %s" % (time3 - time2))
         # Define the test inputs.
-        test_len = len(test_set.data)
+        test_len = len(test_set)
         test_input_fn = tf.estimator.inputs.numpy_input_fn(
-                x={"x": np.array(test_set.data)},
-                y=np.array(test_set.target),
+                x={x: test_set[x] for x in feature_names},
+                y=test_set[test_set.dtype.names[0]],
                 num_epochs=1,
                 shuffle=False)
         # Evaluate accuracy.
@@ -4,5 +4,17 @@ from analyzer.git_dao import FileType
 
 class RecordType(Enum):
     GIT = None
-    XML = FileType.XML
-    SWIFT = FileType.SWIFT
+    XML = "XML"  # Can't use 'FileType' members as values because Enum treats descriptors as not members.
+    SWIFT = "SWIFT"
+
+
+# 'FileType' member to 'RecordType' of specific records for files of such type.
+RECORD_TYPES_BY_FILE_TYPE = {FileType.XML: RecordType.XML, FileType.SWIFT: RecordType.SWIFT}
+
+
+def get_record_type(file_type) -> RecordType:
+    """
+    :param file_type: 'FileType' member, i.e. 'GitFile.file_type'.
+    :return: 'RecordType' of specific records for such files or None if there are only common (GIT) records.
+    """
+    return RECORD_TYPES_BY_FILE_TYPE.get(file_type)
@@ -2,42 +2,115 @@ from analyzer.git_dao import *
 from analyzer.csv_worker import FileDumper
 from logging import Logger
 from analyzer.records_producer import RecordsProducer
-from analyzer.csv_worker import dump_vocabulary
-import sys
-import random
+from analyzer.csv_worker import dump_vocabulary, read_vocabulary, get_narrowed_dtype, SHUFFLE_MEMORY_BUDGET
+from analyzer.incremental import get_item_key
+import hashlib
+import numpy as np
 from datetime import datetime
+from functools import partial
+
+
+def get_sampling_value(seed: int, key: str) -> float:
+    """
+    Maps key into pseudo-random number. Number depends only from seed and key, so sampling by it doesn't depend from
+    order of analyzing and number of workers.
+    :param seed: Seed of sampling.
+    :param key: Key of sampled item.
+    :return: Number in [0, 1) range.
+    """
+    digest = hashlib.blake2b(("%d:%s" % (seed, key)).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') / 18446744073709551616.0  # 2 ** 64
 
 
 class RecordsHandler(object):
     """
     Keep records of one type during analyzing and dump records to file(s).
+    Records are kept as list of structured numpy arrays (one per analyzed 'GitFile') and joined only on pop or flush.
     Use specified 'RecordsProducer' to obtain and specified 'FileDumper' to dump records of one type.
+    Negative records (without RawComment ID) may be downsampled with 'negative_rate': each piece of file is kept with
+    such probability (Bernoulli sampling with 'sampling_seed'), records of other pieces are not produced at all.
+    Also keeps keys of analyzed items with numbers of their records to dump them together with records (see
+    'AnalyzedItems').
     """
-    __slots__ = ('record_type', 'producer', 'file_dumper', '_records',)
+    __slots__ = ('record_type', 'producer', 'file_dumper', 'negative_rate', 'sampling_seed', '_records', '_items',)
 
-    def __init__(self, producer: RecordsProducer, file_dumper: FileDumper):
+    def __init__(self, producer: RecordsProducer, file_dumper: FileDumper, negative_rate: float = 1.0,
+                 sampling_seed: int = 0):
         self.record_type = producer.record_type
         self.producer = producer
         self.file_dumper = file_dumper
+        self.negative_rate = negative_rate
+        self.sampling_seed = sampling_seed
         self._records = []
+        self._items = []  # List of lists with item key and number of its records, in order of records.
+
+    def is_negative_piece_kept(self, file_key: str, piece_index: int) -> bool:
+        return get_sampling_value(self.sampling_seed, "%s:%d" % (file_key, piece_index)) < self.negative_rate
 
-    def analyze(self, git_file: GitFile, is_diff_hunk, rc_id: int = -1) -> int:
+    def analyze(self, git_file: GitFile, is_diff_hunk, rc_id: int = -1, item_id: int = -1) -> int:
         """
         Analyzes specified 'GitFile' and saves resulting records into inner 'records'.
         :param git_file: 'GitFile' to analyze.
         :param is_diff_hunk: Flag that 'GitFile' contains "diff_hunk" instead of usual diff.
         :param rc_id: RawComment ID if exist.
+        :param item_id: ID of analyzed item (i.e. PullRequest ID) to sample negative records by.
         :return: Count of records produced from specified git file.
         """
-        records = self.producer.analyze_git_file_recursively(git_file, is_diff_hunk)
+        is_piece_kept = None
+        if rc_id <= 0 and self.negative_rate < 1:
+            is_piece_kept = partial(self.is_negative_piece_kept, "%d:%s" % (item_id, git_file.file_path))
+        records = self.producer.analyze_git_file_records(git_file, is_diff_hunk, is_piece_kept)
         if rc_id > 0:
-            for record in records:
-                record[self.producer.features.RC_ID] = rc_id
-        self._records.extend(records)  # Support case when 'analyze' called few times before 'clean_records' call.
+            records[self.producer.names[self.producer.features.RC_ID]] = rc_id
+            items = [(get_item_key(rc_id, False), len(records))]
+        elif item_id >= 0:
+            items = [(get_item_key(item_id, True), len(records))]
+        else:
+            items = None
+        self.add_records(records, items)  # Support case when 'analyze' called few times before 'clean_records' call.
         return len(records)
 
+    def add_records(self, records: np.ndarray, items: list = None):
+        """
+        Adds already analyzed records.
+        :param records: Structured numpy array of records.
+        :param items: Optional list of tuples with item key and number of its records, in order of records.
+        """
+        if len(records) > 0:
+            self._records.append(records)
+        if items:
+            for key, rows in items:
+                if rows == 0:
+                    continue
+                if len(self._items) > 0 and self._items[-1][0] == key:  # Next file of the same item.
+                    self._items[-1][1] += rows
+                else:
+                    self._items.append([key, rows])
+
+    def pop_items(self) -> list:
+        """
+        Returns inner items (see 'add_records') and cleans them.
+        :return: List of tuples with item key and number of its records.
+        """
+        items = [(key, rows) for key, rows in self._items]
+        self._items = []
+        return items
+
+    def pop_records(self) -> np.ndarray:
+        """
+        Returns inner records and cleans them.
+        :return: Structured numpy array of records.
+        """
+        if len(self._records) > 0:
+            records = np.concatenate(self._records)
+        else:
+            records = self.producer.get_rows_container(0)
+        self._records = []
+        return records
+
     def close(self):
         self._records = []
+        self._items = []
         self.file_dumper.close()
 
     def flush_records(self, logger: Logger) -> int:
@@ -46,67 +119,120 @@ class RecordsHandler(object):
         :param logger: Logger to use.
         :return: Number of flushed records.
         """
-        records = self._records
+        records = self.pop_records()
+        items = self.pop_items()
         records_len = len(records)
         if records_len > 0:
-            logger.debug("  dump %d bytes for %d records list with %d features each", sys.getsizeof(records),
-                         len(records), len(records[0]))
-            self.file_dumper.flush_records(records)
-            self.close()
+            logger.debug("  dump %d bytes for %d records with %d features each", records.nbytes, records_len,
+                         len(records.dtype.names))
+            self.file_dumper.flush_records(records, items)
         return records_len
 
-    def dump_vocabulary_features(self, logger: Logger):
+    def dump_vocabulary_features(self, logger: Logger, sorting_mappings: dict = None):
         """
-        Dumps vocabulary features into files.
+        Dumps vocabulary features into files. Hashed features (see 'Features.HASH_BUCKETS') don't have vocabulary, so
+        if all features are hashed then nothing is dumped.
         :param logger: Logger to use.
+        :param sorting_mappings: Optional result of 'RecordsProducer.get_sorting_mappings' to dump sorted vocabularies
+        for train and test files into 'CSV_FOLDER'. Without it vocabularies are dumped as is into folder of records
+        shards.
         """
         for i, feature_vocabulary in enumerate(self.producer.vocabulary_features):
             if feature_vocabulary is not None:
                 feature_name = self.producer.features.__slots__[i]
-                logger.debug("  dump %s feature vocabulary with %d items", feature_name, len(feature_vocabulary))
-                dump_vocabulary(feature_name, feature_vocabulary)
+                items = sorted(feature_vocabulary, key=feature_vocabulary.get)
+                if sorting_mappings is None:
+                    logger.debug("  dump %s feature vocabulary with %d items", feature_name, len(items))
+                    dump_vocabulary(self.record_type.name, feature_name, items, self.file_dumper.folder)
+                else:
+                    logger.debug("  dump sorted %s feature vocabulary with %d items", feature_name, len(items))
+                    sorted_items = [None] * len(items)
+                    for item, index in zip(items, sorting_mappings[i]):
+                        sorted_items[index] = item
+                    dump_vocabulary(self.record_type.name, feature_name, sorted_items)
 
-    def finalize_records_file(self, logger: Logger, train_ratio):
+    def load_vocabulary_features(self, logger: Logger):
+        """
+        Loads vocabulary features dumped by previous analyzing (see 'dump_vocabulary_features') into producer, so new
+        records get the same indexes for already met items.
+        :param logger: Logger to use.
+        """
+        folder = self.file_dumper.folder
+        # Analyzing of previous versions dumped vocabularies of records only into 'CSV_FOLDER'.
+        vocabularies = [read_vocabulary(self.record_type.name, x, folder) or read_vocabulary(self.record_type.name, x)
+                        for x in self.producer.features.__slots__]
+        for feature_name, vocabulary in zip(self.producer.features.__slots__, vocabularies):
+            if vocabulary is not None:
+                logger.debug("  load %s feature vocabulary with %d items", feature_name, len(vocabulary))
+        self.producer.load_vocabularies(vocabularies)
+
+    def get_positive_records_number(self, item_generations: dict = None) -> int:
+        """
+        Counts dumped records of RawComment-s without outdated ones (see 'finalize_records_file').
+        :param item_generations: Dictionary of item key to generation of its last analyzing (see 'AnalyzedItems').
+        :return: Number of valid records with RawComment ID.
+        """
+        valid_masks, _ = self.file_dumper.get_valid_records_masks(item_generations or dict())
+        return self.file_dumper.get_positive_records_number(self.producer.features.RC_ID, valid_masks)
+
+    def finalize_records_file(self, logger: Logger, train_ratio, memory_budget: int = SHUFFLE_MEMORY_BUDGET,
+                              random_state: np.random.RandomState = None, item_generations: dict = None) -> int:
         """
         Finalizes records files. In details, it:
-        - flushes remained records into file,
-        - dumps all "vocabulary features" into 'YYY_vocabulary.csv' files,
-        - reads records into RAM as lines,
-        - shuffles records-lines,
-        - separates records to "train" and "test" parts,
-        - writes records to 'XXX_train.csv' and 'XXX_test.csv' files with header rows.
+        - waits until all records are written into shards,
+        - dumps all not hashed "vocabulary features" into 'XXX_YYY_vocabulary.csv' files in folder of shards,
+        - skips next steps if it is incremental analyzing and records weren't changed,
+        - scatters valid (not outdated) records from shards into random buckets which fit into memory budget,
+          vocabulary features are remapped to indexes in sorted vocabularies, so they don't depend from order of items,
+        - dumps sorted vocabularies into 'XXX_YYY_vocabulary.csv' files,
+        - shuffles records of each bucket in RAM and separates records to "train" and "test" parts,
+        - narrows each column to the smallest integer type which fits its values,
+        - writes records to 'XXX_train.npy' and 'XXX_test.npy' files as structured numpy arrays with names of features.
         :param logger: Logger to use.
         :param train_ratio: Ratio of 'train' records in all records.
+        :param memory_budget: Number of bytes of RAM to keep records during shuffling.
+        :param random_state: Source of random numbers for shuffling. By default is seeded randomly.
+        :param item_generations: Dictionary of item key to generation of its last analyzing (see 'AnalyzedItems').
+        :return: Number of records in train and test files.
         """
         # Yes, even if it is single flush for whole analyzing, better to dump "raw" records to file first. Because:
         #   a) it is good to have intermediate results,
-        #   b) after read records as lines they would occupy less place in RAM (seems like).
+        #   b) it allows to analyze by chunks without keeping all records in RAM.
         self.close()
         self.dump_vocabulary_features(logger)
-        # Read records into RAM.
+        valid_masks, is_changed = self.file_dumper.get_valid_records_masks(item_generations or dict())
+        records_len = self.file_dumper.get_records_number(valid_masks)
+        if self.file_dumper.generation > 0 and not is_changed:
+            logger.debug("  keep train and test files of %d records because records weren't changed", records_len)
+            return records_len
+        if random_state is None:
+            random_state = np.random.RandomState()
+        dtype = self.producer.dtype
+        # Bucket is kept in RAM together with its shuffled and narrowed copies, so expected size of bucket is quarter of
+        # budget to have room for random deviation of buckets sizes.
+        record_size = dtype.itemsize
+        bucket_len = max(1, memory_budget // (4 * record_size))
+        buckets_number = max(1, -(-records_len // bucket_len))
+        # Scatter records into buckets.
         time1 = datetime.today()
-        with open(self.file_dumper.file_path, 'r', encoding='utf-8', newline='') as file:
-            records = file.readlines()
-        records_len = len(records)
+        sorting_mappings = self.producer.get_sorting_mappings()
+        min_values, max_values = self.file_dumper.scatter_records_to_buckets(dtype, buckets_number, bucket_len,
+                                                                             random_state, valid_masks,
+                                                                             sorting_mappings)
+        self.dump_vocabulary_features(logger, sorting_mappings)
         time2 = datetime.today()
-        logger.debug("  read %d records from '%s' in %s", records_len, self.file_dumper.file_path, time2-time1)
-        # Shuffle records.
-        random.shuffle(records)
+        logger.debug("  scatter %d records from '%s' into %d buckets in %s", records_len, self.file_dumper.folder,
+                     buckets_number, time2-time1)
+        # Shuffle buckets and split to train and test. Both parts should have the same types of columns.
+        records_dtype = get_narrowed_dtype(list(self.producer.features.__slots__), min_values, max_values)
+        train_len = int(records_len * train_ratio)
+        train_len, test_len = self.file_dumper.write_buckets_as_train_test(dtype, buckets_number, train_len,
+                                                                           records_dtype, random_state)
         time3 = datetime.today()
-        logger.debug("  shuffle %d records in %s", records_len, time3-time2)
-        # Split to train and test.
-        train_len = int(len(records) * train_ratio)
-        train_records = records[0: train_len]
-        test_records = records[train_len:]
-        time4 = datetime.today()
-        logger.debug("  split records with ratio %f to train (%d) and test (%d) parts in %s", train_ratio, train_len,
-                     records_len-train_len, time4-time3)
-        # Write 2 records sets into files.
-        self.file_dumper.write_all_records_as_lines_with_head(train_records, test_records,
-                                                              self.producer.get_feature_names())
-        time5 = datetime.today()
-        logger.debug("  write %d train and %d test records into files in %s", len(train_records), len(test_records),
-                     time5-time4)
+        logger.debug("  shuffle and split records with ratio %f to train (%d) and test (%d) files with %d bytes per "
+                     "record (instead of %d) in %s", train_ratio, train_len, test_len, records_dtype.itemsize,
+                     record_size, time3-time2)
+        return train_len + test_len
 
     def get_records(self):
         return self._records
@@ -1,4 +1,5 @@
 import numpy as np
+import zlib
 from analyzer.record_type import RecordType
 from analyzer.git_dao import *
 
@@ -13,8 +14,17 @@ class Features(object):
     Each field is 'int' type with index of related feature in record.
     Should be extended with `__slots__ = Features.__slots__ + ('FOO',)`.
     Vocabulary based features should have "V_" prefix.
+    Vocabulary based feature may be hashed into fixed number of buckets instead of keeping vocabulary of all met items.
+    Declare it with `HASH_BUCKETS = {'V_FOO': 1024}` in subclass. Hashed feature value is index of bucket.
+    Each feature is 'DEFAULT_DTYPE' integer. Features which may have bigger values should be declared in subclass with
+    `DTYPES = dict(Features.DTYPES, FOO=np.int32)`. Records are structured numpy arrays with field of declared type per
+    feature (named as feature), so wide features don't widen other ones. Types are narrowed by observed values in
+    train/test files (see 'RecordsHandler.finalize_records_file').
     """
     __slots__ = ('RC_ID',)
+    HASH_BUCKETS = {}  # Feature name -> buckets number for hashed vocabulary features.
+    DEFAULT_DTYPE = np.int16
+    DTYPES = {'RC_ID': np.int32}  # Feature name -> numpy integer type if it is not 'DEFAULT_DTYPE'.
 
     def __init__(self):
         counter = 0
@@ -27,16 +37,28 @@ def is_vocabulary_feature(feature_name: str) -> bool:
     return feature_name.startswith("V_")
 
 
+def get_hash_bucket(vocabulary_item: str, buckets_number: int) -> int:
+    """
+    Maps vocabulary item into bucket. Uses CRC32 because built-in 'hash' of strings is salted per process.
+    :param vocabulary_item: Value from vocabulary.
+    :param buckets_number: Number of buckets.
+    :return: Index of bucket.
+    """
+    return zlib.crc32(vocabulary_item.encode('utf-8')) % buckets_number
+
+
 class RecordsProducer(object):
     """
     Base class to parse specific set of features from git DAO-s.
-    Provides ability to keep features for one record in Numpy array of pre-known size, build template for such record
-    and set values into record array with `record[self.features.FOO] = bar` syntax.
+    Provides ability to keep features for one record in Numpy structured scalar of pre-known type, build template for
+    such record and set values into record with `record[self.features.FOO] = bar` syntax. Columns of records are set
+    with `records[self.names[self.features.FOO]] = bar` syntax.
     Defining one feature takes constant time and doesn't depend (very) from amount of features.
-    Also it handles vocabulary-based features. See `add_vocabulary_feature_value` method.
+    Also it handles vocabulary-based features (including hashed ones). See `add_vocabulary_feature_value` method.
     To override. Keep in mind that amount of time required for analyzing very depends from this class implementation.
     """
-    __slots__ = ('record_type', 'features', 'features_number', 'vocabulary_features',)
+    __slots__ = ('record_type', 'features', 'features_number', 'vocabulary_features', 'hash_buckets', 'names',
+                 'dtypes', 'dtype',)
 
     def __init__(self, record_type: RecordType, features: Features):
         self.record_type = record_type
@@ -44,47 +66,184 @@ class RecordsProducer(object):
         self.features_number = len(features.__slots__)
         self.vocabulary_features = np.empty(self.features_number, dtype=object)
         self.vocabulary_features.fill(None)
+        self.names = features.__slots__  # Names of features in order of indexes, i.e. names of records fields.
+        self.dtypes = [np.dtype(features.DTYPES.get(x, features.DEFAULT_DTYPE)) for x in features.__slots__]
+        self.dtype = np.dtype(list(zip(self.names, self.dtypes)))  # Structured type of produced records.
+        self.hash_buckets = [0] * self.features_number  # 0 means that feature is not hashed.
+        for feature_name, buckets_number in features.HASH_BUCKETS.items():
+            assert is_vocabulary_feature(feature_name), "Only vocabulary features may be hashed, got %s" % feature_name
+            max_value = np.iinfo(self.dtypes[getattr(features, feature_name)]).max
+            assert 0 < buckets_number <= max_value + 1, "Wrong buckets number for %s" % feature_name
+            self.hash_buckets[getattr(features, feature_name)] = buckets_number
 
     def get_feature_names(self) -> list:
         return [k for k in self.features.__slots__][1:]  # First name - name of output class.
 
     def get_row_container(self) -> np.ndarray:
         """
-        :return: Numpy array for one record with 0 value for all features.
+        :return: Numpy structured scalar for one record with 0 value for all features.
+        """
+        return np.zeros(1, dtype=self.dtype)[0]
+
+    def get_rows_container(self, rows_number: int) -> np.ndarray:
+        """
+        :param rows_number: Number of records.
+        :return: Structured numpy array for specified number of records with 0 value for all features.
         """
-        return np.zeros(self.features_number, dtype=np.int16)
+        return np.zeros(rows_number, dtype=self.dtype)
 
     def add_vocabulary_feature_value(self, feature: int, vocabulary_item: str, record: np.ndarray):
         """
         Adds into inner 'vocabulary_features' numpy 2D array vocabulary feature.
+        For hashed feature (see 'Features.HASH_BUCKETS') just sets index of bucket and doesn't keep vocabulary.
+        Not thread-safe, each thread should use own producer (see 'merge_vocabularies').
         :param feature: Feature index. Should has "V_" prefix.
         :param vocabulary_item: Value from vocabulary.
         :param record: Record to set feature value into.
         """
+        record[feature] = self.get_vocabulary_feature_value(feature, vocabulary_item)
+
+    def get_vocabulary_feature_value(self, feature: int, vocabulary_item: str) -> int:
+        """
+        Returns value of vocabulary feature, i.e. index in vocabulary or index of bucket for hashed feature.
+        Adds item into vocabulary if it is not there yet. See 'add_vocabulary_feature_value'.
+        :param feature: Feature index. Should has "V_" prefix.
+        :param vocabulary_item: Value from vocabulary.
+        :return: Value of feature.
+        """
+        buckets_number = self.hash_buckets[feature]
+        if buckets_number > 0:
+            return get_hash_bucket(vocabulary_item, buckets_number)
         feature_vocabulary: dict = self.vocabulary_features[feature]
         if feature_vocabulary is None:
             feature_vocabulary = dict()
             feature_vocabulary[vocabulary_item] = 0  # Index is 0 because dictionary has only one key.
             self.vocabulary_features[feature] = feature_vocabulary
-            record[feature] = 0  # It is index in feature_vocabulary.
-        else:
-            item_index = feature_vocabulary.get(vocabulary_item)
-            if item_index is None:  # No such item in vocabulary.
-                item_index = len(feature_vocabulary)  # Dictionary is appended only so unique index = length.
-                feature_vocabulary[vocabulary_item] = item_index
-            record[feature] = item_index
+            return 0  # It is index in feature_vocabulary.
+        item_index = feature_vocabulary.get(vocabulary_item)
+        if item_index is None:  # No such item in vocabulary.
+            item_index = len(feature_vocabulary)  # Dictionary is appended only so unique index = length.
+            feature_vocabulary[vocabulary_item] = item_index
+        return item_index
+
+    def pop_vocabularies(self) -> list:
+        """
+        Returns vocabulary features as lists of items in order of indexes and cleans them.
+        Hashed features don't have vocabularies, so they are None always and don't need merge.
+        :return: List with list of items or None per feature.
+        """
+        result = []
+        for feature_vocabulary in self.vocabulary_features:
+            if feature_vocabulary is None:
+                result.append(None)
+            else:
+                result.append(sorted(feature_vocabulary, key=feature_vocabulary.get))
+        self.vocabulary_features.fill(None)
+        return result
+
+    def load_vocabularies(self, vocabularies: list):
+        """
+        Replaces vocabulary features with specified ones keeping indexes of items, so records produced before (i.e. in
+        previous analyzing) stay valid and new items get next indexes.
+        :param vocabularies: List with list of items in order of indexes or None per feature.
+        """
+        for feature, items in enumerate(vocabularies):
+            self.vocabulary_features[feature] = None if items is None else {x: i for i, x in enumerate(items)}
+
+    def merge_vocabularies(self, vocabularies: list, records: np.ndarray):
+        """
+        Merges vocabularies from other producer (see 'pop_vocabularies') into own 'vocabulary_features' and remaps
+        indexes of vocabulary features in records produced by other producer.
+        New items get next indexes in order of merges, i.e. in order of first meeting in analyzed items, so indexes
+        don't depend from how items were split into chunks. Vocabularies are sorted only once on finalizing (see
+        'get_sorting_mappings').
+        :param vocabularies: List with list of items or None per feature.
+        :param records: Structured numpy array of records produced by other producer.
+        """
+        for feature, items in enumerate(vocabularies):
+            if items is None:
+                continue
+            name = self.names[feature]
+            feature_vocabulary: dict = self.vocabulary_features[feature]
+            if feature_vocabulary is None:
+                feature_vocabulary = dict()
+                self.vocabulary_features[feature] = feature_vocabulary
+            # New items get next indexes. Dictionary is appended only so unique index = length.
+            mapping = np.array([feature_vocabulary.setdefault(x, len(feature_vocabulary)) for x in items],
+                               dtype=self.dtypes[feature])
+            if len(records) > 0:
+                records[name] = mapping[records[name]]
+
+    def get_sorting_mappings(self) -> dict:
+        """
+        Calculates how to remap indexes of vocabulary features into indexes in sorted vocabularies. Sorted vocabularies
+        don't depend from order of analyzed items, so they are dumped (see 'RecordsHandler.finalize_records_file').
+        :return: Dictionary of feature index to numpy array with index in sorted vocabulary per index of item.
+        """
+        result = dict()
+        for feature, feature_vocabulary in enumerate(self.vocabulary_features):
+            if feature_vocabulary is None:
+                continue
+            items = np.empty(len(feature_vocabulary), dtype=object)
+            items[list(feature_vocabulary.values())] = list(feature_vocabulary.keys())
+            mapping = np.empty(len(items), dtype=np.int64)
+            mapping[np.argsort(items, kind='stable')] = np.arange(len(items))
+            result[feature] = mapping
+        return result
 
     @staticmethod
     def check_binary_line(line: str) -> bool:
-        return "\x00" in line or any(ord(x) > 0x80 for x in line)
+        """
+        Checks that line is part of binary file (which git shows as text), i.e. it has NUL character or bytes which
+        are not UTF-8 ones (they are decoded as replacement character). Non-ASCII text isn't binary.
+        :param line: Decoded line.
+        :return: True if line is binary one.
+        """
+        return "\x00" in line or "\ufffd" in line
+
+    def analyze_git_file_records(self, file: GitFile, is_diff_hunk=False, is_piece_kept=None) -> np.ndarray:
+        """
+        Analyzes specified 'GitFile' at once. Allocates one structured numpy array with record per line to analyze and
+        fills it with 'fill_git_file', 'fill_git_piece' and 'fill_git_lines' methods: file-level and piece-level
+        features are set into all rows of file and piece at once, line-level features are set by columns.
+        Produces the same records as 'analyze_git_file_recursively' but without numpy scalar per line.
+        :param file: 'GitFile' to analyze.
+        :param is_diff_hunk: Flag that we are interested only in last line in first piece in file.
+        :param is_piece_kept: Optional function which takes index of piece in file and returns False if records of
+        piece shouldn't be produced (see 'RecordsHandler.analyze').
+        :return: Structured numpy array with parsed records.
+        """
+        pieces_lines = []
+        rows_number = 0
+        for i, piece in enumerate(file.pieces):
+            if is_piece_kept is not None and not is_piece_kept(i):
+                continue
+            # Set what to handle.
+            lines = piece.lines
+            if is_diff_hunk:
+                lines = lines[-1:]
+            if len(lines) == 0 or self.check_binary_line(lines[0].line):
+                continue  # Don't check binary files.
+            pieces_lines.append((piece, lines))
+            rows_number += len(lines)
+        records = self.get_rows_container(rows_number)
+        self.fill_git_file(records, file)  # Even if there are no lines, to get the same vocabularies.
+        begin = 0
+        for piece, lines in pieces_lines:
+            end = begin + len(lines)
+            piece_records = records[begin:end]  # View, so changes are made right in 'records'.
+            self.fill_git_piece(piece_records, piece)
+            self.fill_git_lines(piece_records, lines)
+            begin = end
+        return records
 
     def analyze_git_file_recursively(self, file: GitFile, is_diff_hunk=False) -> list:
         """
-        Analyzes specified 'GitFile'. Returns list of numpy arrays-records.
-        Don't use 2D numpy array because need to append and extend list of records.
+        Analyzes specified 'GitFile'. Returns list of numpy structured scalars-records.
+        Don't use numpy array because need to append and extend list of records.
         :param file: 'GitFile' to analyze.
         :param is_diff_hunk: Flag that we are interested only in last line in first piece in file.
-        :return: List of numpy arrays with parsed records.
+        :return: List of numpy structured scalars with parsed records.
         """
         records = []
         file_level_features = self.analyze_git_file(file)
@@ -95,41 +254,76 @@ class RecordsProducer(object):
             if is_diff_hunk:
                 lines = lines[-1:]
             # Handle chosen lines.
-            is_first_line = True
-            for line in lines:
-                if is_first_line:
-                    is_first_line = False
-                    if self.check_binary_line(line.line) is None:
-                        break  # Don't check binary files.
-                line_level_features = self.analyze_git_line(piece_level_features, line)
-                records.append(line_level_features)  # Save features.
+            if len(lines) == 0 or self.check_binary_line(lines[0].line):
+                continue  # Don't check binary files.
+            records.extend(self.analyze_git_lines(piece_level_features, lines))  # Save features.
         return records
 
+    # To override. By default uses 'analyze_git_file'.
+    def fill_git_file(self, records: np.ndarray, file: GitFile):
+        """
+        Sets file-level features into all records of specified 'GitFile'.
+        :param records: Structured numpy array with all records of file. May be empty.
+        :param file: 'GitFile' to parse.
+        """
+        records[:] = self.analyze_git_file(file)
+
+    # To override. By default uses 'analyze_git_piece'.
+    def fill_git_piece(self, records: np.ndarray, piece: GitPiece):
+        """
+        Sets piece-level features into all records of specified 'GitPiece'.
+        Called only for pieces with lines to analyze. Records are for the last 'len(records)' lines of piece (i.e. all
+        lines or only the last line for diff hunk), so here all lines of piece may be parsed at once if it is required.
+        :param records: Structured numpy array with records of piece lines and already set file-level features.
+        :param piece: 'GitPiece' to parse.
+        """
+        records[:] = self.analyze_git_piece(records[0], piece)
+
+    # To override. By default uses 'analyze_git_lines'.
+    def fill_git_lines(self, records: np.ndarray, lines: GitPieceLines):
+        """
+        Sets line-level features into records of specified lines. Better to set them by columns.
+        :param records: Structured numpy array with record per line and already set file-level and piece-level features.
+        :param lines: 'GitPieceLines' to parse.
+        """
+        records[:] = self.analyze_git_lines(records[0], lines)
+
     # To override.
     def analyze_git_file(self, file: GitFile) -> np.ndarray:
         """
         Analyzes specified 'GitFile'.
         :param file: 'GitFile' to parse.
-        :return: 1D numpy array with parsed record.
+        :return: Numpy structured scalar with parsed record.
         """
-        return self.features_keeper.get_row_container()
+        return self.get_row_container()
 
     # To override.
     def analyze_git_piece(self, file_level_features, piece: GitPiece) -> np.ndarray:
         """
         Analyzes specified 'GitPiece'.
-        :param file_level_features: Numpy 1D array of already analyzed features.
+        :param file_level_features: Numpy structured scalar of already analyzed features.
         :param piece: 'GitPiece' to parse.
-        :return: 1D numpy array with parsed record.
+        :return: Numpy structured scalar with parsed record.
+        """
+        return file_level_features.copy()
+
+    # To override.
+    def analyze_git_lines(self, piece_level_features, lines: GitPieceLines) -> np.ndarray:
+        """
+        Analyzes specified lines of one 'GitPiece'. By default calls 'analyze_git_line' for each line.
+        Override to get line features for all lines at once from 'GitPieceLines' arrays.
+        :param piece_level_features: Numpy structured scalar of already analyzed features.
+        :param lines: 'GitPieceLines' to parse.
+        :return: Structured numpy array with parsed record per line.
         """
-        return np.copy(file_level_features)
+        return np.array([self.analyze_git_line(piece_level_features, line) for line in lines], dtype=self.dtype)
 
     # To override.
     def analyze_git_line(self, piece_level_features, line: GitLine) -> np.ndarray:
         """
         Analyzes specified 'GitLine'.
-        :param piece_level_features: Numpy 1D array of already analyzed features.
+        :param piece_level_features: Numpy structured scalar of already analyzed features.
         :param line: 'GitLine' to parse.
-        :return: 1D numpy array with parsed record.
+        :return: Numpy structured scalar with parsed record.
         """
-        return np.copy(piece_level_features)
+        return piece_level_features.copy()
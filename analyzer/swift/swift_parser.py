@@ -1,12 +1,49 @@
 from pygments import lex
 from pygments.lexers.objective import SwiftLexer
+from pygments.token import Text, Punctuation, Comment, Keyword
 
 from analyzer.swift.swift_features import SwiftFeatures
+from analyzer.swift.swift_tokenizer import *
+
+
+def get_token_category(token_type) -> int:
+    """
+    Maps pygments token type to 'TOKEN_XXX' category of 'SwiftTokenizer'.
+    """
+    if token_type is Text:
+        return TOKEN_TEXT
+    elif token_type is Punctuation:
+        return TOKEN_PUNCTUATION
+    elif token_type is Comment.Single:
+        return TOKEN_COMMENT_SINGLE
+    elif token_type is Comment.Multiline:
+        return TOKEN_COMMENT_MULTILINE
+    elif token_type is Keyword.Declaration:
+        return TOKEN_KEYWORD_DECLARATION
+    elif token_type in Keyword:
+        return TOKEN_KEYWORD
+    return TOKEN_OTHER
 
 
 class SwiftParser:
-    def __init__(self):
+    def __init__(self, is_pygments: bool = False):
+        """
+        :param is_pygments: Flag to use pygments 'SwiftLexer' instead of 'SwiftTokenizer'. Both give the same result
+        but 'SwiftTokenizer' is much faster.
+        """
         self.lexer = SwiftLexer()
+        self.tokenizer = SwiftTokenizer()
+        self.is_pygments = is_pygments
+
+    def tokenize(self, line: str) -> list:
+        """
+        Splits line into tokens.
+        :param line: Line to split.
+        :return: List of tuples with 'TOKEN_XXX' category and value.
+        """
+        if self.is_pygments:
+            return [(get_token_category(token_type), value) for token_type, value in lex(line, self.lexer)]
+        return self.tokenizer.tokenize(line)
 
     def parse(self, lines: [str]) -> [SwiftFeatures]:
         is_function_scope = False
@@ -23,7 +60,7 @@ class SwiftParser:
         line_results = []
         comments_len = 0
         for line in lines:
-            tokens = lex(line, self.lexer)
+            tokens = self.tokenize(line)
             features = SwiftFeatures()
             features.line = line.rstrip()
             tokens_count = 0
@@ -31,28 +68,28 @@ class SwiftParser:
 
             for token in tokens:
                 tokens_count += 1
-                token_type = str(token[0])
+                token_type = token[0]
                 value = token[1]
 
-                if is_single_comment and token_type != 'Token.Comment.Single':
+                if is_single_comment and token_type != TOKEN_COMMENT_SINGLE:
                     is_single_comment = False
                     features.comment_len = comments_len
                     comments_len = 0
 
-                elif else_captured and token_type not in ['Token.Text', 'Token.Punctuation']:
+                elif else_captured and token_type != TOKEN_TEXT and token_type != TOKEN_PUNCTUATION:
                     else_captured = False
                     is_condition_scope = False
 
-                elif is_multiline_comment and token_type != 'Token.Comment.Multiline':
+                elif is_multiline_comment and token_type != TOKEN_COMMENT_MULTILINE:
                     comments_len += len(value)
                     features.has_comment = 1
 
-                elif token_type == 'Token.Text':
+                elif token_type == TOKEN_TEXT:
                     if value.isspace() and is_before_any_token:
                         features.spaces_count = len(value)
                         is_before_any_token = False
 
-                elif token_type == 'Token.Comment.Multiline':
+                elif token_type == TOKEN_COMMENT_MULTILINE:
                     features.has_comment = 1
                     if '/*' in value:
                         is_multiline_comment = True
@@ -65,7 +102,7 @@ class SwiftParser:
                     elif is_multiline_comment:
                         comments_len += len(value)
 
-                elif token_type == 'Token.Comment.Single':
+                elif token_type == TOKEN_COMMENT_SINGLE:
                     features.has_comment = 1
                     if '//' in value:
                         is_single_comment = True
@@ -73,9 +110,9 @@ class SwiftParser:
                     elif is_single_comment:
                         comments_len += len(value)
 
-                elif 'Token.Keyword' in token_type:
+                elif token_type == TOKEN_KEYWORD or token_type == TOKEN_KEYWORD_DECLARATION:
                     features.keywords_count += 1
-                    if 'Declaration' in token_type:
+                    if token_type == TOKEN_KEYWORD_DECLARATION:
                         features.is_declaration = 1
                         if value == 'func':
                             is_function_scope = 1
@@ -102,7 +139,7 @@ class SwiftParser:
                         is_loop_scope = True
                         scope_stack.append('loop')
 
-                elif token_type == 'Token.Punctuation':
+                elif token_type == TOKEN_PUNCTUATION:
                     if is_pierce_expected and value != '->':
                         is_pierce_expected = False
 
@@ -0,0 +1,49 @@
+from analyzer.record_type import RecordType
+from analyzer.git_dao import *
+import numpy as np
+from analyzer.git.git_producer import GitFeatures, GitRecordsProducer
+from analyzer.swift.swift_parser import SwiftParser
+
+
+class SwiftRecordFeatures(GitFeatures):
+    __slots__ = GitFeatures.__slots__ + ('SWIFT_IN_LAMBDA', 'SWIFT_IN_FUNCTION', 'SWIFT_IN_GUARD', 'SWIFT_IN_LOOP',
+                                         'SWIFT_KEYWORDS_COUNT', 'SWIFT_HAS_COMMENT', 'SWIFT_COMMENT_LENGTH',
+                                         'SWIFT_IN_CONDITION', 'SWIFT_HAS_CONDITION', 'SWIFT_IS_DECLARATION',
+                                         'SWIFT_HAS_CLASS_KEYWORD', 'SWIFT_HAS_FUNC_KEYWORD',
+                                         'SWIFT_HAS_GUARD_KEYWORD', 'SWIFT_SPACES_COUNT',)
+    DTYPES = dict(GitFeatures.DTYPES, SWIFT_COMMENT_LENGTH=np.int32)
+
+
+class SwiftRecordsProducer(GitRecordsProducer):
+    """
+    Produces 'SwiftParser' features of Swift files together with common features of 'GitRecordsProducer'.
+    """
+    __slots__ = ('parser', 'parser_features',)
+
+    def __init__(self):
+        super().__init__(RecordType.SWIFT, SwiftRecordFeatures())
+        self.parser = SwiftParser()
+        features = self.features
+        # Names of record features in order of 'SwiftParser' features, see 'get_parser_values'.
+        parser_features = [features.SWIFT_IN_LAMBDA, features.SWIFT_IN_FUNCTION, features.SWIFT_IN_GUARD,
+                           features.SWIFT_IN_LOOP, features.SWIFT_KEYWORDS_COUNT, features.SWIFT_HAS_COMMENT,
+                           features.SWIFT_COMMENT_LENGTH, features.SWIFT_IN_CONDITION,
+                           features.SWIFT_HAS_CONDITION, features.SWIFT_IS_DECLARATION,
+                           features.SWIFT_HAS_CLASS_KEYWORD, features.SWIFT_HAS_FUNC_KEYWORD,
+                           features.SWIFT_HAS_GUARD_KEYWORD, features.SWIFT_SPACES_COUNT]
+        self.parser_features = [self.names[x] for x in parser_features]
+
+    @staticmethod
+    def get_parser_values(line_features) -> tuple:
+        return (line_features.in_lambda, line_features.in_function, line_features.in_guard, line_features.in_loop,
+                line_features.keywords_count, line_features.has_comment, line_features.comment_len,
+                line_features.in_condition, line_features.has_condition, line_features.is_declaration,
+                line_features.has_class_keyword, line_features.has_func_keyword, line_features.has_guard_keyword,
+                line_features.spaces_count)
+
+    def fill_git_piece(self, records: np.ndarray, piece: GitPiece):
+        super().fill_git_piece(records, piece)
+        # Parse all lines of piece at once to keep parser state (scopes and comments) between lines.
+        lines_features = self.parser.parse([x.line for x in piece.lines])
+        lines_features = lines_features[len(lines_features) - len(records):]
+        records[self.parser_features] = [self.get_parser_values(x) for x in lines_features]
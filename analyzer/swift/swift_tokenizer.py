@@ -0,0 +1,177 @@
+import re
+
+from analyzer.lexing import prepare_line
+
+
+# Types of tokens which 'SwiftParser' distinguishes. Pygments 'SwiftLexer' token types are mapped to them by
+# 'get_token_category' function.
+TOKEN_TEXT = 0  # Only 'Token.Text', i.e. line break in 'root' state.
+TOKEN_PUNCTUATION = 1
+TOKEN_COMMENT_SINGLE = 2
+TOKEN_COMMENT_MULTILINE = 3
+TOKEN_KEYWORD = 4  # Any keyword except declaration.
+TOKEN_KEYWORD_DECLARATION = 5
+TOKEN_OTHER = 6  # Whitespaces, names, literals, operators, special comments, preprocessor directives, errors.
+
+
+def words(items: tuple) -> str:
+    return r'(?:%s)\b' % '|'.join(re.escape(x) for x in items)
+
+
+# Rules are the same as in pygments 'SwiftLexer' (pygments 2.x), in the same order and with the same token boundaries.
+# Each rule is a tuple of regular expression, token category (or tuple of categories for groups of expression) and
+# new state. Rules which differ only by pygments token type (like builtin names and usual names) are omitted.
+COMMENT_RULES = [
+    (r':param: [a-zA-Z_]\w*|:returns?:|(FIXME|MARK|TODO):', TOKEN_OTHER, None),
+]
+KEYWORDS_RULES = [
+    (words(('as', 'async', 'await', 'break', 'case', 'catch', 'continue', 'default', 'defer', 'do', 'else',
+            'fallthrough', 'for', 'guard', 'if', 'in', 'is', 'repeat', 'return', '#selector', 'switch', 'throw',
+            'try', 'where', 'while')), TOKEN_KEYWORD, None),
+    (r'@availability\([^)]+\)', TOKEN_KEYWORD, None),
+    (words(('associativity', 'convenience', 'dynamic', 'didSet', 'final', 'get', 'indirect', 'infix', 'inout',
+            'lazy', 'left', 'mutating', 'none', 'nonmutating', 'optional', 'override', 'postfix', 'precedence',
+            'prefix', 'Protocol', 'required', 'rethrows', 'right', 'set', 'throws', 'Type', 'unowned', 'weak',
+            'willSet', '@availability', '@autoclosure', '@noreturn', '@NSApplicationMain', '@NSCopying',
+            '@NSManaged', '@objc', '@UIApplicationMain', '@IBAction', '@IBDesignable', '@IBInspectable',
+            '@IBOutlet')), TOKEN_KEYWORD, None),
+    (r'(as|dynamicType|false|is|nil|self|Self|super|true|__COLUMN__|__FILE__|__FUNCTION__|__LINE__|_'
+     r'|#(?:file|line|column|function))\b', TOKEN_KEYWORD, None),
+    (r'import\b', TOKEN_KEYWORD_DECLARATION, 'module'),
+    (r'(class|enum|extension|struct|protocol)(\s+)([a-zA-Z_]\w*)',
+     (TOKEN_KEYWORD_DECLARATION, TOKEN_OTHER, TOKEN_OTHER), None),
+    (r'(func)(\s+)([a-zA-Z_]\w*)', (TOKEN_KEYWORD_DECLARATION, TOKEN_OTHER, TOKEN_OTHER), None),
+    (r'(var|let)(\s+)([a-zA-Z_]\w*)', (TOKEN_KEYWORD_DECLARATION, TOKEN_OTHER, TOKEN_OTHER), None),
+    (words(('actor', 'associatedtype', 'class', 'deinit', 'enum', 'extension', 'func', 'import', 'init', 'internal',
+            'let', 'operator', 'private', 'protocol', 'public', 'static', 'struct', 'subscript', 'typealias',
+            'var')), TOKEN_KEYWORD_DECLARATION, None),
+]
+ROOT_RULES = [
+    (r'\n', TOKEN_TEXT, None),
+    (r'\s+', TOKEN_OTHER, None),
+    (r'//', TOKEN_COMMENT_SINGLE, 'comment-single'),
+    (r'/\*', TOKEN_COMMENT_MULTILINE, 'comment-multi'),
+    (r'#(if|elseif|else|endif|available)\b', TOKEN_OTHER, 'preproc'),
+] + KEYWORDS_RULES + [
+    (r'\$\d+', TOKEN_OTHER, None),
+    (r'0b[01_]+', TOKEN_OTHER, None),
+    (r'0o[0-7_]+', TOKEN_OTHER, None),
+    (r'0x[0-9a-fA-F_]+', TOKEN_OTHER, None),
+    (r'[0-9][0-9_]*(\.[0-9_]+[eE][+\-]?[0-9_]+|\.[0-9_]*|[eE][+\-]?[0-9_]+)', TOKEN_OTHER, None),
+    (r'[0-9][0-9_]*', TOKEN_OTHER, None),
+    (r'"""', TOKEN_OTHER, 'string-multi'),
+    (r'"', TOKEN_OTHER, 'string'),
+    (r'[(){}\[\].,:;=@#`?]|->|[<&?](?=\w)|(?<=\w)[>!?]', TOKEN_PUNCTUATION, None),
+    (r'[/=\-+!*%<>&|^?~]+', TOKEN_OTHER, None),
+    (r'[a-zA-Z_]\w*', TOKEN_OTHER, None),
+]
+STRING_COMMON_RULES = [
+    (r'\\\(', TOKEN_OTHER, 'string-intp'),
+    (r"""\\['"\\nrt]|\\x[0-9a-fA-F]{2}|\\[0-7]{1,3}|\\u[0-9a-fA-F]{4}|\\U[0-9a-fA-F]{8}""", TOKEN_OTHER, None),
+    (r'[^\\"]+', TOKEN_OTHER, None),
+    (r'\\', TOKEN_OTHER, None),
+]
+STATES_RULES = {
+    'root': ROOT_RULES,
+    'comment-single': [
+        (r'\n', TOKEN_OTHER, '#pop'),
+    ] + COMMENT_RULES + [
+        (r'[^\n]+', TOKEN_COMMENT_SINGLE, None),
+    ],
+    'comment-multi': COMMENT_RULES + [
+        (r'[^*/]+', TOKEN_COMMENT_MULTILINE, None),
+        (r'/\*', TOKEN_COMMENT_MULTILINE, '#push'),
+        (r'\*/', TOKEN_COMMENT_MULTILINE, '#pop'),
+        (r'[*/]+', TOKEN_COMMENT_MULTILINE, None),
+    ],
+    'module': [
+        (r'\n', TOKEN_OTHER, '#pop'),
+        (r'[a-zA-Z_]\w*', TOKEN_OTHER, None),
+    ] + ROOT_RULES,
+    'preproc': [
+        (r'\n', TOKEN_OTHER, '#pop'),
+    ] + KEYWORDS_RULES + [
+        (r'[A-Za-z]\w*', TOKEN_OTHER, None),
+    ] + ROOT_RULES,
+    'string': [
+        (r'"', TOKEN_OTHER, '#pop'),
+    ] + STRING_COMMON_RULES,
+    'string-multi': [
+        (r'"""', TOKEN_OTHER, '#pop'),
+    ] + STRING_COMMON_RULES,
+    'string-intp': [
+        (r'\(', TOKEN_OTHER, '#push'),
+        (r'\)', TOKEN_OTHER, '#pop'),
+    ] + ROOT_RULES,
+}
+
+
+def compile_state(rules: list) -> (object, dict):
+    """
+    Compiles rules of state into one master regular expression where each rule is a group.
+    :param rules: List of rules.
+    :return: Tuple with 'match' method of compiled expression and dictionary of rule group index to tuple of
+    category, new state and group index (for rules with categories per group).
+    """
+    patterns = []
+    group_to_rule = dict()
+    group_index = 1
+    for pattern, category, new_state in rules:
+        patterns.append("(%s)" % pattern)
+        group_to_rule[group_index] = (category, new_state, group_index)
+        group_index += re.compile(pattern).groups + 1
+    return re.compile("|".join(patterns), re.MULTILINE).match, group_to_rule
+
+
+class SwiftTokenizer(object):
+    """
+    Fast replacement of pygments 'SwiftLexer' for 'SwiftParser'. Each state of lexer is matched with one master
+    regular expression and tokens are returned with 'TOKEN_XXX' categories instead of pygments token types.
+    Gives the same tokens (by boundaries and categories) as 'SwiftLexer'.
+    """
+    __slots__ = ('states',)
+
+    def __init__(self):
+        self.states = {name: compile_state(rules) for name, rules in STATES_RULES.items()}
+
+    def tokenize(self, line: str) -> list:
+        """
+        Splits line into tokens. Like pygments, lexes line from 'root' state.
+        :param line: Line to tokenize.
+        :return: List of tuples with 'TOKEN_XXX' category and value.
+        """
+        text = prepare_line(line)
+        tokens = []
+        states = self.states
+        stack = ['root']
+        match, group_to_rule = states['root']
+        pos = 0
+        text_len = len(text)
+        while pos < text_len:
+            m = match(text, pos)
+            if m is None:
+                if text[pos] == '\n':  # At EOL reset state to 'root'.
+                    stack = ['root']
+                    match, group_to_rule = states['root']
+                tokens.append((TOKEN_OTHER, text[pos]))
+                pos += 1
+                continue
+            category, new_state, group_index = group_to_rule[m.lastindex]
+            if type(category) is int:
+                tokens.append((category, m.group()))
+            else:
+                for i, group_category in enumerate(category, group_index + 1):
+                    value = m.group(i)
+                    if value:
+                        tokens.append((group_category, value))
+            pos = m.end()
+            if new_state is not None:
+                if new_state == '#pop':
+                    if len(stack) > 1:
+                        stack.pop()
+                elif new_state == '#push':
+                    stack.append(stack[-1])
+                else:
+                    stack.append(new_state)
+                match, group_to_rule = states[stack[-1]]
+        return tokens
@@ -1,22 +1,91 @@
 from pygments import lex
+from pygments.lexer import RegexLexer
 from pygments.lexers.html import XmlLexer
+from pygments.token import Text, Whitespace, Name, String, Comment
 
+from analyzer.lexing import prepare_line
 from analyzer.xml.xml_features import XmlFeatures
 
 
+class XmlLinesLexer(RegexLexer):
+    """
+    The same lexer as 'XmlLexer' but tokens never contain line break, so each line is lexed from 'root' state exactly
+    as if it is lexed separately (RegexLexer resets state to 'root' on unmatched line break).
+    """
+    tokens = {
+        'root': [
+            (r'[^<&\s]+', Text),
+            (r'[^<&\S\n]+', Whitespace),
+            (r'&\S*?;', Name.Entity),
+            (r'\<\!\[CDATA\[[^\n]*?\]\]\>', Comment.Preproc),
+            (r'<!--[^\n]*?-->', Comment.Multiline),
+            (r'<\?[^\n]*?\?>', Comment.Preproc),
+            (r'<![^>\n]*>', Comment.Preproc),
+            (r'<[^\S\n]*[\w:.-]+', Name.Tag, 'tag'),
+            (r'<[^\S\n]*/[^\S\n]*[\w:.-]+[^\S\n]*>', Name.Tag),
+        ],
+        'tag': [
+            (r'[^\S\n]+', Whitespace),
+            (r'[\w.:-]+[^\S\n]*=', Name.Attribute, 'attr'),
+            (r'/?[^\S\n]*>', Name.Tag, '#pop'),
+        ],
+        'attr': [
+            (r'[^\S\n]+', Whitespace),
+            (r'"[^\n]*?"', String, '#pop'),
+            (r"'[^\n]*?'", String, '#pop'),
+            (r'[^\s>]+', String, '#pop'),
+        ],
+    }
+
+
 class XmlParser:
-    def __init__(self):
+    def __init__(self, is_single_pass: bool = True):
+        """
+        :param is_single_pass: Flag to lex all lines at once (see 'lex_lines') instead of lexing each line separately.
+        """
         self.lexer = XmlLexer()
+        self.lines_lexer = XmlLinesLexer()
+        self.is_single_pass = is_single_pass
+
+    def lex_each_line(self, lines: [str]) -> [[]]:
+        return [list(lex(line, self.lexer)) for line in lines]
+
+    def lex_lines(self, lines: [str]) -> [[]]:
+        """
+        Lexes all lines at once and splits tokens by lines. Returns the same tokens as 'lex_each_line'.
+        :param lines: Lines to lex.
+        :return: List of tokens (tuples of type and value) per line.
+        """
+        prepared_lines = [prepare_line(x) for x in lines]
+        if any('\n' in x[:-1] for x in prepared_lines):
+            return self.lex_each_line(lines)  # Line with '\r' in the middle is lexed as few lines by 'XmlLexer'.
+        result = []
+        line_tokens = []
+        for _, token_type, value in self.lines_lexer.get_tokens_unprocessed("".join(prepared_lines)):
+            if value == '\n':
+                # 'XmlLexer' matches trailing whitespaces together with line break.
+                if line_tokens and line_tokens[-1][0] is Whitespace:
+                    line_tokens[-1] = (Whitespace, line_tokens[-1][1] + value)
+                else:
+                    line_tokens.append((token_type, value))
+                result.append(line_tokens)
+                line_tokens = []
+            else:
+                line_tokens.append((token_type, value))
+        return result
 
     def parse(self, lines: [str]) -> [XmlFeatures]:
+        if self.is_single_pass:
+            lines_tokens = self.lex_lines(lines)
+        else:
+            lines_tokens = self.lex_each_line(lines)
         nested_level = 0
         spaces_count = 0
         opened_comments = 0
         opened_tags = 0
         remaining_attribute = ''
         lineResults = []
-        for line in lines:
-            tokens = lex(line, self.lexer)
+        for line, tokens in zip(lines, lines_tokens):
             features = XmlFeatures()
             features.line = line.rstrip()
             is_before_open_tag = True
@@ -29,24 +98,24 @@ class XmlParser:
             comments_len = 0
             for token in tokens:
                 tokens_count += 1
-                token_type = str(token[0])
+                token_type = token[0]
                 value = token[1]
-                if token_type == 'Token.Name.Tag':
+                if token_type is Name.Tag:
                     if value[0] == '<' and value[1] != '/' and value[1] != '!':
                         features.tagsCount += 1
                         tags_len += value.__len__()
                         features.openedTagsCnt += 1
                     elif '</' in value or '/>' in value:
                         features.closedTagsCnt += 1
-                elif token_type == 'Token.Name.Attribute':
+                elif token_type is Name.Attribute:
                     features.attrCnt += 1
                     attrs_len += value.__len__()
                     remaining_attribute = value[:value.__len__() - 1]
-                elif token_type == 'Token.Literal.String':
+                elif token_type is String:
                     if remaining_attribute != '':
                         attrs_val_len += value.__len__()
                         remaining_attribute = ''
-                elif token_type == 'Token.Text':
+                elif token_type is Text:
                     if value.isspace() and is_before_open_tag:
                         is_before_open_tag = False
                         if value.__len__() > spaces_count:
@@ -55,7 +124,7 @@ class XmlParser:
                         elif value.__len__() < spaces_count:
                             nested_level -= 1
                             spaces_count = value.__len__()
-                elif token_type == 'Token.Comment':
+                elif token_type is Comment:
                     if value == '<!--':
                         features.openedCommentsCnt += 1
                     elif value == '-->':
@@ -65,7 +134,7 @@ class XmlParser:
 
             features.nestingLevel = nested_level
             if tokens_count == 1:
-                for token in lex(line, self.lexer):
+                for token in tokens:
                     if '<!--' in token[1]:
                         features.openedCommentsCnt += 1
                     elif '-->' in token[1]:
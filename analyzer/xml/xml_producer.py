@@ -0,0 +1,42 @@
+from analyzer.record_type import RecordType
+from analyzer.git_dao import *
+import numpy as np
+from analyzer.git.git_producer import GitFeatures, GitRecordsProducer
+from analyzer.xml.xml_parser import XmlParser
+
+
+class XmlRecordFeatures(GitFeatures):
+    __slots__ = GitFeatures.__slots__ + ('XML_TAGS_COUNT', 'XML_ATTRIBUTES_COUNT', 'XML_OPENED_TAGS_COUNT',
+                                         'XML_CLOSED_TAGS_COUNT', 'XML_OPENED_COMMENTS_COUNT',
+                                         'XML_CLOSED_COMMENTS_COUNT', 'XML_COMMENTS_COUNT', 'XML_IS_COMMENT',)
+
+
+class XmlRecordsProducer(GitRecordsProducer):
+    """
+    Produces 'XmlParser' features of XML files together with common features of 'GitRecordsProducer'.
+    """
+    __slots__ = ('parser', 'parser_features',)
+
+    def __init__(self):
+        super().__init__(RecordType.XML, XmlRecordFeatures())
+        self.parser = XmlParser()
+        features = self.features
+        # Names of record features in order of 'XmlParser' features, see 'get_parser_values'.
+        parser_features = [features.XML_TAGS_COUNT, features.XML_ATTRIBUTES_COUNT,
+                           features.XML_OPENED_TAGS_COUNT, features.XML_CLOSED_TAGS_COUNT,
+                           features.XML_OPENED_COMMENTS_COUNT, features.XML_CLOSED_COMMENTS_COUNT,
+                           features.XML_COMMENTS_COUNT, features.XML_IS_COMMENT]
+        self.parser_features = [self.names[x] for x in parser_features]
+
+    @staticmethod
+    def get_parser_values(line_features) -> tuple:
+        return (line_features.tagsCount, line_features.attrCnt, line_features.openedTagsCnt,
+                line_features.closedTagsCnt, line_features.openedCommentsCnt, line_features.closedCommentsCnt,
+                line_features.commentsCnt, line_features.isComment)
+
+    def fill_git_piece(self, records: np.ndarray, piece: GitPiece):
+        super().fill_git_piece(records, piece)
+        # Parse all lines of piece at once to keep parser state (opened tags and comments) between lines.
+        lines_features = self.parser.parse([x.line for x in piece.lines])
+        lines_features = lines_features[len(lines_features) - len(records):]
+        records[self.parser_features] = [self.get_parser_values(x) for x in lines_features]
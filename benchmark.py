@@ -0,0 +1,472 @@
+#!/usr/bin/env python
+
+import argparse
+import sys
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import tracemalloc
+import numpy as np
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from logging import Logger
+from analyzer.git_diff_parser import parse_git_diff, iter_git_diff
+from analyzer.analyzer import Analyzer, PullRequestItem
+from analyzer.record_type import RecordType
+from analyzer.records_handler import RecordsHandler
+from analyzer import csv_worker
+from analyzer.git.git_producer import GitRecordsProducer
+from analyzer.xml.xml_parser import XmlParser
+from analyzer.swift.swift_parser import SwiftParser
+from analyzer.items_loader import iter_raw_comments, iter_closed_pull_requests
+from analyzer.diff_cache import get_diff_hash
+from model.compression import decompress_diff, compress_diffs
+from model.sqlite import enable_sqlite_performance_profile, upsert_pull_requests, add_columns
+from model.pull_request import PullRequest
+from analyzer.xml.xml_producer import XmlRecordsProducer
+from analyzer.swift.swift_producer import SwiftRecordsProducer
+from github_parser.fetch_scheduler import fetch_pull_requests_async
+from github_parser.http_cache import HttpCache
+
+
+def generate_diff(files_number: int, pieces_number: int, lines_number: int) -> bytes:
+    """
+    Generates synthetic "git diff" in the same format as 'PullRequest.diff' is kept in database.
+    :param files_number: Number of files in diff.
+    :param pieces_number: Number of pieces in each file.
+    :param lines_number: Number of lines in each piece.
+    :return: Bytes with diff.
+    """
+    random.seed(0)
+    lines = []
+    for i in range(files_number):
+        path = "module%d/Sources/File%d.swift" % (i % 7, i)
+        lines.append("diff --git a/%s b/%s" % (path, path))
+        lines.append("index 83db48f..bf269f4 100644")
+        lines.append("--- a/%s" % path)
+        lines.append("+++ b/%s" % path)
+        for j in range(pieces_number):
+            position = j * lines_number * 2 + 1
+            lines.append("@@ -%d,%d +%d,%d @@ func foo%d() {" % (position, lines_number, position, lines_number, j))
+            for k in range(lines_number):
+                line = "        let value%d = bar(%d) // %s" % (k, random.randint(0, 1000), "x" * random.randint(0, 60))
+                lines.append(random.choice("+- ") + line)
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def generate_layout_diff(files_number: int, pieces_number: int, lines_number: int) -> bytes:
+    """
+    Generates synthetic "git diff" of Android layout XML files.
+    :param files_number: Number of files in diff.
+    :param pieces_number: Number of pieces in each file.
+    :param lines_number: Number of lines in each piece.
+    :return: Bytes with diff.
+    """
+    random.seed(0)
+    templates = [
+        '<LinearLayout xmlns:android="http://schemas.android.com/apk/res/android"',
+        '    android:layout_width="match_parent"',
+        '    android:layout_height="wrap_content" >',
+        '<TextView android:id="@+id/text%d" android:text="@string/title" />',
+        '<!-- Comment %d -->',
+        '<!-- Start of multiline comment %d',
+        '     end of multiline comment -->',
+        '<ImageView',
+        '    android:src=\'@drawable/icon%d\'',
+        '    android:contentDescription="@null"/>',
+        '</LinearLayout>',
+        '&amp; text %d',
+        '',
+    ]
+    lines = []
+    for i in range(files_number):
+        path = "app/src/main/res/layout/activity_%d.xml" % i
+        lines.append("diff --git a/%s b/%s" % (path, path))
+        lines.append("index 83db48f..bf269f4 100644")
+        lines.append("--- a/%s" % path)
+        lines.append("+++ b/%s" % path)
+        for j in range(pieces_number):
+            position = j * lines_number * 2 + 1
+            lines.append("@@ -%d,%d +%d,%d @@ <FrameLayout>" % (position, lines_number, position, lines_number))
+            for k in range(lines_number):
+                template = random.choice(templates)
+                line = " " * random.randint(0, 4) * 4 + (template % k if "%d" in template else template)
+                lines.append(random.choice("+- ") + line)
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def generate_swift_diff(files_number: int, pieces_number: int, lines_number: int) -> bytes:
+    """
+    Generates synthetic "git diff" of Swift files with all kinds of tokens which 'SwiftParser' distinguishes.
+    :param files_number: Number of files in diff.
+    :param pieces_number: Number of pieces in each file.
+    :param lines_number: Number of lines in each piece.
+    :return: Bytes with diff.
+    """
+    random.seed(0)
+    templates = [
+        'import Foundation',
+        '@objc class ViewController%d: UIViewController {',
+        'struct Point%d { var x: Int; let y: Double = 1.5e3 }',
+        'private func update%d(_ value: Int, completion: @escaping (Bool) -> Void) -> String? {',
+        'guard let item = items.first(where: { $0.id == %d }) else { return nil }',
+        'if value > 0x1F && flag { print("Value \\(value) is \\"big\\"") } else {',
+        'for i in 0..<%d where i %% 2 == 0 {',
+        'while !queue.isEmpty { queue.removeFirst() }',
+        'let closure = { (a: Int, b: Int) -> Int in return a + b }',
+        '// MARK: - Section %d',
+        '//TODO: remove it',
+        '/* Start of multiline comment %d',
+        '   still in comment */ let z = 0',
+        '/// :param: value Some value',
+        '#if DEBUG',
+        '#endif',
+        'self.view.backgroundColor = UIColor.white',
+        'switch state { case .idle: break; default: fallthrough }',
+        '}',
+        '',
+    ]
+    lines = []
+    for i in range(files_number):
+        path = "Sources/Module%d/File%d.swift" % (i % 7, i)
+        lines.append("diff --git a/%s b/%s" % (path, path))
+        lines.append("index 83db48f..bf269f4 100644")
+        lines.append("--- a/%s" % path)
+        lines.append("+++ b/%s" % path)
+        for j in range(pieces_number):
+            position = j * lines_number * 2 + 1
+            lines.append("@@ -%d,%d +%d,%d @@ class Foo {" % (position, lines_number, position, lines_number))
+            for k in range(lines_number):
+                template = random.choice(templates)
+                line = " " * random.randint(0, 3) * 4 + (template % k if "%d" in template else template)
+                lines.append(random.choice("+- ") + line)
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def measure_peak_memory(func) -> (int, int):
+    """
+    Runs specified function and measures peak of memory allocated during it.
+    :param func: Function to run.
+    :return: Tuple with result of function and peak memory in bytes.
+    """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def benchmark_parse_memory(logger: Logger, args):
+    diff = generate_diff(args.files, args.pieces, args.lines)
+    logger.info("Generated diff with %d files, %d bytes.", args.files, len(diff))
+
+    def count_lines(git_files) -> int:
+        return sum(len(piece.lines) for git_file in git_files for piece in git_file.pieces)
+
+    time1 = datetime.today()
+    list_lines, list_peak = measure_peak_memory(lambda: count_lines(parse_git_diff(diff, None)))
+    time2 = datetime.today()
+    stream_lines, stream_peak = measure_peak_memory(lambda: count_lines(iter_git_diff(diff, None)))
+    time3 = datetime.today()
+    assert list_lines == stream_lines, "Streaming parser returns %d lines instead of %d" % (stream_lines, list_lines)
+    logger.info("parse_git_diff: %d lines, peak %d bytes, %s.", list_lines, list_peak, time2 - time1)
+    logger.info("iter_git_diff: %d lines, peak %d bytes, %s.", stream_lines, stream_peak, time3 - time2)
+    logger.info("Peak memory ratio is %f.", stream_peak / float(list_peak))
+
+
+def benchmark_analyze_scaling(logger: Logger, args):
+    items = [PullRequestItem(i, generate_diff(args.files, args.pieces, args.lines + i % 10))
+             for i in range(args.prs)]
+    quiet_logger = logging.getLogger("analyzer")
+    quiet_logger.setLevel(logging.WARNING)
+    base_seconds = None
+    base_records = None
+    for workers_number in args.workers:
+        analyzer = Analyzer(quiet_logger, False, GitRecordsProducer())
+        time1 = datetime.today()
+        records_count = analyzer.analyze_items(items, workers_number, not args.threads)
+        seconds = (datetime.today() - time1).total_seconds()
+        records = analyzer.get_handler(RecordType.GIT).pop_records()
+        if base_seconds is None:
+            base_seconds = seconds
+            base_records = records
+        assert (records == base_records).all(), "Got other records with %d workers" % workers_number
+        logger.info("%d workers: %d records in %f seconds, speedup %f.", workers_number, records_count, seconds,
+                    base_seconds / seconds)
+
+
+def benchmark_records_production(logger: Logger, args):
+    diff = generate_diff(args.files, args.pieces, args.lines)
+    git_files = parse_git_diff(diff, None)
+    line_producer = GitRecordsProducer()
+    batch_producer = GitRecordsProducer()
+    time1 = datetime.today()
+    line_records = [np.array(line_producer.analyze_git_file_recursively(x)) for x in git_files]
+    time2 = datetime.today()
+    batch_records = [batch_producer.analyze_git_file_records(x) for x in git_files]
+    time3 = datetime.today()
+    for i, (records1, records2) in enumerate(zip(line_records, batch_records)):
+        assert (records1 == records2).all(), "Got other records for %d file" % i
+    records_number = sum(len(x) for x in batch_records)
+    logger.info("analyze_git_file_recursively: %d records in %s.", records_number, time2 - time1)
+    logger.info("analyze_git_file_records: %d records in %s.", records_number, time3 - time2)
+    logger.info("Speedup is %f.", (time2 - time1).total_seconds() / (time3 - time2).total_seconds())
+
+
+def benchmark_xml_parser(logger: Logger, args):
+    diff = generate_layout_diff(args.files, args.pieces, args.lines)
+    hunks = [[line.line for line in piece.lines] for git_file in iter_git_diff(diff, None)
+             for piece in git_file.pieces]
+    lines_number = sum(len(x) for x in hunks)
+    each_line_parser = XmlParser(False)
+    single_pass_parser = XmlParser()
+    # Equality of features is checked by 'tests/test_xml_parser.py'.
+    time1 = datetime.today()
+    for hunk in hunks:
+        each_line_parser.parse(hunk)
+    time2 = datetime.today()
+    for hunk in hunks:
+        single_pass_parser.parse(hunk)
+    time3 = datetime.today()
+    logger.info("Lexing each line: %d lines in %s.", lines_number, time2 - time1)
+    logger.info("Lexing whole hunk: %d lines in %s.", lines_number, time3 - time2)
+    logger.info("Speedup is %f.", (time2 - time1).total_seconds() / (time3 - time2).total_seconds())
+
+
+def benchmark_swift_parser(logger: Logger, args):
+    diff = generate_swift_diff(args.files, args.pieces, args.lines)
+    hunks = [[line.line for line in piece.lines] for git_file in iter_git_diff(diff, None)
+             for piece in git_file.pieces]
+    lines_number = sum(len(x) for x in hunks)
+    pygments_parser = SwiftParser(True)
+    tokenizer_parser = SwiftParser()
+    # Equality of features is checked by 'tests/test_swift_tokenizer.py'.
+    time1 = datetime.today()
+    for hunk in hunks:
+        pygments_parser.parse(hunk)
+    time2 = datetime.today()
+    for hunk in hunks:
+        tokenizer_parser.parse(hunk)
+    time3 = datetime.today()
+    pygments_seconds = (time2 - time1).total_seconds()
+    tokenizer_seconds = (time3 - time2).total_seconds()
+    logger.info("SwiftLexer: %d lines in %s, %d lines per second.", lines_number, time2 - time1,
+                lines_number / pygments_seconds)
+    logger.info("SwiftTokenizer: %d lines in %s, %d lines per second.", lines_number, time3 - time2,
+                lines_number / tokenizer_seconds)
+    logger.info("Speedup is %f.", pygments_seconds / tokenizer_seconds)
+
+
+def benchmark_records_shuffle(logger: Logger, args):
+    csv_worker.CSV_FOLDER = tempfile.mkdtemp()
+    logger.info("Use '%s' folder.", csv_worker.CSV_FOLDER)
+    producer = GitRecordsProducer()
+    handler = RecordsHandler(producer, csv_worker.FileDumper(producer.record_type))
+    random_state = np.random.RandomState(args.seed)
+    for _ in range(args.shards):
+        records = random_state.randint(0, 1000, (args.records, producer.features_number))
+        handler.file_dumper.flush_records(csv_worker.to_structured_records(records, producer.dtype))
+    records_number = args.shards * args.records
+    quiet_logger = logging.getLogger("analyzer")
+    memory_budget = args.budget * 1024 * 1024
+    time1 = datetime.today()
+    _, peak = measure_peak_memory(lambda: handler.finalize_records_file(quiet_logger, args.train_ratio, memory_budget,
+                                                                        random_state))
+    time2 = datetime.today()
+    logger.info("Shuffled %d records in %s with peak %d bytes and budget %d bytes.", records_number, time2 - time1,
+                peak, memory_budget)  # Correctness of shuffling is checked by 'tests/test_records_shuffle.py'.
+
+
+def create_plain_database(path: str, source_path: str, prs_number: int):
+    """
+    Creates database with not compressed diffs. Copies them from source database if it is specified or generates.
+    :param path: Path to database to create.
+    :param source_path: Path to source database (i.e. copy of real one) or None.
+    :param prs_number: Number of PRs to generate if there is no source database.
+    """
+    connection = sqlite3.connect(path)
+    if source_path is not None:
+        with sqlite3.connect(source_path) as source:
+            source.backup(connection)
+    else:
+        connection.execute("CREATE TABLE pull_requests (id INTEGER PRIMARY KEY, number INTEGER, link VARCHAR, "
+                           "state VARCHAR, diff BLOB, updated_at VARCHAR, base_sha VARCHAR, head_sha VARCHAR)")
+        connection.execute("CREATE TABLE raw_comments (id INTEGER PRIMARY KEY, path VARCHAR, diff_hunk VARCHAR, "
+                           "pr_id INTEGER)")
+        for i in range(prs_number):
+            diff = generate_diff(1 + i % 10, 1 + i % 5, 5 + i % 20)
+            connection.execute("INSERT INTO pull_requests (id, number, link, state, diff) "
+                               "VALUES (?, ?, '', 'closed', ?)", (i + 1, i + 1, diff))
+            lines = diff.decode('utf-8').split("\n")
+            connection.execute("INSERT INTO raw_comments VALUES (?, 'File.swift', ?, ?)",
+                                (i + 1, "\n".join(lines[4:10 + i % 20]), i + 1))
+    # Decompress values if source database is already migrated.
+    for table, column in (("pull_requests", "diff"), ("raw_comments", "diff_hunk")):
+        rows = connection.execute("SELECT id, %s FROM %s" % (column, table)).fetchall()
+        connection.executemany("UPDATE %s SET %s = ? WHERE id = ?" % (table, column),
+                               ((decompress_diff(x[1]), x[0]) for x in rows if decompress_diff(x[1]) != x[1]))
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+    # Source database may be not migrated yet.
+    quiet_logger = logging.getLogger("migrate")
+    quiet_logger.setLevel(logging.WARNING)
+    add_columns(quiet_logger, create_engine("sqlite:///%s" % path))
+
+
+def read_diffs(path: str) -> (list, list):
+    """
+    Reads diffs of all closed PRs and RCs in the same way as 'analyze.py' does.
+    :param path: Path to database.
+    :return: Tuple with lists of hashes of PR diffs and RC diff hunks.
+    """
+    with Session(create_engine("sqlite:///%s" % path)) as session:
+        prs = [get_diff_hash(x.diff) for x in iter_closed_pull_requests(session)]
+        rcs = [get_diff_hash(x.diff_hunk) for x in iter_raw_comments(session)]
+    return prs, rcs
+
+
+def benchmark_diff_compression(logger: Logger, args):
+    folder = tempfile.mkdtemp()
+    plain_path = os.path.join(folder, "plain.sqlite")
+    compressed_path = os.path.join(folder, "compressed.sqlite")
+    create_plain_database(plain_path, args.db, args.prs)
+    with sqlite3.connect(plain_path) as plain, sqlite3.connect(compressed_path) as compressed:
+        plain.backup(compressed)
+    quiet_logger = logging.getLogger("migrate")
+    quiet_logger.setLevel(logging.WARNING)
+    time1 = datetime.today()
+    compress_diffs(quiet_logger, create_engine("sqlite:///%s" % compressed_path))
+    time2 = datetime.today()
+    plain_size = os.path.getsize(plain_path)
+    compressed_size = os.path.getsize(compressed_path)
+    logger.info("Compressed database in %s, size %d -> %d bytes (ratio %f).", time2 - time1, plain_size,
+                compressed_size, plain_size / float(compressed_size))
+    # Compare reading speed. Run each reading twice to compare them with warm OS cache.
+    for _ in range(2):
+        time1 = datetime.today()
+        plain_diffs = read_diffs(plain_path)
+        time2 = datetime.today()
+        compressed_diffs = read_diffs(compressed_path)
+        time3 = datetime.today()
+        assert plain_diffs == compressed_diffs, "Got other diffs from compressed database"
+        logger.info("Read %d PR diffs and %d RC diff hunks: plain %s, compressed %s.", len(plain_diffs[0]),
+                    len(plain_diffs[1]), time2 - time1, time3 - time2)
+    # Measure decompression separately.
+    with create_engine("sqlite:///%s" % compressed_path).connect() as connection:
+        values = [x[0] for x in connection.execute(text("SELECT diff FROM pull_requests"))]
+    time1 = datetime.today()
+    for value in values:
+        decompress_diff(value)
+    time2 = datetime.today()
+    logger.info("Decompressed %d PR diffs (%d bytes) in %s.", len(values), sum(len(x) for x in values),
+                time2 - time1)
+
+
+def benchmark_fetch_replay(logger: Logger, args):
+    # Fetch into new database.
+    folder = tempfile.mkdtemp()
+    db_path = args.db or os.path.join(folder, "fetched.sqlite")
+    logger.info("Use '%s' folder and '%s' database.", folder, db_path)
+    enable_sqlite_performance_profile()
+    engine = create_engine("sqlite:///%s" % db_path)
+    PullRequest.metadata.create_all(engine)  # Metadata of all models.
+    session = Session(engine)
+
+    def write_batch(pull_requests):
+        upsert_pull_requests(session.connection(), pull_requests)
+        session.commit()
+
+    owner, name = args.repo.split("/")
+    accounts = [x.split(":", 1) for x in args.accounts]
+    quiet_logger = logging.getLogger("fetcher")
+    quiet_logger.setLevel(logging.WARNING)
+    time1 = datetime.today()
+    prs_number = fetch_pull_requests_async(quiet_logger, accounts, name, owner, write_batch, args.prs,
+                                           args.api_url, http_cache=HttpCache(args.cache, is_replay=args.replay))
+    time2 = datetime.today()
+    logger.info("Fetched %d pull requests in %s (%s).", prs_number, time2 - time1,
+                "replay" if args.replay else "requests")
+    if args.no_analyze:
+        return
+    # Analyze fetched items like 'analyze.py' does.
+    csv_worker.CSV_FOLDER = folder
+    analyzer = Analyzer(logging.getLogger("analyzer"), False, GitRecordsProducer(), XmlRecordsProducer(),
+                        SwiftRecordsProducer())
+    rcs_number = analyzer.analyze_items(list(iter_raw_comments(session)), os.cpu_count())
+    prs_number = analyzer.analyze_items(list(iter_closed_pull_requests(session)), os.cpu_count())
+    analyzer.finalize(0.8)
+    time3 = datetime.today()
+    logger.info("Analyzed into %d records (%d from raw comments) in %s.", rcs_number + prs_number, rcs_number,
+                time3 - time2)
+    logger.info("Total %s. Records are in '%s' folder.", time3 - time1, folder)
+
+
+if __name__ == '__main__':
+    # Parse command line arguments.
+    parser = argparse.ArgumentParser(description='Benchmarks analyzing steps on synthetic data.')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    parse_parser = subparsers.add_parser('parse', help='Peak memory of list and streaming git diff parsers.')
+    parse_parser.add_argument('--files', type=int, default=200, help='Files number in diff.')
+    parse_parser.add_argument('--pieces', type=int, default=10, help='Pieces number in each file.')
+    parse_parser.add_argument('--lines', type=int, default=50, help='Lines number in each piece.')
+    parse_parser.set_defaults(func=benchmark_parse_memory)
+    scaling_parser = subparsers.add_parser('scaling', help='Analyzing speed of synthetic PRs per workers number.')
+    scaling_parser.add_argument('--prs', type=int, default=400, help='PRs number.')
+    scaling_parser.add_argument('--files', type=int, default=10, help='Files number in each PR.')
+    scaling_parser.add_argument('--pieces', type=int, default=5, help='Pieces number in each file.')
+    scaling_parser.add_argument('--lines', type=int, default=20, help='Lines number in each piece.')
+    scaling_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='Workers numbers.')
+    scaling_parser.add_argument('--threads', action='store_true', help='Use threads instead of processes.')
+    scaling_parser.set_defaults(func=benchmark_analyze_scaling)
+    records_parser = subparsers.add_parser('records', help='Per-line and whole-file records production speed.')
+    records_parser.add_argument('--files', type=int, default=2000, help='Files number in diff.')
+    records_parser.add_argument('--pieces', type=int, default=5, help='Pieces number in each file.')
+    records_parser.add_argument('--lines', type=int, default=20, help='Lines number in each piece.')
+    records_parser.set_defaults(func=benchmark_records_production)
+    xml_parser = subparsers.add_parser('xml', help='XmlParser speed with lexing of each line and whole hunk.')
+    xml_parser.add_argument('--files', type=int, default=100, help='Files number in diff.')
+    xml_parser.add_argument('--pieces', type=int, default=10, help='Pieces number in each file.')
+    xml_parser.add_argument('--lines', type=int, default=50, help='Lines number in each piece.')
+    xml_parser.set_defaults(func=benchmark_xml_parser)
+    swift_parser = subparsers.add_parser('swift', help='Speed of SwiftParser with SwiftLexer and SwiftTokenizer.')
+    swift_parser.add_argument('--files', type=int, default=100, help='Files number in diff.')
+    swift_parser.add_argument('--pieces', type=int, default=10, help='Pieces number in each file.')
+    swift_parser.add_argument('--lines', type=int, default=50, help='Lines number in each piece.')
+    swift_parser.set_defaults(func=benchmark_swift_parser)
+    shuffle_parser = subparsers.add_parser('shuffle', help='Peak memory of records shuffling.')
+    shuffle_parser.add_argument('--shards', type=int, default=20, help='Shards number.')
+    shuffle_parser.add_argument('--records', type=int, default=50000, help='Records number in each shard.')
+    shuffle_parser.add_argument('--budget', type=int, default=8, help='Memory budget in megabytes.')
+    shuffle_parser.add_argument('--train-ratio', type=float, default=0.8, help='Train-test separation ratio.')
+    shuffle_parser.add_argument('--seed', type=int, default=0, help='Seed of random numbers.')
+    shuffle_parser.set_defaults(func=benchmark_records_shuffle)
+    compression_parser = subparsers.add_parser('compression', help='Size of database and reading speed of plain and '
+                                                                   'compressed diffs.')
+    compression_parser.add_argument('--db', help='Path to database to copy diffs from (i.e. copy of real one). '
+                                                 'Without it diffs are generated.')
+    compression_parser.add_argument('--prs', type=int, default=2000, help='PRs number to generate without "--db".')
+    compression_parser.set_defaults(func=benchmark_diff_compression)
+    replay_parser = subparsers.add_parser('fetch', help='Fetching (or replaying from cache without network) and '
+                                                        'analyzing of pull requests.')
+    replay_parser.add_argument('--cache', required=True, help='Folder of HTTP responses cache.')
+    replay_parser.add_argument('--replay', action='store_true', help='Take responses only from cache.')
+    replay_parser.add_argument('--repo', required=True, help='Repository in "owner/name" format.')
+    replay_parser.add_argument('--accounts', nargs='+', default=['replay:'],
+                               help='GitHub accounts in "username:token" format.')
+    replay_parser.add_argument('--api-url', default='https://api.github.com', help='URL of GitHub API.')
+    replay_parser.add_argument('--prs', type=int, default=-1, help='PRs number, "-1" means "all".')
+    replay_parser.add_argument('--db', help='Path to database to fetch into, by default new one in temp folder.')
+    replay_parser.add_argument('--no-analyze', action='store_true', help='Flag to measure only fetching.')
+    replay_parser.set_defaults(func=benchmark_fetch_replay)
+    args = parser.parse_args()
+
+    # Create logger.
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
+    logger = logging.getLogger("benchmark")
+
+    args.func(logger, args)
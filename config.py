@@ -15,3 +15,10 @@ RECAPTCHA_PRIVATE_KEY = '6Ld-NDYUAAAAALYTZOJk7XBYHuGDelO3qZV1CjWY'  # I don't pa
 CSRF_ENABLED = True
 APP_NAME = "GitHub Review Parser"
 APP_THEME = "flatly.css"
+# URL of GitHub API. May be overridden in instance config (i.e. by URL of stub server which replays responses).
+GITHUB_API_URL = 'https://api.github.com'
+# Flag to fetch from GitHub only responses cached in 'instance/http_cache' without any requests (see 'HttpCache').
+GITHUB_CACHE_REPLAY = False
+# Path to bare clone of repository (made by "git clone --mirror") to take diffs from instead of GitHub (see
+# 'GitMirror'), None - take diffs from GitHub.
+GIT_MIRROR_PATH = None
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+import argparse
+import sys
+import logging
+import os
+from datetime import datetime
+from analyzer.record_type import RecordType
+from analyzer.csv_worker import export_records_to_csv, export_train_test_to_csv, get_records_folder,\
+    get_train_npy_path
+
+
+if __name__ == '__main__':
+    # Parse command line arguments.
+    parser = argparse.ArgumentParser(description='Exports binary records files of analyzer into CSV files.')
+    parser.add_argument('types', nargs='*', default=[x.name for x in RecordType],
+                        help='Types of records to export. By default all.')
+    args = parser.parse_args()
+
+    # Create logger.
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
+    logger = logging.getLogger("export_csv")
+
+    for type_name in args.types:
+        record_type = RecordType[type_name]
+        time1 = datetime.today()
+        if os.path.exists(get_records_folder(record_type)):
+            records_number = export_records_to_csv(record_type)
+            logger.info("Exported %d %s records in %s.", records_number, type_name, datetime.today() - time1)
+        time2 = datetime.today()
+        if os.path.exists(get_train_npy_path(type_name)):
+            train_number, test_number = export_train_test_to_csv(type_name)
+            logger.info("Exported %d train and %d test %s records in %s.", train_number, test_number, type_name,
+                        datetime.today() - time2)
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import time
+import aiohttp
+from logging import Logger
+from model.pull_request import PullRequest
+from model.raw_comment import RawComment
+from github_parser.http_cache import HttpCache, CacheMissError
+from github_parser.git_mirror import GitMirror
+
+
+GITHUB_API_URL = "https://api.github.com"
+FETCH_CONCURRENCY = 16  # Maximal number of simultaneous requests.
+PER_PAGE = 100  # Maximal page size allowed by GitHub.
+JSON_MEDIA_TYPE = "application/vnd.github.v3.full+json"  # With both 'body' and 'body_text' of comments.
+DIFF_MEDIA_TYPE = "application/vnd.github.v3.diff"
+RATELIMIT_RETRY_SECONDS = 60  # Pause after rate limit error if GitHub doesn't specify reset time.
+SERVER_ERROR_RETRIES = 4  # Number of retries of request after server (5xx) or connection error.
+SERVER_ERROR_RETRY_SECONDS = 2  # Pause before first retry after server error, each next pause is twice longer.
+NOT_FOUND_STATUSES = (404, 410)  # Statuses of deleted resources (i.e. pull requests), retries don't help them.
+
+
+class RateLimitError(Exception):
+    """
+    Rate limit of account is exceeded. Keeps time (in seconds since epoch) when it will be reset.
+    """
+
+    def __init__(self, username: str, reset_time: float):
+        super().__init__("Rate limit of %s is exceeded until %s" % (username, time.ctime(reset_time)))
+        self.reset_time = reset_time
+
+
+class NotFoundError(Exception):
+    """
+    Requested resource doesn't exist, i.e. pull request was deleted after listing.
+    """
+
+    def __init__(self, url: str, status: int):
+        super().__init__("%s is not found (%d status)" % (url, status))
+        self.url = url
+        self.status = status
+
+
+class AsyncGitHubFetcher(object):
+    """
+    Fetches pull requests of repository with asyncio. All requests go through one pooled HTTP session with limited
+    number of simultaneous requests and are conditional (with 'If-None-Match' header), so unchanged data doesn't
+    spend rate limit. Requests failed by server or connection errors are retried with exponential backoff.
+    If cache is in replay mode then responses are taken only from cache without any requests.
+    Should be used as asynchronous context manager.
+    """
+    __slots__ = ('logger', 'username', 'repo_owner', 'repo_name', 'base_url', 'concurrency', 'http_cache', 'git_mirror',
+                 'ratelimit_remaining', 'ratelimit_reset', 'requests_number', 'not_modified_number', '_auth',
+                 '_semaphore', '_session',)
+
+    def __init__(self, logger: Logger, account: [], repo_owner: str, repo_name: str, base_url: str = GITHUB_API_URL,
+                 concurrency: int = FETCH_CONCURRENCY, http_cache: HttpCache = None, git_mirror: GitMirror = None):
+        """
+        :param logger: Logger to use.
+        :param account: Username and password (or token) of GitHub account.
+        :param repo_owner: Owner of repository.
+        :param repo_name: Name of repository.
+        :param base_url: URL of GitHub API, may be URL of stub server.
+        :param concurrency: Maximal number of simultaneous requests.
+        :param http_cache: Cache of responses, by default 'HttpCache' in instance folder.
+        :param git_mirror: Optional local clone of repository to take diffs from instead of requests.
+        """
+        self.logger = logger
+        self.username = account[0]
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.http_cache = http_cache if http_cache is not None else HttpCache()
+        self.git_mirror = git_mirror
+        self.ratelimit_remaining = -1  # Unknown until first response.
+        self.ratelimit_reset = 0.0  # Time (in seconds since epoch) when rate limit will be reset.
+        self.requests_number = 0
+        self.not_modified_number = 0
+        self._auth = aiohttp.BasicAuth(account[0], account[1])
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        self._session = aiohttp.ClientSession(connector=connector, auth=self._auth, raise_for_status=False)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self._session.close()
+
+    def update_ratelimit(self, headers):
+        if "X-RateLimit-Remaining" in headers:
+            self.ratelimit_remaining = int(headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Reset" in headers:
+            self.ratelimit_reset = float(headers["X-RateLimit-Reset"])
+
+    def get_ratelimit_pause(self, reserve: int = 0) -> float:
+        """
+        :param reserve: Number of requests to keep in reserve (i.e. requests which may be already sent).
+        :return: Number of seconds to wait until rate limit of account is reset or 0 if account may make requests.
+        """
+        if self.ratelimit_remaining < 0 or self.ratelimit_remaining > reserve:
+            return 0.0
+        return max(self.ratelimit_reset - time.time(), 0.0)
+
+    def get_repo_url(self, path: str) -> str:
+        return "%s/repos/%s/%s%s" % (self.base_url, self.repo_owner, self.repo_name, path)
+
+    async def get(self, url: str, accept: str = JSON_MEDIA_TYPE) -> (bytes, str):
+        """
+        Makes conditional GET request. On "304 Not Modified" takes body from cache. Retries request after server error
+        (5xx status) or connection error up to 'SERVER_ERROR_RETRIES' times.
+        :param url: Full URL with query.
+        :param accept: Media type to request.
+        :return: Tuple with body and URL of next page (or None).
+        """
+        cached_headers, cached_body = self.http_cache.get(url, accept)
+        if self.http_cache.is_replay:
+            if cached_headers is None:
+                raise CacheMissError(url)
+            return cached_body, cached_headers["next"]
+        headers = {"Accept": accept}
+        if cached_headers is not None and cached_headers["etag"] is not None:
+            headers["If-None-Match"] = cached_headers["etag"]
+        retry = 0
+        while True:
+            try:
+                return await self.request(url, accept, headers, cached_headers, cached_body)
+            except (aiohttp.ClientResponseError, aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if retry >= SERVER_ERROR_RETRIES or (isinstance(e, aiohttp.ClientResponseError) and e.status < 500):
+                    raise
+                pause = SERVER_ERROR_RETRY_SECONDS * 2 ** retry
+                self.logger.warning("%s: request of %s failed (%s), retry in %d seconds", self.username, url,
+                                    repr(e), pause)
+                retry += 1
+                await asyncio.sleep(pause)  # Semaphore is released, so other requests go on.
+
+    async def request(self, url: str, accept: str, headers: dict, cached_headers: dict,
+                      cached_body: bytes) -> (bytes, str):
+        """
+        Makes one GET request (see 'get').
+        :param url: Full URL with query.
+        :param accept: Media type to request.
+        :param headers: Headers of request.
+        :param cached_headers: Headers of cached response or None.
+        :param cached_body: Body of cached response or None.
+        :return: Tuple with body and URL of next page (or None).
+        """
+        async with self._semaphore:
+            async with self._session.get(url, headers=headers) as response:
+                self.requests_number += 1
+                self.update_ratelimit(response.headers)
+                if response.status in (403, 429) and (self.ratelimit_remaining == 0
+                                                      or "Retry-After" in response.headers):
+                    if "Retry-After" in response.headers:  # Secondary rate limit.
+                        reset_time = time.time() + int(response.headers["Retry-After"])
+                    elif self.ratelimit_reset > time.time():
+                        reset_time = self.ratelimit_reset
+                    else:
+                        reset_time = time.time() + RATELIMIT_RETRY_SECONDS
+                    raise RateLimitError(self.username, reset_time)
+                if response.status == 304:
+                    self.not_modified_number += 1
+                    return cached_body, cached_headers["next"]
+                if response.status in NOT_FOUND_STATUSES:
+                    raise NotFoundError(url, response.status)
+                if response.status != 200:
+                    raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                      status=response.status, message=await response.text(),
+                                                      headers=response.headers)
+                body = await response.read()
+                next_link = response.links.get("next")
+                next_url = str(next_link["url"]) if next_link is not None else None
+                self.http_cache.put(url, accept, {"etag": response.headers.get("ETag"), "next": next_url}, body)
+                return body, next_url
+
+    async def get_pages(self, url: str, count: int = -1, is_stop_item=None) -> list:
+        """
+        Gets items of all pages of paginated list.
+        :param url: URL of first page.
+        :param count: Maximal number of items, '-1' means "all".
+        :param is_stop_item: Optional function which returns True for item to stop on (it and following items are
+        not returned).
+        :return: List of JSON items.
+        """
+        items = []
+        while url is not None and (count < 0 or len(items) < count):
+            body, url = await self.get(url)
+            for item in json.loads(body):
+                if is_stop_item is not None and is_stop_item(item):
+                    url = None
+                    break
+                items.append(item)
+        return items if count < 0 else items[:count]
+
+    async def fetch_raw_comments(self, pr_number: int) -> list:
+        comments = await self.get_pages(self.get_repo_url("/pulls/%d/comments?per_page=%d" % (pr_number, PER_PAGE)))
+        return [RawComment(message=rc["body_text"], message_with_format=rc["body"], html_url=rc["html_url"],
+                           path=rc["path"], line=rc["original_position"], diff_hunk=rc["diff_hunk"],
+                           updated_at=rc["updated_at"])
+                for rc in comments]
+
+    async def fetch_diff(self, pr_number: int, base_sha: str, head_sha: str) -> bytes:
+        """
+        Takes diff of pull request from 'git_mirror' if it has commits of pull request, otherwise requests it.
+        """
+        if self.git_mirror is not None and await asyncio.to_thread(self.git_mirror.has_commits, base_sha, head_sha):
+            return await asyncio.to_thread(self.git_mirror.get_diff, base_sha, head_sha)
+        diff, _ = await self.get(self.get_repo_url("/pulls/%d" % pr_number), DIFF_MEDIA_TYPE)
+        return diff
+
+    async def fetch_pull_request(self, pr: dict) -> PullRequest:
+        """
+        Fetches review comments and diff of pull request at once.
+        :param pr: JSON of pull request from list of pull requests.
+        :return: 'PullRequest' with 'RawComment'-s.
+        """
+        pr_number = pr["number"]
+        base_sha = pr["base"]["sha"]
+        head_sha = pr["head"]["sha"]
+        raw_comments, diff = await asyncio.gather(self.fetch_raw_comments(pr_number),
+                                                  self.fetch_diff(pr_number, base_sha, head_sha))
+        # Add all PR's even without comments, because AI should train on "no comments" data also.
+        return PullRequest(number=pr_number, link=pr["html_url"], state=pr["state"], diff=diff,
+                           updated_at=pr["updated_at"], base_sha=base_sha, head_sha=head_sha,
+                           raw_comments=raw_comments)
@@ -0,0 +1,221 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from logging import Logger
+from github_parser.async_fetcher import AsyncGitHubFetcher, RateLimitError, NotFoundError, GITHUB_API_URL, \
+    FETCH_CONCURRENCY, PER_PAGE
+from github_parser.http_cache import HttpCache
+from github_parser.git_mirror import GitMirror
+
+
+WRITE_BATCH_SIZE = 50  # Number of pull requests to save per transaction.
+WRITE_QUEUE_SIZE = 100  # Maximal number of fetched but not saved yet pull requests.
+FETCH_ATTEMPTS = 3  # Number of attempts to fetch pull request which fails with unexpected errors.
+
+
+class FetchScheduler(object):
+    """
+    Fetches pull requests by few GitHub accounts at once. All pull requests are placed into one queue which is
+    consumed by workers of all accounts (each account has 'concurrency' workers). Before taking next pull request
+    worker checks remaining rate limit of own account and pauses until reset time if it is exhausted, so work goes
+    only to accounts with quota. Pull request interrupted by rate limit error is returned to queue for other accounts.
+    Pull request which was deleted after listing (see 'NotFoundError') is skipped. Pull request failed with other
+    error is returned to queue up to 'FETCH_ATTEMPTS' times and then is reported as failed, so one bad pull request
+    doesn't stop fetch of others.
+    Fetched pull requests go through bounded queue to one writer which saves them by batches in separate thread, so
+    only few pull requests are kept in memory and saved ones are not lost if fetch is interrupted.
+    """
+    __slots__ = ('logger', 'fetchers', 'write_batch', 'batch_size', 'fetched_number', 'saved_number', 'prs_number',
+                 'skipped_numbers', 'failed_numbers', '_attempts', '_queue', '_results',)
+
+    def __init__(self, logger: Logger, fetchers: list, write_batch, batch_size: int = WRITE_BATCH_SIZE,
+                 queue_size: int = WRITE_QUEUE_SIZE):
+        """
+        :param logger: Logger to use.
+        :param fetchers: List of opened 'AsyncGitHubFetcher'-s, one per account.
+        :param write_batch: Function to save list of 'PullRequest'-s (called from separate thread).
+        :param batch_size: Number of pull requests to pass into 'write_batch' at once.
+        :param queue_size: Maximal number of fetched but not saved yet pull requests.
+        """
+        self.logger = logger
+        self.fetchers = fetchers
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.fetched_number = 0
+        self.saved_number = 0
+        self.prs_number = 0
+        self.skipped_numbers = []  # Numbers of not found pull requests.
+        self.failed_numbers = []  # Numbers of pull requests which weren't fetched because of errors.
+        self._attempts = dict()  # Number of pull request -> number of failed attempts to fetch it.
+        self._queue = None
+        self._results = asyncio.Queue(maxsize=queue_size)
+
+    async def wait_for_quota(self, fetcher: AsyncGitHubFetcher):
+        pause = fetcher.get_ratelimit_pause(fetcher.concurrency)
+        if pause > 0:
+            self.logger.info("%s: rate limit is exhausted, pause for %d seconds", fetcher.username, pause)
+            await asyncio.sleep(pause)
+
+    async def list_pull_requests(self, count: int, watermark: str = None) -> list:
+        """
+        Lists pull requests (from last updated to first updated) by first account with quota.
+        :param count: Maximal number of pull requests, '-1' means "all".
+        :param watermark: Optional 'updated_at' to stop listing on pull requests which weren't updated after it.
+        :return: List of JSON-s of pull requests.
+        """
+        url = "/pulls?state=all&sort=updated&direction=desc&per_page=%d" % PER_PAGE
+        # PRs updated at the same second as watermark are listed again because watermark PR might be not last one.
+        is_stop_item = None if watermark is None else lambda x: x["updated_at"] < watermark
+        while True:
+            fetcher = min(self.fetchers, key=lambda x: x.get_ratelimit_pause())
+            await self.wait_for_quota(fetcher)
+            try:
+                return await fetcher.get_pages(fetcher.get_repo_url(url), count, is_stop_item)
+            except RateLimitError as e:
+                fetcher.ratelimit_remaining = 0
+                fetcher.ratelimit_reset = e.reset_time
+
+    async def work(self, fetcher: AsyncGitHubFetcher):
+        while True:
+            await self.wait_for_quota(fetcher)
+            pr = await self._queue.get()
+            if fetcher.get_ratelimit_pause(fetcher.concurrency) > 0:  # Exhausted by other workers during waiting.
+                self._queue.put_nowait(pr)
+                self._queue.task_done()
+                continue
+            try:
+                # Waits if writer is behind, so fetched PRs don't pile up in memory.
+                await self._results.put(await fetcher.fetch_pull_request(pr))
+                self.fetched_number += 1
+                if self.fetched_number % 10 == 0:  # Log progress every 10 prs.
+                    self.logger.info("%s: %d/%d, ratelimit_remaining=%d", fetcher.username, self.fetched_number,
+                                     self.prs_number, fetcher.ratelimit_remaining)
+            except RateLimitError as e:
+                self.logger.info("%s: %s, return PR %d to queue", fetcher.username, e, pr["number"])
+                fetcher.ratelimit_remaining = 0
+                fetcher.ratelimit_reset = e.reset_time
+                self._queue.put_nowait(pr)
+            except NotFoundError as e:
+                self.logger.warning("%s: %s, skip PR %d", fetcher.username, e, pr["number"])
+                self.skipped_numbers.append(pr["number"])
+            except Exception as e:
+                number = pr["number"]
+                attempts = self._attempts.get(number, 0) + 1
+                self._attempts[number] = attempts
+                if attempts < FETCH_ATTEMPTS:
+                    self.logger.warning("%s: %s, return PR %d to queue", fetcher.username, repr(e), number)
+                    self._queue.put_nowait(pr)
+                else:
+                    self.logger.error("%s: %s, PR %d is failed %d times", fetcher.username, repr(e), number, attempts)
+                    self.failed_numbers.append(number)
+            finally:
+                self._queue.task_done()
+
+    async def write(self):
+        """
+        Takes fetched pull requests and saves them by batches. Stops on None.
+        """
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="fetch_writer") as executor:
+            batch = []
+            is_over = False
+            while not is_over:
+                pr = await self._results.get()
+                is_over = pr is None
+                if not is_over:
+                    batch.append(pr)
+                # Don't wait for full batch if there is nothing to wait.
+                if len(batch) >= self.batch_size or (len(batch) > 0 and (is_over or self._results.empty())):
+                    await loop.run_in_executor(executor, self.write_batch, batch)
+                    self.saved_number += len(batch)
+                    batch = []
+
+    async def fetch_pull_requests(self, count: int = -1, watermark: str = None, get_saved_updates=None) -> int:
+        """
+        Fetches pull requests (from last updated to first updated) with their review comments and diffs and passes
+        them into 'write_batch'.
+        :param count: Maximal number of pull requests, '-1' means "all".
+        :param watermark: Optional 'updated_at' to fetch only pull requests updated since it.
+        :param get_saved_updates: Optional function which takes list of numbers of listed pull requests and returns
+        dictionary with 'updated_at' of already saved ones per number. Such pull requests are skipped if they weren't
+        updated, so interrupted fetch continues from unsaved ones.
+        :return: Number of saved pull requests. Numbers of not fetched ones are in 'failed_numbers'.
+        """
+        prs = await self.list_pull_requests(count, watermark)
+        if get_saved_updates is not None:
+            listed_number = len(prs)
+            saved_updates = get_saved_updates([x["number"] for x in prs])
+            prs = [x for x in prs if saved_updates.get(x["number"]) != x["updated_at"]]
+            self.logger.info("Skip %d not updated pull requests", listed_number - len(prs))
+        self.prs_number = len(prs)
+        self.logger.info("Got %d pull requests, split them between %d account(s)", self.prs_number,
+                         len(self.fetchers))
+        self._queue = asyncio.Queue()
+        for pr in prs:
+            self._queue.put_nowait(pr)
+        writer = asyncio.ensure_future(self.write())
+        workers = [asyncio.ensure_future(self.work(fetcher)) for fetcher in self.fetchers
+                   for _ in range(fetcher.concurrency)]
+        queue_join = asyncio.ensure_future(self._queue.join())
+        # Stop on first failed worker or writer instead of waiting for pull requests which nobody handles.
+        await asyncio.wait(workers + [writer, queue_join], return_when=asyncio.FIRST_COMPLETED)
+        for worker in workers:
+            worker.cancel()
+        queue_join.cancel()
+        if not writer.done():
+            await self._results.put(None)
+        await asyncio.wait([writer])
+        for task in workers + [writer]:
+            if not task.cancelled() and task.done() and task.exception() is not None:
+                raise task.exception()
+        if len(self.skipped_numbers) > 0:
+            self.logger.warning("Skip %d not found pull requests: %s", len(self.skipped_numbers),
+                                ", ".join(str(x) for x in sorted(self.skipped_numbers)))
+        if len(self.failed_numbers) > 0:
+            self.logger.error("Failed to fetch %d pull requests: %s", len(self.failed_numbers),
+                              ", ".join(str(x) for x in sorted(self.failed_numbers)))
+        for fetcher in self.fetchers:
+            self.logger.info("%s: %d requests (%d not modified), ratelimit_remaining=%d", fetcher.username,
+                             fetcher.requests_number, fetcher.not_modified_number, fetcher.ratelimit_remaining)
+        return self.saved_number
+
+
+def fetch_pull_requests_async(logger: Logger, accounts: [], repo_name: str, repo_owner: str, write_batch,
+                              count: int = -1, base_url: str = GITHUB_API_URL, concurrency: int = FETCH_CONCURRENCY,
+                              watermark: str = None, get_saved_updates=None, http_cache: HttpCache = None,
+                              git_mirror: GitMirror = None, failed_numbers: list = None) -> int:
+    """
+    Fetches PullRequests and RawComment-s from GitHub and passes them into 'write_batch' by batches. Asynchronous
+    analogue of 'parser.get_pull_requests_from_github'.
+    :param logger: Logger to use.
+    :param accounts: List of GitHub accounts (username and password).
+    :param repo_name: Name of repository.
+    :param repo_owner: Owner of repository.
+    :param write_batch: Function to save list of 'PullRequest'-s (called from separate thread).
+    :param count: Maximal number of pull requests, '-1' means "all".
+    :param base_url: URL of GitHub API.
+    :param concurrency: Maximal number of simultaneous requests per account.
+    :param watermark: Optional 'updated_at' to fetch only pull requests updated since it (see 'model.sync_state').
+    :param get_saved_updates: Optional function which returns 'updated_at' of saved pull requests by their numbers
+    to skip not updated ones (see 'FetchScheduler.fetch_pull_requests').
+    :param http_cache: Cache of responses (may be in replay mode), by default 'HttpCache' in instance folder.
+    :param git_mirror: Optional local clone of repository to take diffs from (it is updated first if not replay).
+    :param failed_numbers: Optional list to add numbers of pull requests which weren't fetched because of errors.
+    :return: Number of saved pull requests.
+    """
+    cache = http_cache if http_cache is not None else HttpCache()
+    if git_mirror is not None and not cache.is_replay:
+        git_mirror.update()
+
+    async def fetch():
+        async with AsyncExitStack() as stack:
+            fetchers = [await stack.enter_async_context(AsyncGitHubFetcher(logger, x, repo_owner, repo_name, base_url,
+                                                                           concurrency, cache, git_mirror))
+                        for x in accounts]
+            scheduler = FetchScheduler(logger, fetchers, write_batch)
+            saved_number = await scheduler.fetch_pull_requests(count, watermark, get_saved_updates)
+            if failed_numbers is not None:
+                failed_numbers.extend(scheduler.failed_numbers)
+            return saved_number
+
+    return asyncio.run(fetch())
@@ -0,0 +1,100 @@
+import subprocess
+from analyzer.diff_cache import DiffCache, get_diff_hash
+from analyzer.git_diff_parser import iter_git_diff
+
+
+# Plain diff in the same format as GitHub returns.
+GIT_DIFF_ARGS = ["diff", "--no-color", "--no-ext-diff"]
+FILE_START = b"diff --git "
+
+
+class GitMirror(object):
+    """
+    Source of pull request diffs from local bare clone of repository, i.e. made by "git clone --mirror URL" (for
+    GitHub it also fetches "refs/pull/*" refs with heads of all pull requests). Diff of pull request is calculated as
+    "git diff base...head" - changes of head since merge base of base and head commits, like GitHub shows them.
+    Doesn't spend GitHub rate limit, speed depends only on disk.
+    """
+    __slots__ = ('path',)
+
+    def __init__(self, path: str):
+        """
+        :param path: Path to bare clone.
+        """
+        self.path = path
+
+    def run_git(self, *args, **kwargs) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", "--git-dir", self.path] + list(args), stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, check=True, **kwargs)
+
+    def update(self):
+        """
+        Fetches new commits (and pull requests) from remote repository.
+        """
+        self.run_git("remote", "update", "--prune")
+
+    def has_commits(self, *shas) -> bool:
+        """
+        Checks all commits by one call of git. Mirror may not have commits if it wasn't updated since fetching or if
+        head of pull request was force-pushed.
+        """
+        output = self.run_git("cat-file", "--batch-check=%(objecttype)",
+                              input="".join("%s\n" % x for x in shas).encode('utf-8')).stdout
+        return output.split() == [b"commit"] * len(shas)
+
+    def get_diff(self, base_sha: str, head_sha: str) -> bytes:
+        """
+        :param base_sha: SHA of base commit of pull request.
+        :param head_sha: SHA of head commit of pull request.
+        :return: Bytes with diff.
+        """
+        return self.run_git(*GIT_DIFF_ARGS, "%s...%s" % (base_sha, head_sha)).stdout
+
+    def count_files(self, base_sha: str, head_sha: str) -> int:
+        """
+        Counts changed files without calculating of diff content.
+        """
+        names = self.run_git("diff", "--name-only", "-z", "%s...%s" % (base_sha, head_sha)).stdout
+        return names.count(b"\0")
+
+    def iter_file_diffs(self, base_sha: str, head_sha: str):
+        """
+        Streams diff from git by files, so only one file is kept in memory.
+        :param base_sha: SHA of base commit of pull request.
+        :param head_sha: SHA of head commit of pull request.
+        :return: Generator of bytes with diff of each file.
+        """
+        process = subprocess.Popen(["git", "--git-dir", self.path] + GIT_DIFF_ARGS + ["%s...%s" % (base_sha, head_sha)],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            lines = []
+            for line in process.stdout:
+                if line.startswith(FILE_START) and len(lines) > 0:
+                    yield b"".join(lines)
+                    lines = []
+                lines.append(line)
+            if len(lines) > 0:
+                yield b"".join(lines)
+        finally:
+            process.stdout.close()
+            return_code = process.wait()
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, process.args)
+
+    def iter_git_files(self, base_sha: str, head_sha: str, diff_cache: DiffCache = None):
+        """
+        Parses diff of pull request while git streams it. Diff of the same commits is always the same, so parsed diff
+        is cached by pair of commits.
+        :param base_sha: SHA of base commit of pull request.
+        :param head_sha: SHA of head commit of pull request.
+        :param diff_cache: Optional cache of parsed diffs.
+        :return: Generator of 'GitFile'-s.
+        """
+        def parse():
+            for file_diff in self.iter_file_diffs(base_sha, head_sha):
+                yield from iter_git_diff(file_diff, None)
+
+        if diff_cache is None:
+            return parse()
+        pair = "%s_%s" % (base_sha, head_sha)
+        return diff_cache.iter_cached_git_files(pair, get_diff_hash(pair), parse)
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import threading
+
+
+my_path = os.path.realpath(__file__)
+HTTP_CACHE_FOLDER = os.path.normpath(os.path.join(my_path, "..", "..", "instance", "http_cache"))
+HTTP_CACHE_SIZE_LIMIT = 4 * 1024 * 1024 * 1024  # 4 GB
+ENTRIES_FOLDER = "entries"
+BODIES_FOLDER = "bodies"
+
+
+class CacheMissError(Exception):
+    """
+    Response is not found in cache in replay mode.
+    """
+
+    def __init__(self, url: str):
+        super().__init__("There is no cached response for %s" % url)
+        self.url = url
+
+
+def get_request_key(url: str, accept: str) -> str:
+    """
+    Returns key of request. Only headers which change content of response take part in key, so responses are shared
+    between accounts (i.e. 'Authorization' header doesn't take part).
+    :param url: Full URL of request.
+    :param accept: Media type of request.
+    :return: Hex string with key.
+    """
+    return hashlib.sha256(("%s\n%s" % (url, accept)).encode('utf-8')).hexdigest()
+
+
+def write_file(path: str, data: bytes):
+    """
+    Writes file atomically, so readers don't see partially written file.
+    """
+    tmp_path = "%s.%d_%d.tmp" % (path, os.getpid(), threading.get_ident())
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+
+class HttpCache(object):
+    """
+    On-disk cache of HTTP responses. Entry of request keeps headers of response (ETag and link to next page) and hash
+    of body. Bodies are content-addressed, so the same body (i.e. the same diff by other URL) is kept once. Keeps total
+    size of bodies under limit by removing least recently used ones (uses modification time of body file as time of
+    last usage), entries with removed bodies are treated as missing.
+    In replay mode cached responses are used without requests (see 'AsyncGitHubFetcher').
+    """
+    __slots__ = ('folder', 'size_limit', 'is_replay', '_size', '_lock',)
+
+    def __init__(self, folder: str = HTTP_CACHE_FOLDER, size_limit: int = HTTP_CACHE_SIZE_LIMIT,
+                 is_replay: bool = False):
+        """
+        :param folder: Folder to keep cache in.
+        :param size_limit: Maximal total size of bodies in bytes.
+        :param is_replay: Flag to serve responses only from cache.
+        """
+        self.folder = folder
+        self.size_limit = size_limit
+        self.is_replay = is_replay
+        self._size = None  # Calculated on first store.
+        self._lock = threading.Lock()
+        for subfolder in (ENTRIES_FOLDER, BODIES_FOLDER):
+            os.makedirs(os.path.join(folder, subfolder), exist_ok=True)
+
+    def get_entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, ENTRIES_FOLDER, "%s.json" % key)
+
+    def get_body_path(self, body_hash: str) -> str:
+        return os.path.join(self.folder, BODIES_FOLDER, body_hash)
+
+    def get(self, url: str, accept: str) -> (dict, bytes):
+        """
+        :param url: Full URL of request.
+        :param accept: Media type of request.
+        :return: Tuple with dictionary of saved headers ("etag" and "next" page URL) and body, or tuple of Nones.
+        """
+        entry_path = self.get_entry_path(get_request_key(url, accept))
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            return None, None
+        body_path = self.get_body_path(entry["body"])
+        try:
+            with open(body_path, 'rb') as file:
+                body = file.read()
+            os.utime(body_path)  # Mark as recently used.
+        except FileNotFoundError:  # Body was evicted.
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:  # Removed by other process.
+                pass
+            return None, None
+        return entry["headers"], body
+
+    def put(self, url: str, accept: str, headers: dict, body: bytes):
+        """
+        Saves response.
+        :param url: Full URL of request.
+        :param accept: Media type of request.
+        :param headers: Dictionary with headers to keep.
+        :param body: Body of response.
+        """
+        body_hash = hashlib.sha256(body).hexdigest()
+        body_path = self.get_body_path(body_hash)
+        if os.path.exists(body_path):
+            os.utime(body_path)
+        else:
+            write_file(body_path, body)
+            self._on_stored(len(body))
+        entry = json.dumps({"url": url, "accept": accept, "headers": headers, "body": body_hash})
+        write_file(self.get_entry_path(get_request_key(url, accept)), entry.encode('utf-8'))
+
+    def _on_stored(self, body_size: int):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(x.stat().st_size for x in os.scandir(os.path.join(self.folder, BODIES_FOLDER)))
+            else:
+                self._size += body_size
+            if self._size > self.size_limit:
+                self._evict()
+
+    def _evict(self):
+        """
+        Removes least recently used bodies until total size is less than 90% of limit.
+        """
+        bodies = [x for x in os.scandir(os.path.join(self.folder, BODIES_FOLDER)) if not x.name.endswith(".tmp")]
+        bodies = sorted(((x.stat().st_mtime, x.stat().st_size, x.path) for x in bodies))
+        size = sum(x[1] for x in bodies)
+        target_size = self.size_limit * 0.9
+        for _, body_size, path in bodies:
+            if size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # Removed by other process.
+                pass
+            size -= body_size
+        self._size = size
+
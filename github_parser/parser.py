@@ -133,5 +133,5 @@ def get_pull_requests_from_github(logger: Logger, accounts: [], repo_name: str,
 def fetch_pr_from_github(logger: Logger, account: [], repo_owner: str, repo_name: str, pr_number: int):
     repo: Repository = get_repo(account[0], account[1], repo_owner, repo_name)
     pr: github3.pulls.PullRequest = repo.pull_request(pr_number)
-    diff: str = pr.diff()
+    diff: bytes = pr.diff()
     return PullRequest(number=pr_number, link=pr.html_url, state=pr.state, diff=diff)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+from sqlalchemy import create_engine, text
+import argparse
+import ast
+import sys
+import logging
+from logging import Logger
+from config import SQLALCHEMY_DATABASE_URI
+from model.sqlite import enable_sqlite_performance_profile, add_columns
+from model.compression import compress_diffs
+from datetime import datetime
+
+
+def migrate_diffs_to_bytes(logger: Logger, engine):
+    """
+    Converts 'pull_requests.diff' values saved as text into real bytes. Old versions saved diffs as "str(bytes)"
+    representation like [b'foo\\n'] or as plain text.
+    :param logger: Logger to use.
+    :param engine: Database engine.
+    """
+    with engine.begin() as connection:
+        ids = [row[0] for row in connection.execute(
+            text("SELECT id FROM pull_requests WHERE typeof(diff) = 'text'"))]
+    logger.info("Found %d pull requests with text diff.", len(ids))
+    for i, pr_id in enumerate(ids):
+        # Convert one by one to don't keep all diffs in RAM.
+        with engine.begin() as connection:
+            diff = connection.execute(text("SELECT diff FROM pull_requests WHERE id = :id"), {"id": pr_id}).scalar()
+            if diff.startswith("b'") or diff.startswith('b"'):
+                diff_bytes = ast.literal_eval(diff)
+            else:
+                diff_bytes = diff.encode('utf-8')
+            connection.execute(text("UPDATE pull_requests SET diff = :diff WHERE id = :id"),
+                               {"diff": diff_bytes, "id": pr_id})
+        if i % 100 == 0:  # Log progress every 100 prs.
+            logger.info("  %d/%d converted", i, len(ids))
+
+
+def add_indexes(logger: Logger, engine):
+    """
+    Adds indexes of current models into old database. Before unique index on 'pull_requests.number' removes duplicated
+    pull requests (keeps the last saved one) and moves their raw comments to kept one.
+    :param logger: Logger to use.
+    :param engine: Database engine.
+    """
+    with engine.begin() as connection:
+        duplicates = connection.execute(text(
+            "SELECT p.id, k.id FROM pull_requests p JOIN (SELECT number, MAX(id) AS id FROM pull_requests"
+            " GROUP BY number HAVING COUNT(*) > 1) k ON p.number = k.number AND p.id != k.id")).all()
+        for duplicate_id, kept_id in duplicates:
+            connection.execute(text("UPDATE raw_comments SET pr_id = :kept_id WHERE pr_id = :id"),
+                               {"kept_id": kept_id, "id": duplicate_id})
+            connection.execute(text("DELETE FROM pull_requests WHERE id = :id"), {"id": duplicate_id})
+        logger.info("Removed %d duplicated pull requests.", len(duplicates))
+        connection.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_pull_requests_number ON pull_requests (number)"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_pull_requests_state ON pull_requests (state)"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_raw_comments_pr_id ON raw_comments (pr_id)"))
+
+
+if __name__ == '__main__':
+    # Parse command line arguments.
+    parser = argparse.ArgumentParser(description='One-time migrations of existing database.')
+    parser.parse_args()
+
+    # Connect db.
+    enable_sqlite_performance_profile()
+    engine = create_engine(SQLALCHEMY_DATABASE_URI)
+
+    # Create logger.
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG)
+    logger = logging.getLogger("migrate")
+
+    time1 = datetime.today()
+    migrate_diffs_to_bytes(logger, engine)
+    add_indexes(logger, engine)
+    add_columns(logger, engine)
+    compress_diffs(logger, engine)
+    time2 = datetime.today()
+    logger.info("Migrated database in %s.", time2 - time1)
@@ -0,0 +1,188 @@
+import zlib
+from logging import Logger
+from sqlalchemy import LargeBinary, text
+from sqlalchemy.types import TypeDecorator
+
+
+COMPRESSION_LEVEL = 6
+# Compressed value starts with marker (not used in diff text) and version of dictionary. Values without marker are
+# returned as is, so not migrated databases (see 'migrate.py') still can be read.
+COMPRESSED_MARKER = b"\x1fZ"
+DICTIONARY_VERSION = 1
+# Preset dictionary for zlib with typical fragments of diffs. Fragments which are met more often are placed closer to
+# the end because zlib prefers shorter distances. Never change existing dictionary - add new version instead.
+DIFF_DICTIONARIES = {
+    1: "\n".join([
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<LinearLayout xmlns:android="http://schemas.android.com/apk/res/android"',
+        '    xmlns:tools="http://schemas.android.com/tools"',
+        '    xmlns:app="http://schemas.android.com/apk/res-auto"',
+        '<RelativeLayout <FrameLayout <TextView <ImageView <Button <include <merge',
+        '    android:layout_width="match_parent"',
+        '    android:layout_height="wrap_content"',
+        '    android:layout_width="wrap_content"',
+        '    android:layout_height="match_parent"',
+        '    android:orientation="vertical"',
+        '    android:id="@+id/',
+        '    android:text="@string/',
+        '    android:textColor="@color/',
+        '    android:src="@drawable/',
+        '    android:layout_marginTop="@dimen/',
+        '    android:layout_marginStart="@dimen/',
+        '    android:visibility="gone"',
+        '    tools:text="',
+        '/>',
+        '</LinearLayout>',
+        'import Foundation',
+        'import UIKit',
+        'public final class ',
+        'private func ',
+        'fileprivate ',
+        'override func ',
+        'func ',
+        'guard let ',
+        'if let ',
+        'return ',
+        'self.',
+        'extension ',
+        'protocol ',
+        'struct ',
+        'enum ',
+        'case ',
+        'static let ',
+        'private let ',
+        'private var ',
+        'let ',
+        'var ',
+        'weak var ',
+        'init(',
+        ': String',
+        ': Int',
+        ': Bool',
+        ' -> Void',
+        '@objc ',
+        '// MARK: - ',
+        '        }',
+        '    }',
+        '}',
+        'diff --git a/',
+        'new file mode 100644',
+        'deleted file mode 100644',
+        '\\ No newline at end of file',
+        'index 0000000..',
+        ' 100644',
+        '--- /dev/null',
+        '--- a/',
+        '+++ b/',
+        '@@ -',
+        ' @@ ',
+        '+        ',
+        '-        ',
+        '         ',
+        '+    ',
+        '-    ',
+        '     ',
+        '',
+    ]).encode('utf-8'),
+}
+
+
+def compress_diff(diff) -> bytes:
+    """
+    Compresses diff with zlib and preset dictionary of current version.
+    :param diff: Bytes or string with diff.
+    :return: Bytes with compressed diff.
+    """
+    if isinstance(diff, str):
+        diff = diff.encode('utf-8')
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=DIFF_DICTIONARIES[DICTIONARY_VERSION])
+    return COMPRESSED_MARKER + bytes((DICTIONARY_VERSION,)) + compressor.compress(diff) + compressor.flush()
+
+
+def is_compressed_diff(value) -> bool:
+    return isinstance(value, bytes) and value.startswith(COMPRESSED_MARKER)
+
+
+def decompress_diff(value) -> bytes:
+    """
+    Decompresses diff compressed by 'compress_diff'.
+    :param value: Compressed bytes or not compressed bytes or string (from not migrated database).
+    :return: Bytes with diff.
+    """
+    if not is_compressed_diff(value):
+        return value.encode('utf-8') if isinstance(value, str) else value
+    header_size = len(COMPRESSED_MARKER) + 1
+    decompressor = zlib.decompressobj(zdict=DIFF_DICTIONARIES[value[header_size - 1]])
+    return decompressor.decompress(value[header_size:]) + decompressor.flush()
+
+
+class CompressedBinary(TypeDecorator):
+    """
+    Bytes column which is transparently compressed by 'compress_diff' in database.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else compress_diff(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decompress_diff(value)
+
+
+class CompressedText(CompressedBinary):
+    """
+    String column which is transparently compressed by 'compress_diff' in database.
+    """
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return value if isinstance(value, str) else decompress_diff(value).decode('utf-8')
+
+
+def compress_column(logger: Logger, engine, table: str, column: str, window: int = 500):
+    """
+    Compresses not compressed values of column (see 'compress_diff'). Handles rows by windows in separate
+    transactions to don't keep all values in RAM and allow to continue after interruption.
+    :param logger: Logger to use.
+    :param engine: Database engine.
+    :param table: Name of table.
+    :param column: Name of column with diffs.
+    :param window: Number of rows per transaction.
+    """
+    last_id = -1
+    compressed_number = 0
+    raw_size = compressed_size = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(text("SELECT id, %s FROM %s WHERE id > :id ORDER BY id LIMIT :limit"
+                                           % (column, table)), {"id": last_id, "limit": window}).all()
+            if len(rows) == 0:
+                break
+            updates = [{"id": x[0], "value": compress_diff(x[1])} for x in rows if not is_compressed_diff(x[1])]
+            if len(updates) > 0:
+                connection.execute(text("UPDATE %s SET %s = :value WHERE id = :id" % (table, column)), updates)
+        last_id = rows[-1][0]
+        compressed_number += len(updates)
+        raw_size += sum(len(x[1]) for x in rows if not is_compressed_diff(x[1]))
+        compressed_size += sum(len(x["value"]) for x in updates)
+        logger.info("  %s.%s: %d values compressed", table, column, compressed_number)
+    logger.info("Compressed %d values of %s.%s from %d to %d bytes.", compressed_number, table, column, raw_size,
+                compressed_size)
+
+
+def compress_diffs(logger: Logger, engine):
+    """
+    Compresses 'pull_requests.diff' and 'raw_comments.diff_hunk' values of database and shrinks database file (see
+    'migrate.py').
+    :param logger: Logger to use.
+    :param engine: Database engine.
+    """
+    compress_column(logger, engine, "pull_requests", "diff")
+    compress_column(logger, engine, "raw_comments", "diff_hunk")
+    if engine.dialect.name == "sqlite":
+        # Database file doesn't shrink on its own, freed pages are just reused.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM"))
@@ -1,13 +1,21 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from flask_appbuilder import Model
+from model.compression import CompressedBinary
 
 
 class PullRequest(Model):
     __tablename__ = 'pull_requests'
+    # Number is unique to upsert PRs by it (see 'model.sqlite'). Use 'migrate.py' for old databases.
+    __table_args__ = (Index('ix_pull_requests_number', 'number', unique=True),)
     id = Column(Integer, primary_key=True)
     number = Column(Integer)
     link = Column(String, nullable=False)
-    state = Column(String)  # Useless to make one more structure to parse so save as string.
-    diff = Column(String, nullable=False)
+    state = Column(String, index=True)  # Useless to make one more structure to parse so save as string.
+    # Raw bytes of "git diff" output, compressed in database. Use 'migrate.py' for old databases.
+    diff = Column(CompressedBinary, nullable=False)
+    updated_at = Column(String)  # ISO 8601 time of last update on GitHub. Empty for PRs fetched by old versions.
+    # Commits which diff is made between (see 'GitMirror'). Empty for PRs fetched by old versions.
+    base_sha = Column(String)
+    head_sha = Column(String)
     raw_comments = relationship("RawComment", back_populates="pr")
@@ -2,6 +2,7 @@ import re
 from sqlalchemy import Column, Integer, String, ForeignKey, Table
 from sqlalchemy.orm import relationship
 from flask_appbuilder import Model
+from model.compression import CompressedText
 
 
 PR_NUMBER_RE = re.compile(".+pull/(\d+).+")
@@ -19,10 +20,10 @@ class RawComment(Model):
     html_url = Column(String, nullable=False)
     path = Column(String, nullable=False)
     line = Column(String, nullable=False)
-    diff_hunk = Column(String, nullable=False)
+    diff_hunk = Column(CompressedText, nullable=False)  # Compressed in database. Use 'migrate.py' for old databases.
     updated_at = Column(String, nullable=False)
     # One PullRequest can contain few RawComment-s.
-    pr_id = Column(Integer, ForeignKey("pull_requests.id"))
+    pr_id = Column(Integer, ForeignKey("pull_requests.id"), index=True)
     pr = relationship("PullRequest", back_populates="raw_comments")
 
     def parse_pr_number(self):
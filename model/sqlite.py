@@ -0,0 +1,107 @@
+import sqlite3
+from logging import Logger
+from sqlalchemy import event, select, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Engine, Connection
+from model.pull_request import PullRequest
+from model.raw_comment import RawComment
+
+
+UPSERT_BATCH_SIZE = 500  # Number of rows per statement. SQLite limits number of variables in one statement.
+PULL_REQUEST_COLUMNS = ('number', 'link', 'state', 'diff', 'updated_at', 'base_sha', 'head_sha')
+RAW_COMMENT_COLUMNS = ('message', 'message_with_format', 'html_url', 'path', 'line', 'diff_hunk', 'updated_at')
+ADDED_PULL_REQUEST_COLUMNS = ('updated_at', 'base_sha', 'head_sha')  # Columns which old databases don't have.
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Sets performance profile for each new SQLite connection: WAL journal (readers don't block writer and vice versa)
+    and 'NORMAL' synchronous mode (WAL is synced only on checkpoints, database stays consistent after power loss).
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def enable_sqlite_performance_profile():
+    """
+    Applies 'set_sqlite_pragmas' to all engines. Should be called before first connection.
+    """
+    if not event.contains(Engine, "connect", set_sqlite_pragmas):
+        event.listen(Engine, "connect", set_sqlite_pragmas)
+
+
+def iter_batches(items: list, batch_size: int):
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+def get_pull_requests_updates(connection: Connection, numbers: list, batch_size: int = UPSERT_BATCH_SIZE) -> dict:
+    """
+    Reads 'updated_at' of saved PullRequest-s with specified numbers in batches via unique index, so time doesn't
+    depend from size of table.
+    :param connection: Connection to use.
+    :param numbers: List of numbers of PullRequest-s.
+    :param batch_size: Number of numbers per statement.
+    :return: Dictionary of number to 'updated_at' of saved PullRequest-s.
+    """
+    table = PullRequest.__table__
+    result = dict()
+    for batch in iter_batches(numbers, batch_size):
+        result.update(connection.execute(select(table.c.number, table.c.updated_at)
+                                         .where(table.c.number.in_(batch))).all())
+    return result
+
+
+def upsert_pull_requests(connection: Connection, pull_requests: list,
+                         batch_size: int = UPSERT_BATCH_SIZE) -> (int, int):
+    """
+    Inserts or updates (by number) PullRequest-s with their RawComment-s in batches. Doesn't read existing table, each
+    batch touches only rows with the same numbers via unique index, so time doesn't depend from size of table.
+    RawComment-s of updated PullRequest-s are replaced.
+    :param connection: Connection with opened transaction.
+    :param pull_requests: List of not saved PullRequest-s (with 'raw_comments').
+    :param batch_size: Number of PullRequest-s per statement.
+    :return: Tuple with numbers of inserted and updated PullRequest-s.
+    """
+    table = PullRequest.__table__
+    inserted_number = 0
+    updated_number = 0
+    for batch in iter_batches(pull_requests, batch_size):
+        numbers = [x.number for x in batch]
+        existing_ids = [row[0] for row in connection.execute(
+            select(table.c.id).where(table.c.number.in_(numbers)))]
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.number],
+            set_={x: statement.excluded[x] for x in PULL_REQUEST_COLUMNS if x != 'number'})
+        connection.execute(statement, [{x: getattr(pr, x) for x in PULL_REQUEST_COLUMNS} for pr in batch])
+        updated_number += len(existing_ids)
+        inserted_number += len(batch) - len(existing_ids)
+        # Replace raw comments of batch.
+        ids = dict(connection.execute(select(table.c.number, table.c.id).where(table.c.number.in_(numbers))).all())
+        if len(existing_ids) > 0:
+            rc_table = RawComment.__table__
+            connection.execute(rc_table.delete().where(rc_table.c.pr_id.in_(existing_ids)))
+        raw_comments = [dict({x: getattr(rc, x) for x in RAW_COMMENT_COLUMNS}, pr_id=ids[pr.number])
+                        for pr in batch for rc in pr.raw_comments]
+        if len(raw_comments) > 0:
+            connection.execute(RawComment.__table__.insert(), raw_comments)  # 'executemany'.
+    return inserted_number, updated_number
+
+
+def add_columns(logger: Logger, engine):
+    """
+    Adds columns of current models into old database (see 'migrate.py').
+    :param logger: Logger to use.
+    :param engine: Database engine.
+    """
+    with engine.begin() as connection:
+        columns = [row[1] for row in connection.execute(text("PRAGMA table_info(pull_requests)"))]
+        for column in ADDED_PULL_REQUEST_COLUMNS:
+            if column not in columns:
+                connection.execute(text("ALTER TABLE pull_requests ADD COLUMN %s VARCHAR" % column))
+                logger.info("Added 'pull_requests.%s' column.", column)
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.orm import Session
+from flask_appbuilder import Model
+
+
+class SyncState(Model):
+    """
+    State of fetching of repository from GitHub.
+    """
+
+    __tablename__ = 'sync_states'
+    id = Column(Integer, primary_key=True)
+    repo = Column(String, nullable=False, unique=True)  # "owner/name".
+    # Maximal 'updated_at' of fetched pull requests. All PRs updated before it are already in database.
+    watermark = Column(String, nullable=False)
+
+
+def get_sync_watermark(session: Session, repo: str):
+    """
+    :param session: Session to use.
+    :param repo: Repository in "owner/name" format.
+    :return: Watermark of repository or None if it wasn't fetched yet.
+    """
+    state = session.query(SyncState).filter(SyncState.repo == repo).first()
+    return None if state is None else state.watermark
+
+
+def set_sync_watermark(session: Session, repo: str, watermark: str):
+    state = session.query(SyncState).filter(SyncState.repo == repo).first()
+    if state is None:
+        session.add(SyncState(repo=repo, watermark=watermark))
+    elif watermark > state.watermark:  # ISO 8601 times are comparable as strings.
+        state.watermark = watermark
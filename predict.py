@@ -7,11 +7,15 @@ import sys
 import logging
 import multiprocessing
 from config import SQLALCHEMY_DATABASE_URI
+from model.sqlite import enable_sqlite_performance_profile
 from datetime import datetime
 from model.raw_comment import RawComment
 from model.pull_request import PullRequest
 from analyzer.analyzer import Analyzer
+from analyzer.diff_cache import DiffCache
 from analyzer.git.git_producer import GitRecordsProducer
+from analyzer.xml.xml_producer import XmlRecordsProducer
+from analyzer.swift.swift_producer import SwiftRecordsProducer
 from analyzer.ml import MachineLearning, Prediction
 
 
@@ -26,6 +30,7 @@ if __name__ == '__main__':
 
     # Connect db.
     Session = sessionmaker(autoflush=False)
+    enable_sqlite_performance_profile()
     engine = create_engine(SQLALCHEMY_DATABASE_URI)
     Session.configure(bind=engine)
     session = Session()
@@ -35,8 +40,8 @@ if __name__ == '__main__':
     logger = logging.getLogger("analyzer")
 
     # Build analyzer.
-    analyzer = Analyzer(logger, False, GitRecordsProducer())
-    # TODO analyzer = Analyzer(logger, args.chunks, GitRecordsProducer(), XmlRecordsProducer(), SwiftRecordsProducer())
+    analyzer = Analyzer(logger, False, GitRecordsProducer(), XmlRecordsProducer(), SwiftRecordsProducer(),
+                        diff_cache=DiffCache())
     ml = MachineLearning(analyzer, None)
     # Train network.
     time1 = datetime.today()
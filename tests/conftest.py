@@ -0,0 +1,18 @@
+import os
+import sys
+import pytest
+
+# Tests import modules of repository as scripts in root folder do.
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.realpath(__file__), "..", "..")))
+
+from analyzer import csv_worker
+
+
+@pytest.fixture
+def csv_folder(tmp_path, monkeypatch):
+    """
+    Redirects records, train/test files and vocabularies into temporary folder.
+    """
+    folder = str(tmp_path / "csv")
+    monkeypatch.setattr(csv_worker, "CSV_FOLDER", folder)
+    return folder
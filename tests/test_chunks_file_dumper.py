@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from analyzer import csv_worker
+from analyzer.record_type import RecordType
+
+
+class FailingFileDumper(csv_worker.ChunksFileDumper):
+    """
+    Fails to write second shard like on full disk.
+    """
+    def append_shard(self, records: np.ndarray, items: list = None):
+        if self.shards is not None and len(self.shards) > 0:
+            raise OSError("No space left on device")
+        super().append_shard(records, items)
+
+
+def test_writes_shards(csv_folder):
+    file_dumper = csv_worker.ChunksFileDumper(RecordType.GIT)
+    for i in range(3):
+        file_dumper.flush_records(np.full((2, 3), i, dtype=np.int16))
+    file_dumper.close()
+    assert file_dumper.get_records_number() == 6
+
+
+def test_error_of_writing_is_raised(csv_folder):
+    file_dumper = FailingFileDumper(RecordType.GIT)
+    file_dumper.flush_records(np.zeros((2, 3), dtype=np.int16))
+    file_dumper.flush_records(np.ones((2, 3), dtype=np.int16))
+    with pytest.raises(OSError):
+        file_dumper.close()  # Doesn't wait forever.
+    with pytest.raises(OSError):
+        file_dumper.flush_records(np.ones((2, 3), dtype=np.int16))
+    assert file_dumper.get_records_number() == 2
+
+
+def test_thread_is_stopped_on_close(csv_folder):
+    file_dumper = csv_worker.ChunksFileDumper(RecordType.GIT)
+    file_dumper.flush_records(np.zeros((2, 3), dtype=np.int16))
+    dump_thread = file_dumper.dump_thread
+    file_dumper.close()
+    assert not dump_thread.is_alive()
+    file_dumper.close()  # Handlers close dumper again on finalizing.
+    # Dumper may be used again after close.
+    file_dumper.flush_records(np.ones((2, 3), dtype=np.int16))
+    file_dumper.close()
+    assert not file_dumper.dump_thread.is_alive()
+    assert file_dumper.get_records_number() == 4
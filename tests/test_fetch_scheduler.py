@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import pytest
+from aiohttp import web
+from github_parser import async_fetcher
+from github_parser.async_fetcher import AsyncGitHubFetcher
+from github_parser.fetch_scheduler import FetchScheduler, FETCH_ATTEMPTS
+from github_parser.http_cache import HttpCache
+
+
+REPO_PATH = "/repos/owner/repo"
+PRS_NUMBER = 5
+
+
+class StubGitHub(object):
+    """
+    Stub of GitHub API with pull requests which fail with specified statuses before responding.
+    """
+
+    def __init__(self, failures: dict):
+        """
+        :param failures: Dictionary of path to list of statuses to respond with before successful response.
+        """
+        self.failures = failures
+        self.requests = []
+
+    def get_failure(self, request: web.Request):
+        self.requests.append(request.path)
+        statuses = self.failures.get(request.path)
+        if statuses:
+            return web.Response(status=statuses.pop(0), text="Failure")
+        return None
+
+    async def list_pull_requests(self, request: web.Request):
+        prs = [{"number": i, "html_url": "https://github.com/owner/repo/pull/%d" % i, "state": "closed",
+                "updated_at": "2020-01-%02dT00:00:00Z" % i, "base": {"sha": "a%d" % i}, "head": {"sha": "b%d" % i}}
+               for i in range(PRS_NUMBER, 0, -1)]
+        return self.get_failure(request) or web.json_response(prs)
+
+    async def get_comments(self, request: web.Request):
+        return self.get_failure(request) or web.json_response([])
+
+    async def get_diff(self, request: web.Request):
+        number = int(request.match_info["number"])
+        return self.get_failure(request) or web.Response(body=b"diff of %d" % number)
+
+    def get_application(self) -> web.Application:
+        application = web.Application()
+        application.router.add_get(REPO_PATH + "/pulls", self.list_pull_requests)
+        application.router.add_get(REPO_PATH + "/pulls/{number}/comments", self.get_comments)
+        application.router.add_get(REPO_PATH + "/pulls/{number}", self.get_diff)
+        return application
+
+
+def fetch(tmp_path, failures: dict) -> (FetchScheduler, list, StubGitHub):
+    """
+    Fetches all pull requests from stub server by one account.
+    :return: Tuple with used scheduler, saved pull requests and stub server.
+    """
+    stub = StubGitHub(failures)
+    saved = []
+
+    async def run() -> FetchScheduler:
+        runner = web.AppRunner(stub.get_application())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        try:
+            base_url = "http://127.0.0.1:%d" % runner.addresses[0][1]
+            logger = logging.getLogger("fetcher")
+            async with AsyncGitHubFetcher(logger, ["user", "token"], "owner", "repo", base_url, 2,
+                                          HttpCache(str(tmp_path / "http_cache"))) as fetcher:
+                scheduler = FetchScheduler(logger, [fetcher], saved.extend)
+                await scheduler.fetch_pull_requests()
+                return scheduler
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run()), saved, stub
+
+
+@pytest.fixture(autouse=True)
+def no_retry_pause(monkeypatch):
+    monkeypatch.setattr(async_fetcher, "SERVER_ERROR_RETRY_SECONDS", 0)
+
+
+def test_server_errors_are_retried(tmp_path):
+    diff_path = REPO_PATH + "/pulls/3"
+    scheduler, saved, stub = fetch(tmp_path, {diff_path: [502, 503], REPO_PATH + "/pulls": [500]})
+    assert sorted(x.number for x in saved) == list(range(1, PRS_NUMBER + 1))
+    assert next(x for x in saved if x.number == 3).diff == b"diff of 3"
+    assert stub.requests.count(diff_path) == 3
+    assert scheduler.skipped_numbers == [] and scheduler.failed_numbers == []
+
+
+def test_not_found_pull_requests_are_skipped(tmp_path):
+    failures = {REPO_PATH + "/pulls/2/comments": [404], REPO_PATH + "/pulls/4": [410]}
+    scheduler, saved, stub = fetch(tmp_path, failures)
+    assert sorted(x.number for x in saved) == [1, 3, 5]
+    assert sorted(scheduler.skipped_numbers) == [2, 4]
+    assert stub.requests.count(REPO_PATH + "/pulls/4") == 1  # Not found resource isn't requested again.
+
+
+def test_failed_pull_requests_are_fetched_again(tmp_path):
+    comments_path = REPO_PATH + "/pulls/2/comments"
+    scheduler, saved, stub = fetch(tmp_path, {comments_path: [400] * (FETCH_ATTEMPTS - 1)})
+    assert sorted(x.number for x in saved) == list(range(1, PRS_NUMBER + 1))
+    assert scheduler.failed_numbers == []
+    assert stub.requests.count(comments_path) == FETCH_ATTEMPTS
+
+
+def test_failed_pull_requests_are_reported(tmp_path):
+    comments_path = REPO_PATH + "/pulls/3/comments"
+    scheduler, saved, stub = fetch(tmp_path, {comments_path: [400] * (FETCH_ATTEMPTS + 1)})
+    assert sorted(x.number for x in saved) == [1, 2, 4, 5]
+    assert scheduler.failed_numbers == [3]
+    assert stub.requests.count(comments_path) == FETCH_ATTEMPTS
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from analyzer.diff_cache import dump_git_file, load_git_files, ENTRY_MAGIC, DIFF_HASH_SIZE
+from analyzer.git_dao import GitLine
+from analyzer.git_diff_parser import parse_git_diff
+from analyzer.git.git_producer import GitRecordsProducer
+
+
+LINES = ["let a = 1", "+let title = \"Привет, мир\" // 😀", "-let b = \"naïve\"", " ", "+\t\tcafé"]
+DIFF = "diff --git a/File.swift b/File.swift\nindex 83db48f..bf269f4 100644\n--- a/File.swift\n+++ b/File.swift\n" \
+       "@@ -1,4 +1,4 @@ func foo() {\n%s\n" % "\n".join(LINES)
+
+
+def get_expected_lengths() -> list:
+    return [len(GitLine(x).line) for x in LINES]
+
+
+@pytest.mark.parametrize("diff", [DIFF, DIFF.encode('utf-8')])
+def test_lengths_are_in_characters(diff):
+    git_file = parse_git_diff(diff, None)[0]
+    lines = git_file.pieces[0].lines
+    assert [x.length for x in lines] == get_expected_lengths()
+    assert list(lines.get_lengths()) == get_expected_lengths()
+    assert [x.length for x in lines] == [len(x.line) for x in lines]
+
+
+def test_lengths_of_invalid_utf8_are_lengths_of_decoded_lines():
+    diff = DIFF.encode('utf-8').replace("naïve".encode('utf-8'), b"na\xff\xfeve")
+    lines = parse_git_diff(diff, None)[0].pieces[0].lines
+    assert list(lines.get_lengths()) == [len(x.line) for x in lines]
+
+
+def test_lengths_of_cached_file_are_in_characters():
+    git_file = parse_git_diff(DIFF.encode('utf-8'), None)[0]
+    data = b"\0" * (len(ENTRY_MAGIC) + DIFF_HASH_SIZE) + dump_git_file(git_file)
+    cached_file = next(load_git_files(data))
+    assert list(cached_file.pieces[0].lines.get_lengths()) == get_expected_lengths()
+
+
+def test_records_of_bytes_and_text_are_equal():
+    producer = GitRecordsProducer()
+    text_records = producer.analyze_git_file_records(parse_git_diff(DIFF, None)[0])
+    bytes_records = producer.analyze_git_file_records(parse_git_diff(DIFF.encode('utf-8'), None)[0])
+    line_records = np.array(producer.analyze_git_file_recursively(parse_git_diff(DIFF.encode('utf-8'), None)[0]),
+                            dtype=producer.dtype)
+    assert list(text_records["GIT_LINE_LENGTH"]) == get_expected_lengths()
+    assert (bytes_records == text_records).all()
+    assert (line_records == text_records).all()
@@ -0,0 +1,101 @@
+import logging
+import os
+import shutil
+import subprocess
+import pytest
+from analyzer.analyzer import Analyzer, PullRequestItem, analyze_pull_requests
+from analyzer.diff_cache import DiffCache
+from analyzer.git.git_producer import GitRecordsProducer
+from analyzer.git_diff_parser import parse_git_diff
+from github_parser.git_mirror import GitMirror
+
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+GIT_ENV = dict(os.environ, GIT_AUTHOR_NAME="test", GIT_AUTHOR_EMAIL="test@test", GIT_COMMITTER_NAME="test",
+               GIT_COMMITTER_EMAIL="test@test")
+
+
+def git(folder: str, *args) -> str:
+    return subprocess.run(["git"] + list(args), cwd=folder, env=GIT_ENV, check=True,
+                          stdout=subprocess.PIPE).stdout.decode('utf-8').strip()
+
+
+def write_file(folder: str, name: str, lines: list):
+    with open(os.path.join(folder, name), 'w', encoding='utf-8') as file:
+        file.write("".join("%s\n" % x for x in lines))
+
+
+@pytest.fixture(scope="module")
+def repository(tmp_path_factory) -> (GitMirror, str, str, str):
+    """
+    Creates repository with pull request branch and base branch moved after it, and its bare mirror.
+    :return: Tuple with mirror, SHA of first base commit, SHA of moved base commit and SHA of head commit.
+    """
+    folder = str(tmp_path_factory.mktemp("repository"))
+    work = os.path.join(folder, "work")
+    os.makedirs(work)
+    git(work, "init", "-q")
+    swift_lines = ["let value%d = %d" % (i, i) for i in range(30)]
+    for i in range(3):
+        write_file(work, "File%d.swift" % i, swift_lines)
+    git(work, "add", ".")
+    git(work, "commit", "-qm", "base")
+    base_sha = git(work, "rev-parse", "HEAD")
+    git(work, "checkout", "-qb", "pull_request")
+    for i in range(2):
+        write_file(work, "File%d.swift" % i, swift_lines[:5] + ["let changed = %d" % i] + swift_lines[6:20] +
+                   ["let added = 2"] + swift_lines[20:])
+    write_file(work, "layout.xml", ["<layout>", "    <view id=\"a\"/>", "</layout>"])
+    git(work, "add", ".")
+    git(work, "commit", "-qm", "pull request")
+    head_sha = git(work, "rev-parse", "HEAD")
+    git(work, "checkout", "-q", base_sha)
+    write_file(work, "File2.swift", swift_lines + ["let base = 1"])
+    git(work, "commit", "-qam", "base moved")
+    moved_base_sha = git(work, "rev-parse", "HEAD")
+    git(work, "branch", "-qf", "main")
+    mirror_path = os.path.join(folder, "mirror.git")
+    git(folder, "clone", "-q", "--mirror", work, mirror_path)
+    return GitMirror(mirror_path), base_sha, moved_base_sha, head_sha
+
+
+def get_lines(git_files: list) -> list:
+    return [(x.file_path, [(line.line, line.type) for piece in x.pieces for line in piece.lines]) for x in git_files]
+
+
+def test_diff_contains_only_changes_of_pull_request(repository):
+    mirror, _, moved_base_sha, head_sha = repository
+    assert mirror.has_commits(moved_base_sha, head_sha)
+    diff = mirror.get_diff(moved_base_sha, head_sha)
+    assert b"File2.swift" not in diff
+    assert mirror.count_files(moved_base_sha, head_sha) == 3
+
+
+def test_streamed_files_equal_parsed_diff(repository):
+    mirror, base_sha, moved_base_sha, head_sha = repository
+    expected = parse_git_diff(mirror.get_diff(moved_base_sha, head_sha), None)
+    assert len(expected) == 3
+    assert get_lines(list(mirror.iter_git_files(moved_base_sha, head_sha))) == get_lines(expected)
+    # Diff is the same for any base before pull request.
+    assert get_lines(list(mirror.iter_git_files(base_sha, head_sha))) == get_lines(expected)
+
+
+def test_parsed_files_are_cached_by_commits(repository, tmp_path):
+    mirror, _, moved_base_sha, head_sha = repository
+    cache_folder = str(tmp_path / "diff_cache")
+    diff_cache = DiffCache(cache_folder)
+    expected = get_lines(list(mirror.iter_git_files(moved_base_sha, head_sha, diff_cache)))
+    assert len(os.listdir(cache_folder)) == 1
+    broken_mirror = GitMirror(str(tmp_path / "missing.git"))  # Fails if cache is not used.
+    assert get_lines(list(broken_mirror.iter_git_files(moved_base_sha, head_sha, diff_cache))) == expected
+
+
+def test_analyzer_uses_diff_from_database_without_commits(repository):
+    mirror, _, moved_base_sha, head_sha = repository
+    diff = mirror.get_diff(moved_base_sha, head_sha)
+    logger = logging.getLogger("analyzer")
+    expected = analyze_pull_requests(Analyzer(logger, False, GitRecordsProducer()), [PullRequestItem(1, diff)])
+    analyzer = Analyzer(logger, False, GitRecordsProducer(), git_mirror=mirror)
+    assert mirror.has_commits(moved_base_sha, "0" * 40) is False
+    assert analyze_pull_requests(analyzer, [PullRequestItem(1, None, moved_base_sha, head_sha)]) == expected
+    assert analyze_pull_requests(analyzer, [PullRequestItem(1, diff, moved_base_sha, "0" * 40)]) == expected
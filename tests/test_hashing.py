@@ -0,0 +1,88 @@
+import logging
+import multiprocessing
+import os
+import numpy as np
+import pytest
+from analyzer import csv_worker
+from analyzer.analyzer import Analyzer, PullRequestItem
+from analyzer.git.git_producer import GitFeatures, GitRecordsProducer
+from analyzer.record_type import RecordType
+from analyzer.records_producer import get_hash_bucket
+
+
+BUCKETS_NUMBER = 7
+PATHS = ["module%d/File%d.swift" % (i % 3, i) for i in range(20)]
+
+
+class HashedGitFeatures(GitFeatures):
+    __slots__ = GitFeatures.__slots__
+    HASH_BUCKETS = {'V_GIT_FILE': BUCKETS_NUMBER}
+
+
+class HashedGitRecordsProducer(GitRecordsProducer):
+    """
+    Producer with hashed paths. Workers create producers by type, so it has constructor without arguments.
+    """
+    def __init__(self):
+        super().__init__(features=HashedGitFeatures())
+
+
+def get_buckets(paths: list) -> list:
+    return [get_hash_bucket(x, BUCKETS_NUMBER) for x in paths]
+
+
+def generate_diff(pr_index: int) -> bytes:
+    lines = []
+    for path in PATHS[pr_index::4]:
+        lines += ["diff --git a/%s b/%s" % (path, path), "index 83db48f..bf269f4 100644", "--- a/%s" % path,
+                  "+++ b/%s" % path, "@@ -1,2 +1,2 @@ func foo() {", " let a = %d" % pr_index, "-let b = 1",
+                  "+let b = 2"]
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def analyze(workers_number: int) -> Analyzer:
+    items = [PullRequestItem(i, generate_diff(i)) for i in range(4)]
+    analyzer = Analyzer(logging.getLogger("analyzer"), False, HashedGitRecordsProducer())
+    analyzer.analyze_items(items, workers_number)
+    return analyzer
+
+
+def get_expected_buckets() -> list:
+    return sorted(get_buckets([x for i in range(4) for x in PATHS[i::4] for _ in range(3)]))
+
+
+def test_buckets_are_stable_across_processes():
+    # Spawned process has other salt of built-in 'hash' of strings.
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        buckets = pool.apply(get_buckets, (PATHS,))
+    assert buckets == get_buckets(PATHS)
+    assert all(0 <= x < BUCKETS_NUMBER for x in buckets)
+    assert len(set(buckets)) > 1
+
+
+def test_merge_keeps_hashed_features():
+    handler = analyze(3).get_handler(RecordType.GIT)  # Records of chunks are merged into producer of handler.
+    producer = handler.producer
+    records = np.concatenate(handler.get_records())
+    assert sorted(records["V_GIT_FILE"]) == get_expected_buckets()
+    assert producer.vocabulary_features[producer.features.V_GIT_FILE] is None
+    assert producer.features.V_GIT_FILE not in producer.get_sorting_mappings()
+
+
+def test_finalize_keeps_hashed_features(csv_folder):
+    analyze(2).finalize(0.5)
+    name = RecordType.GIT.name
+    values = np.concatenate([csv_worker.read_train_records(name)["V_GIT_FILE"],
+                             csv_worker.read_test_records(name)["V_GIT_FILE"]])
+    assert sorted(values) == get_expected_buckets()
+    assert not os.path.exists(csv_worker.get_vocabulary_csv_path(name, "V_GIT_FILE"))
+
+
+def test_tf_feature_columns_of_hashed_features(csv_folder):
+    pytest.importorskip("tensorflow")
+    from analyzer.ml import get_tf_feature_columns
+    analyze(2).finalize(0.5)
+    columns = {x.name: x for x in get_tf_feature_columns(RecordType.GIT, HashedGitFeatures())}
+    column = columns["V_GIT_FILE_embedding"]
+    assert column.categorical_column.key == "V_GIT_FILE"
+    assert column.categorical_column.num_buckets == BUCKETS_NUMBER
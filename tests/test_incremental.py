@@ -0,0 +1,82 @@
+import logging
+import numpy as np
+import pytest
+from analyzer import csv_worker
+from analyzer.analyzer import Analyzer, RawCommentItem, PullRequestItem
+from analyzer.git.git_producer import GitRecordsProducer
+from analyzer.incremental import AnalyzedItems
+from analyzer.record_type import RecordType
+
+
+DIFF_HUNK = "@@ -1,3 +1,3 @@ func foo() {\n let a = 1\n-let b = 1\n+let b = %d"
+DIFF = "diff --git a/File.swift b/File.swift\nindex 83db48f..bf269f4 100644\n--- a/File.swift\n+++ b/File.swift\n%s\n"
+
+
+def analyze(rcs: list, prs: list, is_incremental: bool) -> (Analyzer, AnalyzedItems):
+    """
+    Analyzes items like 'analyze.py' does.
+    """
+    analyzed_items = AnalyzedItems(is_incremental)
+    analyzer = Analyzer(logging.getLogger("analyzer"), True, GitRecordsProducer(),
+                        generation=analyzed_items.generation)
+    if analyzed_items.generation > 0:
+        analyzer.load_vocabularies()
+    analyzer.analyze_items(list(analyzed_items.select_changed(rcs, False)), 1)
+    analyzer.analyze_items(list(analyzed_items.select_changed(prs, True)), 1)
+    analyzed_items.save()
+    analyzer.finalize(0.5, item_generations=analyzed_items.get_item_generations())
+    return analyzer, analyzed_items
+
+
+def get_rc_ids() -> list:
+    name = RecordType.GIT.name
+    records = [csv_worker.read_train_records(name), csv_worker.read_test_records(name)]
+    return sorted(int(x) for part in records for x in part["RC_ID"] if x > 0)
+
+
+def test_records_of_removed_items_are_excluded(csv_folder):
+    prs = [PullRequestItem(1, (DIFF % (DIFF_HUNK % 1)).encode('utf-8'))]
+    rcs = [RawCommentItem(i, DIFF_HUNK % i, "File.swift") for i in (1, 2, 3)]
+    analyze(rcs, prs, False)
+    assert get_rc_ids() == [1, 2, 3]
+    assert csv_worker.read_analyzer_info().positive_records_number == 3
+    # PR was fetched again: its RCs got new IDs and one of them was changed.
+    rcs = [RawCommentItem(i + 3, DIFF_HUNK % i, "File.swift") for i in (1, 2)] + \
+          [RawCommentItem(6, DIFF_HUNK % 7, "File.swift")]
+    _, analyzed_items = analyze(rcs, prs, True)
+    assert get_rc_ids() == [4, 5, 6]
+    assert csv_worker.read_analyzer_info().positive_records_number == 3
+    # Changed RC is analyzed again, removed RCs stay removed.
+    rcs[2] = RawCommentItem(6, DIFF_HUNK % 8, "File.swift")
+    analyze(rcs, prs, True)
+    assert get_rc_ids() == [4, 5, 6]
+    assert csv_worker.read_analyzer_info().positive_records_number == 3
+    assert AnalyzedItems(True).items["rc:1"][0] == ""
+
+
+def test_limited_analyzing_does_not_remove_items(csv_folder):
+    rcs = [RawCommentItem(i, DIFF_HUNK % i, "File.swift") for i in (1, 2, 3)]
+    analyze(rcs, [], False)
+    analyzed_items = AnalyzedItems(True)
+    list(analyzed_items.select_changed(rcs[:1], False, False))
+    analyzed_items.save()
+    assert all(x[0] != "" for x in AnalyzedItems(True).items.values())
+
+
+def test_changed_items_are_counted_like_selected(csv_folder):
+    rcs = [RawCommentItem(i, DIFF_HUNK % i, "File.swift") for i in (1, 2, 3)]
+    analyze(rcs, [], False)
+    # Second RC is changed and fourth one is new.
+    rcs = [rcs[0], RawCommentItem(2, DIFF_HUNK % 5, "File.swift"), rcs[2],
+           RawCommentItem(4, DIFF_HUNK % 4, "File.swift")]
+    analyzed_items = AnalyzedItems(True)
+    assert analyzed_items.count_changed(rcs, False) == 2
+    assert analyzed_items.changed == [] and len(analyzed_items.met_keys) == 0
+    assert [x.id for x in analyzed_items.select_changed(rcs, False)] == [2, 4]
+
+
+def test_records_of_other_format_are_not_appended(csv_folder):
+    producer = GitRecordsProducer()
+    csv_worker.FileDumper(RecordType.GIT).flush_records(np.zeros((2, producer.features_number), dtype=np.int32))
+    with pytest.raises(ValueError):
+        csv_worker.FileDumper(RecordType.GIT, 1).flush_records(producer.get_rows_container(2))
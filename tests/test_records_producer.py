@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from analyzer.git_diff_parser import parse_git_diff
+from analyzer.git.git_producer import GitRecordsProducer
+from analyzer.xml.xml_producer import XmlRecordsProducer
+
+
+TEXT_LINES = [b' <LinearLayout android:id="@+id/main">', b'+    <TextView android:text="\xd0\x9f\xd1\x80\xd0\xb8"/>',
+              b' </LinearLayout>']
+BINARY_LINES = [b'+\x89PNG\r', b'+\x1a\x00\x00\x00\rIHDR\x00\x00\x00\x10\xff\xd8', b'+<tag attr="\x00"/>']
+DIFF = b"diff --git a/res/layout/main.xml b/res/layout/main.xml\nindex 83db48f..bf269f4 100644\n" \
+       b"--- a/res/layout/main.xml\n+++ b/res/layout/main.xml\n@@ -1,2 +1,3 @@\n%s\n" \
+       b"@@ -10,0 +11,3 @@\n%s\n" % (b"\n".join(TEXT_LINES), b"\n".join(BINARY_LINES))
+
+
+@pytest.mark.parametrize("producer_type", [GitRecordsProducer, XmlRecordsProducer])
+def test_binary_pieces_are_skipped(producer_type):
+    git_file = parse_git_diff(DIFF, None)[0]
+    assert len(git_file.pieces) == 2
+    producer = producer_type()
+    parsed_lines = []
+    if producer_type is XmlRecordsProducer:
+        parse = producer.parser.parse
+        producer.parser.parse = lambda lines: parsed_lines.extend(lines) or parse(lines)
+    records = producer.analyze_git_file_records(git_file)
+    assert len(records) == len(TEXT_LINES)  # Non-ASCII text isn't binary.
+    assert list(records["GIT_LINE_TYPE"]) == [0, 1, 0]
+    if producer_type is XmlRecordsProducer:
+        assert parsed_lines == [x.line for x in git_file.pieces[0].lines]  # Binary lines aren't lexed.
+    line_records = np.array(producer_type().analyze_git_file_recursively(git_file), dtype=producer.dtype)
+    assert len(line_records) == len(TEXT_LINES)
+
+
+def test_binary_diff_hunk_is_skipped():
+    diff_hunk = b"@@ -10,0 +11,3 @@\n%s" % b"\n".join(BINARY_LINES)
+    git_file = parse_git_diff(diff_hunk, "res/raw/image.xml")[0]
+    assert len(GitRecordsProducer().analyze_git_file_records(git_file, True)) == 0
@@ -0,0 +1,82 @@
+import logging
+import numpy as np
+import pytest
+from analyzer import csv_worker
+from analyzer.git.git_producer import GitRecordsProducer
+from analyzer.records_handler import RecordsHandler
+
+
+SHARDS_NUMBER = 5
+SHARD_LEN = 300
+
+
+def to_plain_records(records: np.ndarray) -> np.ndarray:
+    """
+    Converts structured records into 2D array to compare rows.
+    """
+    return np.stack([records[name] for name in records.dtype.names], axis=1).astype(np.int64)
+
+
+def sort_rows(records: np.ndarray) -> np.ndarray:
+    return records[np.lexsort(records.T[::-1])]
+
+
+@pytest.fixture
+def handler(csv_folder) -> RecordsHandler:
+    """
+    Handler with few shards of random records (including duplicated ones).
+    """
+    producer = GitRecordsProducer()
+    handler = RecordsHandler(producer, csv_worker.FileDumper(producer.record_type))
+    random_state = np.random.RandomState(0)
+    for _ in range(SHARDS_NUMBER):
+        records = random_state.randint(-50, 50, (SHARD_LEN, producer.features_number))
+        records[:10] = records[10:20]
+        handler.file_dumper.flush_records(csv_worker.to_structured_records(records, producer.dtype))
+    return handler
+
+
+def read_train_test(handler: RecordsHandler) -> (np.ndarray, np.ndarray):
+    name = handler.record_type.name
+    return (to_plain_records(csv_worker.read_train_records(name)),
+            to_plain_records(csv_worker.read_test_records(name)))
+
+
+def test_buckets_are_permutation_of_shards(handler):
+    producer = handler.producer
+    file_dumper = handler.file_dumper
+    records = to_plain_records(file_dumper.read_records(producer.dtype))
+    buckets_number = 7
+    random_state = np.random.RandomState(1)
+    min_values, max_values = file_dumper.scatter_records_to_buckets(producer.dtype, buckets_number, 64,
+                                                                    random_state)
+    assert (min_values == records.min(axis=0)).all() and (max_values == records.max(axis=0)).all()
+    records_dtype = csv_worker.get_narrowed_dtype(list(producer.features.__slots__), min_values, max_values)
+    train_len = len(records) * 3 // 4
+    assert file_dumper.write_buckets_as_train_test(producer.dtype, buckets_number, train_len, records_dtype,
+                                                   random_state) == (train_len, len(records) - train_len)
+    train_records, test_records = read_train_test(handler)
+    shuffled_records = np.concatenate([train_records, test_records])
+    assert (sort_rows(shuffled_records) == sort_rows(records)).all()
+    assert (shuffled_records != records).any(), "Records are not shuffled"
+
+
+def test_finalize_with_tiny_memory_budget(handler):
+    producer = handler.producer
+    records = to_plain_records(handler.file_dumper.read_records(producer.dtype))
+    memory_budget = 4 * producer.dtype.itemsize * 100  # Buckets of about 100 records.
+    records_number = handler.finalize_records_file(logging.getLogger("analyzer"), 0.8, memory_budget,
+                                                   np.random.RandomState(2))
+    assert records_number == SHARDS_NUMBER * SHARD_LEN
+    train_records, test_records = read_train_test(handler)
+    assert len(train_records) == int(records_number * 0.8)
+    assert (sort_rows(np.concatenate([train_records, test_records])) == sort_rows(records)).all()
+
+
+def test_shards_keep_declared_types(handler):
+    producer = handler.producer
+    # Only few features are declared as wide ones, so records are narrower than with the widest type for all.
+    assert producer.dtype.itemsize < max(producer.dtypes, key=lambda x: x.itemsize).itemsize * producer.features_number
+    for _, shard in handler.file_dumper.iter_shards():
+        assert shard.dtype == producer.dtype
+        assert [shard.dtype[name] for name in producer.names] == producer.dtypes
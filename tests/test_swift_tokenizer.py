@@ -0,0 +1,109 @@
+import pytest
+from analyzer.swift.swift_parser import SwiftParser
+
+
+# Hunks of Swift code with tokens which are lexed differently by 'SwiftLexer' states.
+HUNKS = {
+    "strings": [
+        'let empty = ""',
+        'let text = "Simple text with \'quotes\' and // not a comment"',
+        'let escaped = "Tab\\t, quote \\" and backslash \\\\"',
+        'let unicode = "\\u{1F600} smile"',
+        'let unterminated = "no end',
+    ],
+    "interpolation": [
+        'print("Value \\(value) is \\"big\\"")',
+        'let nested = "Sum \\(a + (b * c)) of \\(items.map { $0.count }.reduce(0, +))"',
+        'let call = "Name: \\(user.name(for: "key")) done"',
+        'let inner = "\\("nested \\(deep)")"',
+    ],
+    "comments": [
+        '// Single line comment with "string" and /* block */',
+        '//TODO: remove it',
+        '// MARK: - Section',
+        '/// :param: value Some value',
+        '/// :returns: Nothing',
+        'let a = 1 // Trailing comment',
+        '/* Block comment */ let b = 2',
+        'let c = 3 /* Unclosed block comment',
+        '   still in comment FIXME: */ let d = 4',
+    ],
+    "nested_comments": [
+        '/* Outer /* inner */ still outer */ let e = 5',
+        '/* Outer start',
+        '   /* inner start',
+        '      inner end */',
+        '   outer end */ func after() {}',
+    ],
+    "multiline_comment_with_code": [
+        'func foo() {',
+        '    /*',
+        '    if value > 0 { return }',
+        '    */',
+        '    guard let x = y else { return nil }',
+        '}',
+    ],
+    "keywords": [
+        'import Foundation',
+        'import struct UIKit.UIView',
+        '@objc class ViewController: UIViewController {',
+        'private static func update(_ value: Int, completion: @escaping (Bool) -> Void) -> String? {',
+        'override init(frame: CGRect) { super.init(frame: frame) }',
+        'struct Point { var x: Int; let y: Double = 1.5e3 }',
+        'enum State: String { case idle = "idle", busy }',
+        'protocol Delegate: class { associatedtype Item }',
+        'extension Point: Equatable where Self: Hashable {}',
+        'typealias Handler = (Result<Int, Error>) throws -> Void',
+        'for i in 0..<10 where i % 2 == 0 { continue }',
+        'while !queue.isEmpty { queue.removeFirst() }',
+        'repeat { count -= 1 } while count > 0',
+        'switch state { case .idle: break; default: fallthrough }',
+        'do { try save() } catch let error as NSError { throw error }',
+        'if value > 0x1F && flag == true || self.other == nil { return } else if #available(iOS 13, *) {}',
+        'defer { lock.unlock() }',
+        'let closure = { [weak self] (a: Int, b: Int) -> Int in return a + b }',
+        'lazy var items: [String] = []',
+        'weak var delegate: Delegate?',
+        '@IBOutlet weak var label: UILabel!',
+        '@available(iOS 10.0, *)',
+        '#if DEBUG',
+        '#selector(tap(_:))',
+        '#endif',
+    ],
+    "numbers_and_operators": [
+        'let values = [0b1010, 0o17, 0xFF_FF, 1_000_000, 3.14, 1e-3, 0x1p4, -7]',
+        'let result = a ?? b ?? c',
+        'x += y << 2 &+ z',
+        'let range = 1...5',
+    ],
+    "empty_and_whitespace": [
+        '',
+        '    ',
+        '\t}',
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def parsers() -> (SwiftParser, SwiftParser):
+    return SwiftParser(True), SwiftParser()
+
+
+@pytest.mark.parametrize("name", sorted(HUNKS))
+def test_tokens_are_equal(parsers, name):
+    pygments_parser, tokenizer_parser = parsers
+    for line in HUNKS[name]:
+        assert tokenizer_parser.tokenize(line) == pygments_parser.tokenize(line), line
+
+
+@pytest.mark.parametrize("name", sorted(HUNKS))
+def test_features_are_equal(parsers, name):
+    pygments_parser, tokenizer_parser = parsers
+    hunk = HUNKS[name]
+    assert tokenizer_parser.get_serialized_results(hunk) == pygments_parser.get_serialized_results(hunk)
+
+
+def test_features_of_joined_hunks_are_equal(parsers):
+    pygments_parser, tokenizer_parser = parsers
+    hunk = [line for name in sorted(HUNKS) for line in HUNKS[name]]
+    assert tokenizer_parser.get_serialized_results(hunk) == pygments_parser.get_serialized_results(hunk)
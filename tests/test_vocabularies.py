@@ -0,0 +1,68 @@
+import logging
+import numpy as np
+import pytest
+from analyzer import csv_worker
+from analyzer.analyzer import Analyzer, PullRequestItem
+from analyzer.git.git_producer import GitRecordsProducer
+from analyzer.record_type import RecordType
+
+
+PRS_NUMBER = 12  # Less than 20 PRs per worker, so chunks are split by workers number.
+
+
+def generate_diff(pr_index: int) -> bytes:
+    lines = []
+    for i in range(3):
+        # Paths are met in other order than sorted and some of them are shared between PRs.
+        path = "module%d/File%d.swift" % ((pr_index * 5 + i) % 7, (PRS_NUMBER - pr_index + i) % 9)
+        lines += ["diff --git a/%s b/%s" % (path, path), "index 83db48f..bf269f4 100644", "--- a/%s" % path,
+                  "+++ b/%s" % path, "@@ -1,3 +1,3 @@ func foo() {", " let a = %d" % pr_index, "-let b = 1",
+                  "+let b = %s" % ("x" * i)]
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def analyze(workers_number: int, is_processes: bool = False) -> Analyzer:
+    items = [PullRequestItem(i, generate_diff(i)) for i in range(PRS_NUMBER)]
+    analyzer = Analyzer(logging.getLogger("analyzer"), False, GitRecordsProducer())
+    analyzer.analyze_items(items, workers_number, is_processes)
+    return analyzer
+
+
+def get_vocabulary(analyzer: Analyzer) -> list:
+    producer = analyzer.get_handler(RecordType.GIT).producer
+    vocabulary = producer.vocabulary_features[producer.features.V_GIT_FILE]
+    return sorted(vocabulary, key=vocabulary.get)
+
+
+@pytest.mark.parametrize("workers_number,is_processes", [(2, False), (3, False), (4, False), (2, True)])
+def test_records_do_not_depend_from_workers_number(workers_number, is_processes):
+    expected = analyze(1)
+    analyzer = analyze(workers_number, is_processes)
+    assert get_vocabulary(analyzer) == get_vocabulary(expected)
+    records = analyzer.get_handler(RecordType.GIT).pop_records()
+    assert (records == expected.get_handler(RecordType.GIT).pop_records()).all()
+
+
+def test_finalize_dumps_sorted_vocabulary(csv_folder):
+    analyzer = analyze(3)
+    handler = analyzer.get_handler(RecordType.GIT)
+    producer = handler.producer
+    vocabulary = get_vocabulary(analyzer)
+    assert vocabulary != sorted(vocabulary), "Vocabulary is sorted before finalizing, test checks nothing"
+    records = handler.get_records()
+    paths = sorted(vocabulary[x] for x in np.concatenate(records)["V_GIT_FILE"])
+    analyzer.finalize(0.5)
+    sorted_vocabulary = csv_worker.read_vocabulary(RecordType.GIT.name, "V_GIT_FILE")
+    assert sorted_vocabulary == sorted(vocabulary)
+    # Shards keep indexes in vocabulary of records folder, train and test files - in sorted one.
+    assert csv_worker.read_vocabulary(RecordType.GIT.name, "V_GIT_FILE", handler.file_dumper.folder) == vocabulary
+    values = np.concatenate([csv_worker.read_train_records(RecordType.GIT.name)["V_GIT_FILE"],
+                             csv_worker.read_test_records(RecordType.GIT.name)["V_GIT_FILE"]])
+    assert sorted(sorted_vocabulary[x] for x in values) == paths
+
+
+def test_incremental_analyzing_keeps_indexes(csv_folder):
+    analyze(2).finalize(0.5)
+    analyzer = Analyzer(logging.getLogger("analyzer"), False, GitRecordsProducer(), generation=1)
+    analyzer.load_vocabularies()
+    assert get_vocabulary(analyzer) == get_vocabulary(analyze(1))
@@ -0,0 +1,113 @@
+import pytest
+from analyzer.xml.xml_parser import XmlParser
+
+
+# Hunks of layout XML with constructs which are lexed differently by 'XmlLexer' states.
+HUNKS = {
+    "declaration": [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<!DOCTYPE resources>',
+        '<?xml-stylesheet href="style.xsl" type="text/xsl"?>',
+    ],
+    "tags": [
+        '<LinearLayout xmlns:android="http://schemas.android.com/apk/res/android"',
+        '    android:layout_width="match_parent"',
+        '    android:layout_height="match_parent">',
+        '    <TextView android:id="@+id/title" android:text="@string/title"/>',
+        '    <Button android:id=\'@+id/ok\' android:enabled=true />',
+        '    <View/>',
+        '    < Space />',
+        '</LinearLayout>',
+        '</ LinearLayout >',
+    ],
+    "multi_line_tags": [
+        '<android.support.constraint.ConstraintLayout',
+        '    xmlns:app="http://schemas.android.com/apk/res-auto"',
+        '    android:orientation=',
+        '        "vertical"',
+        '    app:layout_constraintTop_toTopOf="parent"',
+        '    >',
+        '    <ImageView',
+        '        android:src="@drawable/icon"',
+        '        />',
+        '</android.support.constraint.ConstraintLayout>',
+    ],
+    "comments": [
+        '<!-- Single line comment -->',
+        '<!---->',
+        '    <TextView/> <!-- Trailing comment with <tag attr="value"/> -->',
+        '<!-- Multi-line comment starts',
+        '    <Button android:text="commented"/>',
+        '    ends here -->',
+        '<!-- First --><View/><!-- Second -->',
+        '-->',
+    ],
+    "cdata": [
+        '<string name="html"><![CDATA[<b>Bold</b> & <i>italic</i>]]></string>',
+        '<string name="multi"><![CDATA[First line',
+        '    second line with <tag> and &amp;',
+        '    ]]></string>',
+        '<![CDATA[]]>',
+    ],
+    "entities_and_text": [
+        '<string name="quotes">&quot;Quoted&quot; &amp; &#169; &#x2014;</string>',
+        '<string name="plain">Text with spaces   and\ttabs</string>',
+        '    plain text line without tags',
+        '&unterminated entity',
+        '<string name="format">%1$s of %2$d</string>',
+    ],
+    "unterminated": [
+        '<TextView android:text="unterminated string',
+        '    still in string" android:id="@+id/x"/>',
+        '<TextView android:text=\'single quoted',
+        '<Button',
+        '<',
+        '</',
+        '<!-- Unterminated comment',
+        '<![CDATA[Unterminated CDATA',
+        '<?xml version="1.0"',
+        '<!DOCTYPE resources',
+        'android:text="attribute outside of tag"',
+        '/>',
+        '>',
+    ],
+    "whitespaces": [
+        '',
+        '    ',
+        '\t<View/>\t',
+        '<View/>    ',
+        '    <View android:id="@+id/trailing" />   ',
+        '\t\t',
+    ],
+    "line_breaks": [
+        '<View/>\r\n',
+        '<View/>\r',
+        '<TextView\r    android:text="carriage return in the middle"/>',
+        '\ufeff<?xml version="1.0"?>',
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def parsers() -> (XmlParser, XmlParser):
+    return XmlParser(False), XmlParser()
+
+
+@pytest.mark.parametrize("name", sorted(HUNKS))
+def test_tokens_are_equal(parsers, name):
+    each_line_parser, single_pass_parser = parsers
+    hunk = HUNKS[name]
+    assert single_pass_parser.lex_lines(hunk) == each_line_parser.lex_each_line(hunk)
+
+
+@pytest.mark.parametrize("name", sorted(HUNKS))
+def test_features_are_equal(parsers, name):
+    each_line_parser, single_pass_parser = parsers
+    hunk = HUNKS[name]
+    assert single_pass_parser.get_serialized_results(hunk) == each_line_parser.get_serialized_results(hunk)
+
+
+def test_features_of_joined_hunks_are_equal(parsers):
+    each_line_parser, single_pass_parser = parsers
+    hunk = [line for name in sorted(HUNKS) for line in HUNKS[name]]
+    assert single_pass_parser.get_serialized_results(hunk) == each_line_parser.get_serialized_results(hunk)
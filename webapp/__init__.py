@@ -2,6 +2,7 @@ import logging
 from flask import Flask
 from flask_appbuilder import SQLA, AppBuilder
 from webapp.index import SiteIndexView
+from model.sqlite import enable_sqlite_performance_profile
 
 
 logging.basicConfig(format='%(asctime)s:%(levelname)s:%(name)s:%(message)s')
@@ -10,6 +11,7 @@ logging.getLogger().setLevel(logging.DEBUG)
 app = Flask(__name__, instance_relative_config=True)
 app.config.from_object('config')
 app.config.from_pyfile('config.py')
+enable_sqlite_performance_profile()
 db = SQLA(app, session_options={"autoflush": False})
 appbuilder = AppBuilder(app, db.session, indexview=SiteIndexView)
 
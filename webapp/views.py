@@ -7,14 +7,20 @@ from flask_appbuilder import ModelView, expose, BaseView, has_access
 from flask_appbuilder.models.sqla.interface import SQLAInterface
 
 from analyzer.analyzer import parse_git_diff
+from analyzer.items_loader import iter_raw_comments, iter_closed_pull_requests
 from analyzer.ml_dnn import train_net, parse_and_dump_features, NetType, predict
 from analyzer.swift.swift_parser import SwiftParser
-from github_parser.parser import get_pull_requests_from_github, fetch_pr_from_github
+from github_parser.parser import fetch_pr_from_github
+from github_parser.fetch_scheduler import fetch_pull_requests_async
+from github_parser.http_cache import HttpCache
+from github_parser.git_mirror import GitMirror
 # from model.rcclass import RCClass
 from model.comment import Comment
 from model.git_data import GitLineType
 from model.pull_request import PullRequest
 from model.raw_comment import RawComment
+from model.sqlite import upsert_pull_requests, get_pull_requests_updates
+from model.sync_state import get_sync_watermark, set_sync_watermark
 from webapp import appbuilder, app, db
 
 
@@ -88,38 +94,47 @@ class FetchView(BaseWithLogs):
         self.progress_stage = 1
         app.logger.info("START: Fetch %d pull requests.", number)
         time1 = datetime.today()
-        # Fetch data from GitHub.
-        pull_requests = get_pull_requests_from_github(app.logger, app.config['ACCOUNTS'], app.config['REPO'],
-                app.config['REPO_OWNER'], number)
-        time2 = datetime.today()
-        resulting_count = len(pull_requests)
-        app.logger.info("Fetched %d pull requests in %s seconds", resulting_count, time2 - time1)
-        # Save comments in db.
-        db_pull_requests = db.session.query(PullRequest).all()
-        db_pull_requests_dict = dict()
-        for pr in db_pull_requests:
-            db_pull_requests_dict[pr.number] = pr
-        pull_requests_to_update_numbers = []
-        pull_requests_to_insert = []
-        for pr in pull_requests:
-            if pr.number in db_pull_requests_dict:
-                pull_requests_to_update_numbers.append(pr.number)
-            else:
-                pull_requests_to_insert.append(pr)
-        # Save unique PRs.
+        # Fetch data from GitHub. Only PRs updated since previous fetch.
         session = db.session
-        session.add_all(pull_requests_to_insert)
-        session.commit()
-        # Update existing PRs if need.
-        if len(pull_requests_to_update_numbers) > 0:
-            for pr in session.query(PullRequest).filter(PullRequest.number.in_(pull_requests_to_update_numbers)).all():
-                pr_with_updates: PullRequest = db_pull_requests_dict[pr.number]
-                pr.state = pr_with_updates.state
-                pr.diff = pr_with_updates.diff
-                pr.raw_comments = pr_with_updates.raw_comments
+        repo = "%s/%s" % (app.config['REPO_OWNER'], app.config['REPO'])
+        watermark = get_sync_watermark(session, repo)
+        app.logger.info("Fetch pull requests of %s updated since %s.", repo, watermark)
+        counters = {"inserted": 0, "updated": 0, "watermark": ""}  # Empty string is less than any time.
+
+        def get_saved_updates(numbers):
+            # PRs saved by interrupted fetch are skipped if they weren't updated since. Only listed PRs are read.
+            saved_updates = get_pull_requests_updates(session.connection(), numbers)
+            session.commit()  # Don't keep read transaction during fetch.
+            return saved_updates
+
+        def write_batch(pull_requests):
+            # Save PRs with comments in db. Existing PRs (with the same number) are updated.
+            inserted_number, updated_number = upsert_pull_requests(session.connection(), pull_requests)
+            session.commit()
+            counters["inserted"] += inserted_number
+            counters["updated"] += updated_number
+            counters["watermark"] = max([counters["watermark"]] + [x.updated_at for x in pull_requests])
+            app.logger.info("Saved %d pull requests into database (%d inserted, %d updated)", len(pull_requests),
+                            inserted_number, updated_number)
+
+        git_mirror_path = app.config.get('GIT_MIRROR_PATH')
+        failed_numbers = []
+        resulting_count = fetch_pull_requests_async(app.logger, app.config['ACCOUNTS'], app.config['REPO'],
+                                                    app.config['REPO_OWNER'], write_batch, number,
+                                                    app.config['GITHUB_API_URL'], watermark=watermark,
+                                                    get_saved_updates=get_saved_updates,
+                                                    http_cache=HttpCache(is_replay=app.config['GITHUB_CACHE_REPLAY']),
+                                                    git_mirror=GitMirror(git_mirror_path) if git_mirror_path else None,
+                                                    failed_numbers=failed_numbers)
+        # Limited fetch might skip some updated PRs so move watermark only after fetch of all updated PRs.
+        if len(failed_numbers) > 0:
+            app.logger.warning("Keep watermark because %d pull requests weren't fetched, they are fetched again by "
+                               "next fetch", len(failed_numbers))
+        elif number < 0 and counters["watermark"] != "":
+            set_sync_watermark(session, repo, counters["watermark"])
             session.commit()
-        app.logger.info("END: Saved %d pull requests into database (%d inserted, %d updated)",\
-                resulting_count, len(pull_requests_to_insert), len(pull_requests_to_update_numbers))
+        app.logger.info("END: Fetched and saved %d pull requests (%d inserted, %d updated) in %s seconds",
+                        resulting_count, counters["inserted"], counters["updated"], datetime.today() - time1)
         # Notify 'fetch_log' that process over.
         self.progress_stage = 2
         return "done"
@@ -158,10 +173,10 @@ class AnalyzeView(BaseWithLogs):
         app.logger.info("START: Analyze %d raw comments and %d pull requests. Records will be split train/test=%d.",
                         rcs_number, prs_number, train_part)
         time1 = datetime.today()
-        # Use all RCs.
-        raw_comments = db.session.query(RawComment).limit(rcs_number).all()
+        # Use all RCs. Load only columns required for analyzing.
+        raw_comments = list(iter_raw_comments(db.session, rcs_number))
         # Use only closed PRs.
-        prs = db.session.query(PullRequest).filter(PullRequest.state == "closed").limit(prs_number).all()
+        prs = list(iter_closed_pull_requests(db.session, prs_number))
         time2 = datetime.today()
         app.logger.info("Load %d raw comments and %d pull requests in %s seconds.", len(raw_comments), len(prs),
                         time2 - time1)
@@ -340,7 +355,7 @@ class PullRequestView(BaseView):  # TODO remove - use from database.
         pr_number = request.form["number"]
         pr: PullRequest = fetch_pr_from_github(app.logger, app.config['ACCOUNTS'][0], app.config['REPO_OWNER'],\
                 app.config['REPO'], pr_number)
-        lines = str(pr.diff).split('\\n')
+        lines = pr.diff.decode('utf-8', 'replace').split('\n')
         # TODO save PR's data into database (to check results on local data).
         # TODO git_diff = parse_git_diff(pr.diff) and use lines and etc. from this detailed data.
         # Maybe better to parse all pull requests on start for this?